@@ -3,16 +3,26 @@ API views for the pages application.
 
 All views are read-only (GET only) and publicly accessible.
 Uses DRF generic views for cleaner, more maintainable code.
+
+Rendered responses are cached and invalidated by model signals
+(see cache.py), so the hot path does not touch the database; cache misses
+read from a replica when one is configured (apps/utils/dbrouter.py). Cache misses
+of list views are serialized from ``.values()`` rows (FastListMixin).
 """
 
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework.permissions import AllowAny
 
-from .models import Address, Link, Menu, Service
+from apps.utils.dbrouter import ReplicaReadMixin
+from apps.utils.querybudget import QueryBudget
+from apps.utils.serializers import FastListMixin
+
+from .cache import CachedResponseMixin
+from .models import Address, Link, Menu, MenuItem, Service
 from .serializers import AddressSerializer, LinkSerializer, MenuSerializer, ServiceSerializer
 
 
-class MenuListAPIView(ListAPIView):
+class MenuListAPIView(ReplicaReadMixin, CachedResponseMixin, FastListMixin, ListAPIView):
     """
     GET /api/menus/
 
@@ -22,13 +32,15 @@ class MenuListAPIView(ListAPIView):
 
     serializer_class = MenuSerializer
     permission_classes = [AllowAny]
+    cache_models = (Menu, MenuItem)
+    query_budget = QueryBudget(5)  # cache miss
 
     def get_queryset(self):
         """Return only active menus, prefetching related items to avoid N+1 queries."""
         return Menu.objects.filter(is_active=True).prefetch_related("items")
 
 
-class ServiceListAPIView(ListAPIView):
+class ServiceListAPIView(ReplicaReadMixin, CachedResponseMixin, FastListMixin, ListAPIView):
     """
     GET /api/services/
 
@@ -37,12 +49,14 @@ class ServiceListAPIView(ListAPIView):
 
     serializer_class = ServiceSerializer
     permission_classes = [AllowAny]
+    cache_models = (Service,)
+    query_budget = QueryBudget(3)  # cache miss
 
     def get_queryset(self):
         return Service.objects.filter(is_active=True)
 
 
-class LinkListAPIView(ListAPIView):
+class LinkListAPIView(ReplicaReadMixin, CachedResponseMixin, FastListMixin, ListAPIView):
     """
     GET /api/links/
 
@@ -51,12 +65,14 @@ class LinkListAPIView(ListAPIView):
 
     serializer_class = LinkSerializer
     permission_classes = [AllowAny]
+    cache_models = (Link,)
+    query_budget = QueryBudget(3)  # cache miss
 
     def get_queryset(self):
         return Link.objects.filter(is_active=True)
 
 
-class AddressDetailAPIView(RetrieveAPIView):
+class AddressDetailAPIView(ReplicaReadMixin, CachedResponseMixin, RetrieveAPIView):
     """
     GET /api/info/
 
@@ -66,6 +82,8 @@ class AddressDetailAPIView(RetrieveAPIView):
 
     serializer_class = AddressSerializer
     permission_classes = [AllowAny]
+    cache_models = (Address,)
+    query_budget = QueryBudget(2)  # cache miss
 
     def get_object(self):
         """Retrieve the primary site address, or raise 404 if none exists."""
@@ -0,0 +1,206 @@
+"""Native async variants of the public pages API (apiviews.py).
+
+DRF views are synchronous, so under ASGI every request to them is run
+through ``sync_to_async``. These plain Django async views serve the same
+URLs, payloads, cache entries and validators (ETag / Last-Modified, 304)
+using the async cache API and the async ORM (``acount``, ``afirst``,
+``async for``). They are mounted instead of the DRF views when
+``ASYNC_VIEWS_ENABLED`` is set (see urls.py).
+
+Notes
+-----
+- Lists keep DRF's ``LimitOffsetPagination`` envelope (``limit`` /
+  ``offset``, ``count``, ``next`` / ``previous`` links).
+- Responses are always JSON (no browsable API).
+- DRF throttles are not run, but every request is checked against the
+  ``anon`` rate in the same limiter bucket as ``AnonRateThrottle``, so
+  switching the flag on does not lift the public API's rate limit. The views
+  do not authenticate, so signed-in clients are held to the anonymous rate.
+- In Django 5.2 the cache backends and the ORM still implement their async
+  methods with ``sync_to_async``; the views pick up native implementations
+  as soon as Django ships them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.translation import gettext_lazy as _
+from django.views import View
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+
+from apps.utils import metrics
+from apps.utils.dbrouter import ReplicaReadMixin
+from apps.utils.fastjson import FastJsonResponse
+from apps.utils.querybudget import QueryBudget
+from apps.utils.ratelimit import AnonRateThrottle, get_limiter, record_result
+from apps.utils.serializers import get_row_serializer
+
+from .cache import (
+    KEY_PREFIX,
+    aresolve_version,
+    cache_metrics,
+    endpoint_name,
+    get_cache,
+    representation,
+    set_validators,
+    version_keys,
+)
+from .models import Address, Link, Menu, MenuItem, Service
+from .serializers import AddressSerializer, LinkSerializer, MenuSerializer, ServiceSerializer
+
+
+class AsyncCachedView(ReplicaReadMixin, View, ABC):
+    """Async counterpart of ``CachedResponseMixin`` + a read-only DRF view."""
+
+    http_method_names = ["get", "head", "options"]
+    cache_models: tuple = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.cache_models:
+            cls.cache_results = cache_metrics(endpoint_name(cls))
+
+    def get_cache_key(self, request) -> str:
+        digest = hashlib.md5(request.get_full_path().encode()).hexdigest()  # noqa: S324
+        return f"{KEY_PREFIX}:aresp:{type(self).__name__}:{digest}"
+
+    async def throttle(self, request):
+        """Return a 429 response once the client is over the ``anon`` rate."""
+
+        throttle = AnonRateThrottle()
+        if throttle.rate is None:
+            return None
+        ident = throttle.get_ident(request)
+        key = throttle.cache_format % {"scope": throttle.scope, "ident": ident}
+        # The limiter may do a Redis round trip: keep it off the event loop.
+        result = await sync_to_async(get_limiter().hit, thread_sensitive=False)(key, throttle.rate)
+        record_result(request, result)
+        if result.allowed:
+            return None
+        metrics.ratelimit_rejections[throttle.scope].inc()
+        return FastJsonResponse({"detail": str(_("Request was throttled."))}, status=429)
+
+    async def get(self, request, *args, **kwargs):
+        throttled = await self.throttle(request)
+        if throttled is not None:
+            return throttled
+
+        cache = get_cache()
+        enabled = getattr(settings, "PAGES_CACHE_ENABLED", True)
+        key = self.get_cache_key(request)
+        keys = version_keys(self.cache_models)
+        if enabled:
+            keys.append(key)
+        found = await cache.aget_many(keys)
+        variant = representation(request, "application/json")
+        version = await aresolve_version(cache, self.cache_models, found, variant)
+
+        not_modified = get_conditional_response(
+            request, etag=version.etag, last_modified=version.timestamp
+        )
+        if not_modified is not None:
+            self.cache_results.not_modified.inc()
+            return set_validators(not_modified, version)
+
+        entry = found.get(key)
+        if entry is not None and entry["generations"] == version.generations:
+            response = HttpResponse(entry["content"], content_type=entry["content_type"])
+            response["X-Cache"] = "HIT"
+            self.cache_results.hit.inc()
+            return set_validators(response, version)
+
+        response = FastJsonResponse(await self.get_data(request), safe=False)
+        set_validators(response, version)
+        if enabled:
+            await cache.aset(
+                key,
+                {
+                    "generations": version.generations,
+                    "content": response.content,
+                    "content_type": response["Content-Type"],
+                },
+                timeout=getattr(settings, "PAGES_CACHE_TIMEOUT", 3600),
+            )
+            response["X-Cache"] = "MISS"
+            self.cache_results.miss.inc()
+        return response
+
+    @abstractmethod
+    async def get_data(self, request):
+        """Return the payload of a cache miss."""
+
+
+class AsyncListView(AsyncCachedView):
+    serializer_class = None
+
+    @abstractmethod
+    def get_queryset(self):
+        """Return the model queryset to list."""
+
+    async def get_data(self, request):
+        row_serializer = get_row_serializer(self.serializer_class)
+        queryset = row_serializer.values(self.get_queryset())
+
+        paginator = LimitOffsetPagination()
+        drf_request = Request(request)
+        limit = paginator.get_limit(drf_request)
+        if limit is None:
+            return await row_serializer.aserialize([row async for row in queryset])
+
+        paginator.request = drf_request
+        paginator.limit = limit
+        paginator.offset = paginator.get_offset(drf_request)
+        paginator.count = await queryset.acount()
+        window = queryset[paginator.offset : paginator.offset + limit]
+        results = await row_serializer.aserialize([row async for row in window])
+        return paginator.get_paginated_response(results).data
+
+
+class MenuListView(AsyncListView):
+    """GET /api/menus/ (async)."""
+
+    serializer_class = MenuSerializer
+    cache_models = (Menu, MenuItem)
+    query_budget = QueryBudget(5)  # cache miss
+
+    def get_queryset(self):
+        return Menu.objects.filter(is_active=True)
+
+
+class ServiceListView(AsyncListView):
+    """GET /api/services/ (async)."""
+
+    serializer_class = ServiceSerializer
+    cache_models = (Service,)
+    query_budget = QueryBudget(3)  # cache miss
+
+    def get_queryset(self):
+        return Service.objects.filter(is_active=True)
+
+
+class LinkListView(AsyncListView):
+    """GET /api/links/ (async)."""
+
+    serializer_class = LinkSerializer
+    cache_models = (Link,)
+    query_budget = QueryBudget(3)  # cache miss
+
+    def get_queryset(self):
+        return Link.objects.filter(is_active=True)
+
+
+class AddressDetailView(AsyncCachedView):
+    """GET /api/info/ (async)."""
+
+    cache_models = (Address,)
+    query_budget = QueryBudget(2)  # cache miss
+
+    async def get_data(self, request):
+        return AddressSerializer(await Address.objects.afirst()).data
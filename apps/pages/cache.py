@@ -0,0 +1,491 @@
+"""Versioned read-through cache for the public content API.
+
+Pages content (menus, services, links, address) changes a few times a month
+but is read on every page view. Instead of guessing TTLs we keep a
+*generation counter* per model in the configured cache backend:
+
+- ``post_save`` / ``post_delete`` signals bump the counter (see signals.py).
+- Every cached response records the generations it was built from.
+- A cached response is only served when its generations still match.
+
+The read path is a single ``cache.get_many()`` round trip: the response entry
+and the generation counters are fetched together and compared in-process.
+Stale entries are never served and simply age out of the backend.
+
+Notes
+-----
+- Counters are seeded from the wall clock (not ``1``) so that an evicted
+  counter never rolls back to a value an old entry was built from.
+- Generation keys never expire; response entries use ``PAGES_CACHE_TIMEOUT``.
+- The counters must be shared by every worker for a bump to reach them all.
+  With a process-local backend (``LocMemCache`` when ``REDIS_URL`` is unset)
+  each process also compares ``Count`` / ``Max(updated_at)`` of the model
+  with the database at most every ``PAGES_CACHE_REVALIDATE_INTERVAL``
+  seconds and bumps its own counter when they changed, so writes served by
+  another worker show up after that interval instead of after
+  ``PAGES_CACHE_TIMEOUT``.
+
+The same counters drive HTTP validators: the strong ``ETag`` is derived from
+the generations and the representation (media type, language, path and
+query string, see :func:`representation`) and ``Last-Modified`` is the time of the last write (bumps
+record it; otherwise ``Max(updated_at)`` is aggregated once per generation).
+Conditional GETs are answered with 304 before any queryset or template runs.
+
+Marketing pages can additionally be cached whole for anonymous visitors
+(``conditional_content(..., cache_anonymous=True)``); shared template
+components use ``{% cache %}`` fragments keyed on ``site.version``.
+
+The async API views (asyncviews.py) use the same keys through
+:func:`aresolve_version`.
+
+Hits, misses and 304s are counted per endpoint in
+``pages_cache_requests_total`` (children bound when the view is defined).
+"""
+
+from __future__ import annotations
+
+import calendar
+import hashlib
+import re
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from functools import wraps
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.utils.translation import get_language
+
+from apps.utils import metrics
+from apps.utils.cache import is_shared_cache
+
+KEY_PREFIX = "pages"
+
+
+def cache_metrics(endpoint: str):
+    """``pages_cache_requests_total`` children (hit, miss, not_modified) of an endpoint."""
+
+    return metrics.children(
+        metrics.pages_cache_requests_total, "result", metrics.CACHE_RESULTS, endpoint=endpoint
+    )
+
+
+def endpoint_name(view_class) -> str:
+    """``MenuListAPIView`` and its async twin ``MenuListView`` -> ``MenuList``."""
+
+    return re.sub(r"(API)?View$", "", view_class.__name__)
+
+
+def get_cache():
+    """Return the cache backend used for pages content."""
+
+    return caches[getattr(settings, "PAGES_CACHE_ALIAS", "default")]
+
+
+def generation_key(label: str) -> str:
+    """Cache key holding the generation counter of a model (``app_label.model``)."""
+
+    return f"{KEY_PREFIX}:gen:{label}"
+
+
+def lastmod_key(label: str) -> str:
+    """Cache key holding ``(generation, last write time)`` of a model."""
+
+    return f"{KEY_PREFIX}:lastmod:{label}"
+
+
+def dbstate_key(label: str) -> str:
+    """Cache key holding ``(checked at, database state)`` of a model (local backends)."""
+
+    return f"{KEY_PREFIX}:dbstate:{label}"
+
+
+def model_label(model) -> str:
+    """Return the generation label of a model class or instance."""
+
+    return model._meta.label_lower
+
+
+def _seed() -> int:
+    return time.time_ns() // 1000
+
+
+def _generation_keys(cache, labels: Iterable[str]) -> list[str]:
+    keys = [generation_key(label) for label in labels]
+    if not is_shared_cache(cache):
+        keys += [dbstate_key(label) for label in labels]
+    return keys
+
+
+def get_generations(labels: Iterable[str]) -> dict[str, int]:
+    """Return the current generation of each label, initializing missing ones."""
+
+    cache = get_cache()
+    labels = tuple(labels)
+    found = cache.get_many(_generation_keys(cache, labels))
+    return _resolve_generations(cache, labels, found)
+
+
+def _revalidation_due(entry) -> bool:
+    interval = getattr(settings, "PAGES_CACHE_REVALIDATE_INTERVAL", 5)
+    return entry is None or time.time() - entry[0] >= interval
+
+
+def _db_state_queryset(label: str):
+    return django_apps.get_model(label)._default_manager.all()
+
+
+def _record_db_state(cache, label: str, entry, state: dict) -> bool:
+    """Store the database state of ``label``; bump it if it differs from ``entry``."""
+
+    # No previous state (evicted, or first check after a seed or a local
+    # write): the database may have changed meanwhile, so rebuild once.
+    changed = entry is None or entry[1] != state
+    if changed:
+        bump_generation(label)
+    cache.set(dbstate_key(label), (time.time(), state), timeout=None)
+    return changed
+
+
+def _seed_db_state(cache, label: str) -> None:
+    # A counter that was just seeded or bumped has no stale entries: the
+    # next check is due in one interval.
+    cache.set(dbstate_key(label), (time.time(), None), timeout=None)
+
+
+def _resolve_generations(cache, labels: tuple[str, ...], found: dict) -> dict[str, int]:
+    local = not is_shared_cache(cache)
+    generations = {}
+    for label in labels:
+        key = generation_key(label)
+        value = found.get(key)
+        if value is None:
+            # add() keeps a concurrently initialized counter.
+            cache.add(key, _seed(), timeout=None)
+            value = cache.get(key)
+            if local:
+                _seed_db_state(cache, label)
+        elif local and _revalidation_due(entry := found.get(dbstate_key(label))):
+            state = _db_state_queryset(label).aggregate(
+                count=Count("pk"), updated=Max("updated_at")
+            )
+            if _record_db_state(cache, label, entry, state):
+                value = cache.get(key)
+        generations[label] = value
+    return generations
+
+
+def bump_generation(label: str) -> None:
+    """Invalidate every cached entry built from ``label``."""
+
+    cache = get_cache()
+    key = generation_key(label)
+    try:
+        generation = cache.incr(key)
+    except ValueError:
+        # Missing counter (never read yet, or evicted): start a fresh one.
+        generation = _seed()
+        cache.set(key, generation, timeout=None)
+    # Deletes have no updated_at to aggregate, so record the write time here.
+    cache.set(lastmod_key(label), (generation, timezone.now()), timeout=None)
+    if not is_shared_cache(cache):
+        _seed_db_state(cache, label)
+
+
+@dataclass(frozen=True)
+class ContentVersion:
+    """Validators of a response built from a set of content models."""
+
+    generations: dict[str, int]
+    last_modified: datetime | None
+    #: The representation the validators belong to (see :func:`representation`).
+    variant: str = ""
+
+    @property
+    def etag(self) -> str:
+        raw = ";".join(f"{label}={gen}" for label, gen in sorted(self.generations.items()))
+        salt = getattr(settings, "PAGES_ETAG_SALT", "")
+        digest = hashlib.md5(f"{salt}|{self.variant}|{raw}".encode()).hexdigest()  # noqa: S324
+        return f'"{digest}"'
+
+    @property
+    def timestamp(self) -> int | None:
+        if self.last_modified is None:
+            return None
+        return calendar.timegm(self.last_modified.utctimetuple())
+
+
+def representation(request, media_type: str = "") -> str:
+    """What selects the representation of a URL besides the content.
+
+    Strong ETags must differ between representations (``?limit=1``, JSON vs
+    browsable API, languages) or a shared cache could answer a conditional
+    request with a 304 for the wrong one.
+    """
+
+    return f"{media_type}|{get_language()}|{request.get_full_path()}"
+
+
+def version_keys(models) -> list[str]:
+    """Cache keys needed by :func:`resolve_version` (fetch them in one round trip)."""
+
+    labels = [model_label(model) for model in models]
+    keys = _generation_keys(get_cache(), labels)
+    return keys + [lastmod_key(label) for label in labels]
+
+
+def resolve_version(cache, models, found: dict, variant: str = "") -> ContentVersion:
+    """Build the ContentVersion of ``models`` from a ``get_many()`` result."""
+
+    labels = tuple(model_label(model) for model in models)
+    generations = _resolve_generations(cache, labels, found)
+    stamps = []
+    for model, label in zip(models, labels, strict=True):
+        entry = found.get(lastmod_key(label))
+        if entry is not None and entry[0] == generations[label]:
+            stamp = entry[1]
+        else:
+            stamp = model._default_manager.aggregate(Max("updated_at"))["updated_at__max"]
+            cache.set(lastmod_key(label), (generations[label], stamp), timeout=None)
+        if stamp is not None:
+            stamps.append(stamp)
+    return ContentVersion(generations, max(stamps, default=None), variant)
+
+
+async def aresolve_version(cache, models, found: dict, variant: str = "") -> ContentVersion:
+    """Async :func:`resolve_version` (async cache API and ORM)."""
+
+    local = not is_shared_cache(cache)
+    generations = {}
+    stamps = []
+    for model in models:
+        label = model_label(model)
+        generation = found.get(generation_key(label))
+        if generation is None:
+            await cache.aadd(generation_key(label), _seed(), timeout=None)
+            generation = await cache.aget(generation_key(label))
+            if local:
+                _seed_db_state(cache, label)  # process-local backend: no I/O
+        elif local and _revalidation_due(entry := found.get(dbstate_key(label))):
+            state = await _db_state_queryset(label).aaggregate(
+                count=Count("pk"), updated=Max("updated_at")
+            )
+            if _record_db_state(cache, label, entry, state):
+                generation = await cache.aget(generation_key(label))
+        generations[label] = generation
+
+        entry = found.get(lastmod_key(label))
+        if entry is not None and entry[0] == generation:
+            stamp = entry[1]
+        else:
+            aggregate = await model._default_manager.aaggregate(Max("updated_at"))
+            stamp = aggregate["updated_at__max"]
+            await cache.aset(lastmod_key(label), (generation, stamp), timeout=None)
+        if stamp is not None:
+            stamps.append(stamp)
+    return ContentVersion(generations, max(stamps, default=None), variant)
+
+
+def get_content_version(models, variant: str = "") -> ContentVersion:
+    """Return the current ContentVersion of ``models``."""
+
+    cache = get_cache()
+    return resolve_version(cache, models, cache.get_many(version_keys(models)), variant)
+
+
+def set_validators(response, version: ContentVersion):
+    """Add ETag / Last-Modified headers unless the view already set them."""
+
+    response.headers.setdefault("ETag", version.etag)
+    if version.last_modified is not None:
+        response.headers.setdefault("Last-Modified", http_date(version.timestamp))
+    return response
+
+
+def page_cache_key(request) -> str:
+    """Cache key of a full rendered page: path + query string + active language."""
+
+    salt = getattr(settings, "PAGES_ETAG_SALT", "")
+    digest = hashlib.md5(  # noqa: S324 - not used for security
+        f"{salt}|{get_language()}|{request.get_full_path()}".encode()
+    ).hexdigest()
+    return f"{KEY_PREFIX}:page:{digest}"
+
+
+def _is_anonymous(request) -> bool:
+    user = getattr(request, "user", None)
+    return user is None or not user.is_authenticated
+
+
+def _store_page(cache, key: str, response, version: ContentVersion) -> None:
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return
+    cache.set(
+        key,
+        {
+            "generations": version.generations,
+            "content": response.content,
+            "content_type": response["Content-Type"],
+        },
+        timeout=getattr(settings, "PAGES_CACHE_TIMEOUT", 3600),
+    )
+
+
+def conditional_content(*models, cache_anonymous: bool = False):
+    """Decorator answering conditional GET/HEAD for a view built from ``models``.
+
+    The validators come from the content generations, so a matching
+    ``If-None-Match`` / ``If-Modified-Since`` returns 304 before the view runs.
+
+    With ``cache_anonymous=True`` (and ``PAGES_PAGE_CACHE_ENABLED``) the whole
+    rendered page is also stored for anonymous visitors, keyed on path and
+    language and tagged with the generations like API entries. The page entry
+    is fetched in the same ``get_many()`` as the validators.
+    """
+
+    def decorator(view):
+        results = cache_metrics(view.__name__)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            cache = get_cache()
+            keys = version_keys(models)
+            page_key = None
+            if (
+                cache_anonymous
+                and getattr(settings, "PAGES_PAGE_CACHE_ENABLED", True)
+                and _is_anonymous(request)
+            ):
+                page_key = page_cache_key(request)
+                keys.append(page_key)
+            found = cache.get_many(keys)
+            version = resolve_version(cache, models, found, representation(request))
+
+            response = get_conditional_response(
+                request, etag=version.etag, last_modified=version.timestamp
+            )
+            if response is not None:
+                if response.status_code == 304:
+                    results.not_modified.inc()
+            elif page_key is not None:
+                entry = found.get(page_key)
+                if entry is not None and entry["generations"] == version.generations:
+                    response = HttpResponse(entry["content"], content_type=entry["content_type"])
+                    response["X-Cache"] = "HIT"
+                    results.hit.inc()
+                else:
+                    response = view(request, *args, **kwargs)
+                    _store_page(cache, page_key, response, version)
+                    response["X-Cache"] = "MISS"
+                    results.miss.inc()
+            else:
+                response = view(request, *args, **kwargs)
+
+            if response is not None and response.status_code in (200, 304):
+                set_validators(response, version)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+class CachedResponseMixin:
+    """Serve rendered responses of a read-only DRF view from the cache.
+
+    Set ``cache_models`` to every model the response is built from. The cache
+    key includes the full path (pagination parameters) and the negotiated
+    media type, so the browsable API and JSON never share an entry. The
+    same goes for the ETag, and responses carry ``Vary: Accept``.
+
+    Responses carry ETag / Last-Modified and conditional requests get a 304
+    straight from the cached validators. ``PAGES_CACHE_ENABLED=False`` turns
+    off response storage but keeps the validators.
+
+    Must be listed before the DRF generic view in the bases.
+    """
+
+    cache_models: tuple = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.cache_models:
+            cls.cache_results = cache_metrics(endpoint_name(cls))
+
+    def get_cache_key(self, request) -> str:
+        digest = hashlib.md5(  # noqa: S324 - not used for security
+            f"{request.accepted_media_type}|{request.get_full_path()}".encode()
+        ).hexdigest()
+        return f"{KEY_PREFIX}:resp:{type(self).__name__}:{digest}"
+
+    def _cache_enabled(self, request) -> bool:
+        # HTML renderers (the browsable API) render the user's name and CSRF
+        # token into the page: only data representations are shared.
+        renderer = getattr(request, "accepted_renderer", None)
+        if renderer is not None and renderer.media_type.startswith("text/html"):
+            return False
+        return getattr(settings, "PAGES_CACHE_ENABLED", True)
+
+    def get(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        keys = version_keys(self.cache_models)
+        if self._cache_enabled(request):
+            keys.append(key)
+        found = cache.get_many(keys)
+        variant = representation(request, request.accepted_media_type)
+        version = resolve_version(cache, self.cache_models, found, variant)
+
+        not_modified = get_conditional_response(
+            request, etag=version.etag, last_modified=version.timestamp
+        )
+        if not_modified is not None:
+            self.cache_results.not_modified.inc()
+            return set_validators(not_modified, version)
+
+        entry = found.get(key)
+        if entry is not None and entry["generations"] == version.generations:
+            response = HttpResponse(entry["content"], content_type=entry["content_type"])
+            response["X-Cache"] = "HIT"
+            self.cache_results.hit.inc()
+            return set_validators(response, version)
+
+        # Remember the version *before* reading the DB: if content changes
+        # while we render, the entry is already stale and will be rebuilt.
+        self._content_version = version
+        return super().get(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        patch_vary_headers(response, ("Accept",))
+        version = getattr(self, "_content_version", None)
+        if version is None or response.status_code != 200:
+            return response
+
+        set_validators(response, version)
+        if not self._cache_enabled(request) or response.cookies:
+            return response
+
+        response.render()
+        get_cache().set(
+            self.get_cache_key(request),
+            {
+                "generations": version.generations,
+                "content": response.content,
+                "content_type": response["Content-Type"],
+            },
+            timeout=getattr(settings, "PAGES_CACHE_TIMEOUT", 3600),
+        )
+        response["X-Cache"] = "MISS"
+        self.cache_results.miss.inc()
+        return response
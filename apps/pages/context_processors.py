@@ -0,0 +1,17 @@
+"""Template context processors for the pages application."""
+
+from __future__ import annotations
+
+from django.utils.functional import SimpleLazyObject
+
+from .site import get_site_snapshot
+
+
+def site(request):
+    """Expose the site content snapshot as ``site`` in every template.
+
+    Lazy: templates that never touch ``site`` (admin, API browsable pages)
+    do not pay for the generation check.
+    """
+
+    return {"site": SimpleLazyObject(get_site_snapshot)}
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0007_service_delay_service_icon'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='is_active',
+            field=models.BooleanField(blank=True, default=True),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='is_active',
+            field=models.BooleanField(blank=True, default=True),
+        ),
+    ]
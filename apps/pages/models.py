@@ -9,6 +9,7 @@ class Menu(models.Model):
     slug = models.SlugField(max_length=200, blank=True)
     hasChild = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [models.Index(fields=['-title']), ]
@@ -20,13 +21,14 @@ class Menu(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
-            super().save(*args, **kwargs)
+        super().save(*args, **kwargs)
 
 
 class MenuItem(models.Model):
     title = models.CharField(max_length=20)
     link = models.CharField(max_length=20, default='', blank=True)
     menu = models.ForeignKey(Menu, related_name='items', on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [models.Index(fields=['-title']), ]
@@ -44,6 +46,8 @@ class Service(models.Model):
     url = models.CharField(max_length=20, default='', blank=True)
     icon = models.CharField(max_length=20,default='fa', blank=True)
     delay = models.CharField(max_length=4,default='0.2s', blank=True)
+    is_active = models.BooleanField(default=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.title
@@ -51,7 +55,7 @@ class Service(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
-            super().save(*args, **kwargs)
+        super().save(*args, **kwargs)
 
 
 class Link(models.Model):
@@ -60,6 +64,8 @@ class Link(models.Model):
     resume = models.TextField(default='', blank=True)
     description = models.TextField(default='', blank=True)
     url = models.CharField(max_length=20, default='', blank=True)
+    is_active = models.BooleanField(default=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.title
@@ -67,7 +73,7 @@ class Link(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
-            super().save(*args, **kwargs)
+        super().save(*args, **kwargs)
 
 
 class Address(models.Model):
@@ -82,6 +88,7 @@ class Address(models.Model):
     instagram = models.CharField(max_length=200, default='', blank=True)
     youtube = models.CharField(max_length=200, default='', blank=True)
     github = models.CharField(max_length=200, default='', blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.sitename
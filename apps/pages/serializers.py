@@ -19,6 +19,11 @@ class ServiceSerializer(serializers.ModelSerializer):
         model = Service
         fields = '__all__'
 
+class LinkSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Link
+        fields = '__all__'
+
 class AddressSerializer(serializers.ModelSerializer):
     class Meta:
         model = Address
@@ -0,0 +1,27 @@
+"""Cache invalidation for pages content.
+
+Any write to a content model bumps its generation counter so cached API
+responses (see cache.py) built from the old content are never served again.
+"""
+
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save
+
+from .cache import bump_generation, model_label
+from .models import Address, Link, Menu, MenuItem, Service
+
+CONTENT_MODELS = (Menu, MenuItem, Service, Link, Address)
+
+
+def invalidate_content_cache(sender, **kwargs):
+    """Bump the generation of the model that was written."""
+
+    bump_generation(model_label(sender))
+
+
+def connect_signals() -> None:
+    for model in CONTENT_MODELS:
+        uid = f"pages-cache-{model_label(model)}"
+        post_save.connect(invalidate_content_cache, sender=model, dispatch_uid=uid)
+        post_delete.connect(invalidate_content_cache, sender=model, dispatch_uid=uid)
@@ -0,0 +1,82 @@
+"""Site-wide content shared by every marketing page.
+
+Templates need the site address, the active services and the navigation
+menus on every render. Instead of a module-level dict filled at import time
+(which queried the DB during worker boot and was mutated by concurrent
+requests), each process keeps an immutable snapshot:
+
+- The snapshot is tagged with the content generations it was built from
+  (see cache.py).
+- A request only checks the generations (one cache round trip); the DB is
+  queried again only after an admin edit bumps a generation.
+- Snapshots are never mutated, so threads can share them freely.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from .cache import get_generations, model_label
+from .models import Address, Menu, MenuItem, Service
+
+SITE_MODELS = (Address, Service, Menu, MenuItem)
+
+
+@dataclass(frozen=True)
+class SiteSnapshot:
+    """Read-only view of the site content used by templates."""
+
+    address: Address | None
+    services: tuple[Service, ...]
+    menus: tuple[Menu, ...]
+    #: Opaque content version, used as the ``{% cache %}`` fragment key.
+    version: str = ""
+
+    @property
+    def cache_timeout(self) -> int:
+        return getattr(settings, "PAGES_CACHE_TIMEOUT", 3600)
+
+
+_lock = threading.Lock()
+_current: tuple[dict[str, int], SiteSnapshot] | None = None
+
+
+def _build(generations: dict[str, int]) -> SiteSnapshot:
+    raw = ";".join(f"{label}={gen}" for label, gen in sorted(generations.items()))
+    raw += "|" + getattr(settings, "PAGES_ETAG_SALT", "")
+    return SiteSnapshot(
+        address=Address.objects.first(),
+        services=tuple(Service.objects.filter(is_active=True)),
+        menus=tuple(Menu.objects.filter(is_active=True).prefetch_related("items")),
+        version=hashlib.md5(raw.encode()).hexdigest(),  # noqa: S324
+    )
+
+
+def get_site_snapshot() -> SiteSnapshot:
+    """Return the snapshot for the current content generation."""
+
+    global _current
+
+    generations = get_generations(model_label(model) for model in SITE_MODELS)
+    current = _current
+    if current is not None and current[0] == generations:
+        return current[1]
+
+    with _lock:
+        # Another thread may have rebuilt it while we waited.
+        current = _current
+        if current is None or current[0] != generations:
+            current = (generations, _build(generations))
+            _current = current
+    return current[1]
+
+
+def reset_site_snapshot() -> None:
+    """Drop the process-local snapshot (tests, management commands)."""
+
+    global _current
+    _current = None
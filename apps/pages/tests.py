@@ -1,3 +1,309 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from apps.pages import asyncviews
+from apps.pages.cache import generation_key, get_generations
+from apps.pages.models import Address, Link, Menu, MenuItem, Service
+from apps.pages.site import get_site_snapshot, reset_site_snapshot
+from apps.users.models import User
+from apps.utils import metrics
+from apps.utils.ratelimit import AnonRateThrottle, reset_limiter
+
+PLAIN_STATIC = {
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+class ContentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.menu = Menu.objects.create(title="Home", link="/")
+        MenuItem.objects.create(title="About", link="/about/", menu=self.menu)
+        Service.objects.create(title="Consulting")
+
+    def test_second_request_is_served_without_queries(self):
+        first = self.client.get("/api/menus/")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/menus/")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+
+    def cache_result_counts(self):
+        results = asyncviews.MenuListView.cache_results  # shared with MenuListAPIView
+        return [getattr(results, result)._value.get() for result in metrics.CACHE_RESULTS]
+
+    def test_hits_and_misses_are_counted_per_endpoint(self):
+        before = self.cache_result_counts()
+        first = self.client.get("/api/menus/")
+        self.client.get("/api/menus/")
+        self.client.get("/api/menus/", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        # One more hit, miss and not_modified each.
+        self.assertEqual(self.cache_result_counts(), [n + 1 for n in before])
+
+    def test_save_invalidates_cached_response(self):
+        self.client.get("/api/services/")
+        Service.objects.create(title="Audit")
+
+        response = self.client.get("/api/services/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_related_model_delete_invalidates_menu_cache(self):
+        self.client.get("/api/menus/")
+        MenuItem.objects.all().delete()
+
+        response = self.client.get("/api/menus/")
+        self.assertEqual(response.json()["results"][0]["items"], [])
+
+    def test_pagination_parameters_are_cached_separately(self):
+        Service.objects.create(title="Audit")
+        full = self.client.get("/api/services/")
+        page = self.client.get("/api/services/?limit=1")
+        self.assertNotEqual(full.content, page.content)
+        self.assertEqual(len(page.json()["results"]), 1)
+
+    def test_evicted_generation_does_not_resurrect_stale_entries(self):
+        Address.objects.create(street="1 rue", email="a@example.com", daily="9-5", phone="1")
+        before = get_generations(["pages.address"])["pages.address"]
+        cache.delete(generation_key("pages.address"))
+
+        after = get_generations(["pages.address"])["pages.address"]
+        self.assertGreater(after, before)
+
+    # Checking on every request costs a query per model beyond the budgets.
+    @override_settings(PAGES_CACHE_REVALIDATE_INTERVAL=0, QUERY_BUDGET_MODE="off")
+    def test_local_cache_sees_writes_of_other_processes(self):
+        # LocMemCache is per process: a write served by another worker bumps
+        # *its* counter only. Simulate it with an update that sends no signal.
+        self.client.get("/api/services/")
+        self.client.get("/api/services/")  # records the database state
+        Service.objects.update(title="Audit", updated_at=timezone.now())
+
+        response = self.client.get("/api/services/")
+        self.assertEqual(response.json()["results"][0]["title"], "Audit")
+
+        with self.assertNumQueries(1):  # state check only
+            self.assertEqual(self.client.get("/api/services/")["X-Cache"], "HIT")
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Address.objects.create(street="1 rue", email="a@example.com", daily="9-5", phone="1")
+        Menu.objects.create(title="Home", link="/")
+
+    def test_api_response_carries_validators(self):
+        response = self.client.get("/api/info/")
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", response)
+
+    def test_matching_etag_returns_304_without_queries(self):
+        etag = self.client.get("/api/menus/")["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/menus/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_etag_is_per_representation(self):
+        json_etag = self.client.get("/api/menus/")["ETag"]
+        page_etag = self.client.get("/api/menus/?limit=1")["ETag"]
+        api = self.client.get("/api/menus/", HTTP_ACCEPT="text/html")
+        self.assertEqual(len({json_etag, page_etag, api["ETag"]}), 3)
+        self.assertIn("Accept", api["Vary"])
+
+        response = self.client.get("/api/menus/?limit=1", HTTP_IF_NONE_MATCH=json_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_browsable_api_pages_are_not_shared(self):
+        staff = User.objects.create_user(email="staff@example.com", is_staff=True)
+        self.client.force_login(staff)
+        self.client.get("/api/menus/", HTTP_ACCEPT="text/html")
+        self.client.logout()
+
+        response = self.client.get("/api/menus/", HTTP_ACCEPT="text/html")
+        self.assertNotIn("X-Cache", response)
+        self.assertNotContains(response, "staff@example.com")
+
+    def test_if_modified_since_returns_304(self):
+        last_modified = self.client.get("/api/info/")["Last-Modified"]
+        response = self.client.get("/api/info/", HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get("/api/info/")["ETag"]
+        Address.objects.update(phone="2")  # bulk update: no signal, ETag unchanged
+        self.assertEqual(self.client.get("/api/info/")["ETag"], etag)
+
+        Address.objects.get().save()
+        response = self.client.get("/api/info/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_legacy_view_returns_304_before_querying(self):
+        etag = self.client.get("/menus/")["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/menus/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class SiteContextTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_site_snapshot()
+        self.address = Address.objects.create(
+            street="1 rue", email="contact@example.com", daily="9-5", phone="0102"
+        )
+        Service.objects.create(title="Consulting", resume="We advise.")
+
+    def test_snapshot_is_built_once_per_generation(self):
+        first = get_site_snapshot()
+        with self.assertNumQueries(0):
+            self.assertIs(get_site_snapshot(), first)
+
+        self.address.phone = "0304"
+        self.address.save()
+        self.assertEqual(get_site_snapshot().address.phone, "0304")
+
+    def test_pages_render_site_content(self):
+        for url in ("/", "/services/", "/about/"):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, "contact@example.com")
+
+        self.assertContains(self.client.get("/services/"), "We advise.")
+
+    def test_pages_render_without_address(self):
+        self.address.delete()
+        self.assertEqual(self.client.get("/").status_code, 200)
+        self.assertEqual(self.client.get("/info/").status_code, 404)
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_site_snapshot()
+        Address.objects.create(street="1 rue", email="contact@example.com", daily="9-5", phone="1")
+        Service.objects.create(title="Consulting", resume="We advise.")
+
+    def test_anonymous_page_is_served_from_cache(self):
+        self.assertEqual(self.client.get("/services/")["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/services/")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertContains(response, "We advise.")
+
+    def test_page_cache_is_invalidated_by_content_change(self):
+        self.client.get("/services/")
+        Service.objects.create(title="Audit", resume="We check.")
+
+        response = self.client.get("/services/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertContains(response, "We check.")
+
+    def test_authenticated_renders_bypass_page_cache_but_reuse_fragments(self):
+        from apps.users.models import User
+
+        self.client.force_login(User.objects.create(email="staff@example.com"))
+        self.client.get("/about/")
+
+        response = self.client.get("/about/")
+        self.assertNotIn("X-Cache", response)
+        self.assertContains(response, "contact@example.com")
+        fragment = make_template_fragment_key("navbar", [get_site_snapshot().version])
+        self.assertIsNotNone(cache.get(fragment))
+
+
+class AsyncAPITests(TestCase):
+    def setUp(self):
+        cache.clear()
+        menu = Menu.objects.create(title="Home", link="/")
+        MenuItem.objects.create(title="About", link="/about/", menu=menu)
+        Menu.objects.create(title="Blog", link="/blog/")
+        Service.objects.create(title="Consulting")
+        Link.objects.create(title="Docs", url="/docs/")
+        Address.objects.create(street="1 rue", email="a@example.com", daily="9-5", phone="1")
+        self.factory = AsyncRequestFactory()
+        reset_limiter()
+        self.addCleanup(reset_limiter)
+
+    async def call(self, view, path, **headers):
+        return await view.as_view()(self.factory.get(path, headers=headers))
+
+    async def test_payloads_match_drf_views(self):
+        cases = [
+            (asyncviews.MenuListView, "/api/menus/?limit=1&offset=1"),
+            (asyncviews.ServiceListView, "/api/services/"),
+            (asyncviews.LinkListView, "/api/links/"),
+            (asyncviews.AddressDetailView, "/api/info/"),
+        ]
+        for view, path in cases:
+            with self.subTest(path=path):
+                response = await self.call(view, path)
+                expected = await self.async_client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertJSONEqual(response.content, expected.json())
+                self.assertEqual(response["ETag"], expected["ETag"])
+
+    async def test_cached_and_conditional(self):
+        first = await self.call(asyncviews.ServiceListView, "/api/services/")
+        self.assertEqual(first["X-Cache"], "MISS")
+        second = await self.call(asyncviews.ServiceListView, "/api/services/")
+        self.assertEqual(second["X-Cache"], "HIT")
+
+        response = await self.call(
+            asyncviews.ServiceListView, "/api/services/", if_none_match=first["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(RATELIMIT_REDIS_URL="")
+    async def test_anon_rate_limit_is_shared_with_drf_views(self):
+        with mock.patch.dict(AnonRateThrottle.THROTTLE_RATES, {"anon": "2/hour"}):
+            await self.async_client.get("/api/links/")  # DRF view, same bucket
+            allowed = await self.call(asyncviews.LinkListView, "/api/links/")
+            request = self.factory.get("/api/links/")
+            throttled = await asyncviews.LinkListView.as_view()(request)
+        self.assertEqual(allowed.status_code, 200)
+        self.assertEqual(throttled.status_code, 429)
+        self.assertEqual(request.ratelimit.headers()["X-RateLimit-Limit"], "2")
+        self.assertIn("Retry-After", request.ratelimit.headers())
+
+    def test_base_views_are_abstract(self):
+        with self.assertRaises(TypeError):
+            asyncviews.AsyncListView()
+
+
+@override_settings(STORAGES=PLAIN_STATIC, QUERY_BUDGET_MODE="raise")
+class QueryBudgetContractTests(TestCase):
+    """Every pages endpoint stays within its declared budget on a cold cache."""
+
+    def setUp(self):
+        for title in ("Home", "Blog", "Shop"):
+            menu = Menu.objects.create(title=title, link="/")
+            MenuItem.objects.create(title="One", link="/1/", menu=menu)
+            MenuItem.objects.create(title="Two", link="/2/", menu=menu)
+            Service.objects.create(title=title)
+            Link.objects.create(title=title, url="/")
+        Address.objects.create(street="1 rue", email="a@example.com", daily="9-5", phone="1")
+
+    def test_cold_cache_requests(self):
+        paths = ["/", "/services/", "/about/", "/menus/", "/info/"]
+        paths += ["/api/menus/", "/api/services/", "/api/links/", "/api/info/"]
+        for path in paths:
+            with self.subTest(path=path):
+                cache.clear()
+                reset_site_snapshot()
+                self.assertEqual(self.client.get(path).status_code, 200)
@@ -1,12 +1,30 @@
+from django.conf import settings
 from django.urls import path
 from .views import *
 from .apiviews import *
+from . import asyncviews
 
 urlpatterns = [
     path("", home, name="home"),
-    path("services/", ServicesView.as_view(), name="services"),
-    path("links/", LinksView.as_view(), name="links"),
+    path("services/", services, name="services"),
     path("about/", about, name="about"),
     path("menus/", menus_list, name="menus"),
     path("info/", get_info, name="info"),
 ]
+
+# Public read-only API (cached, see apps/pages/cache.py). Under ASGI the
+# native async variants avoid a sync_to_async hop per request.
+if settings.ASYNC_VIEWS_ENABLED:
+    urlpatterns += [
+        path("api/menus/", asyncviews.MenuListView.as_view(), name="api_menus"),
+        path("api/services/", asyncviews.ServiceListView.as_view(), name="api_services"),
+        path("api/links/", asyncviews.LinkListView.as_view(), name="api_links"),
+        path("api/info/", asyncviews.AddressDetailView.as_view(), name="api_info"),
+    ]
+else:
+    urlpatterns += [
+        path("api/menus/", MenuListAPIView.as_view(), name="api_menus"),
+        path("api/services/", ServiceListAPIView.as_view(), name="api_services"),
+        path("api/links/", LinkListAPIView.as_view(), name="api_links"),
+        path("api/info/", AddressDetailAPIView.as_view(), name="api_info"),
+    ]
@@ -1,45 +1,66 @@
 from django.shortcuts import render
 from .models import *
-from django.http import JsonResponse
+from django.http import Http404
 from django.views.decorators.csrf import csrf_exempt
 
-from .serializers import *
+from apps.utils.dbrouter import read_from_replica
+from apps.utils.fastjson import FastJsonResponse
+from apps.utils.querybudget import QueryBudget
 
-context = dict()    
-context['address'] = Address.objects.get(pk=2)
+from .cache import conditional_content
+from .serializers import *
+from .site import get_site_snapshot
 
+# Site-wide data (address, services, menus) comes from the ``site`` context
+# processor (see site.py); views only pass page-specific context.
 
 
+@QueryBudget(6)
+@read_from_replica
+@conditional_content(Service, Address, cache_anonymous=True)
 def home(request):
     """" Home page.""" 
-    context['services'] = Service.objects.all()
-    return render(request, 'pages/index.html', {'context': context})
+    return render(request, 'pages/index.html')
 
 
+@QueryBudget(6)
+@read_from_replica
+@conditional_content(Service, Address, cache_anonymous=True)
 def services(request):
     """ Services page. """
-    context['services'] = Service.objects.all()
-    return render(request, 'pages/services.html', {'context': context})
+    page = {'title': 'Services', 'name': 'Services'}
+    return render(request, 'pages/services.html', {'page': page})
 
 
+@QueryBudget(6)
+@read_from_replica
+@conditional_content(Service, Address, cache_anonymous=True)
 def about(request):
     """ About page. """
-    context['services'] = Service.objects.all()
-    return render(request, 'pages/about.html', {'context': context})
+    page = {'title': 'About Us', 'name': 'About'}
+    return render(request, 'pages/about.html', {'page': page})
 
 
+@QueryBudget(4)
+@read_from_replica
 @csrf_exempt
+@conditional_content(Menu, MenuItem)
 def menus_list(request):
     """ List all menus. """
     if request.method == 'GET':
-        menus = Menu.objects.all()
+        menus = Menu.objects.prefetch_related('items')
         serializer = MenuSerializer(menus, many=True)
-        return JsonResponse(serializer.data, safe=False)
+        return FastJsonResponse(serializer.data, safe=False)
 
+@QueryBudget(5)
+@read_from_replica
 @csrf_exempt
+@conditional_content(Address)
 def get_info(request):
     """ Get informations. """    
     if request.method == 'GET':
-        infos = Address.objects.get(pk=2)
+        infos = get_site_snapshot().address
+        if infos is None:
+            raise Http404("No site address configured.")
         serializer = AddressSerializer(infos)
-        return JsonResponse(serializer.data, safe=False)
+        return FastJsonResponse(serializer.data, safe=False)
@@ -0,0 +1,159 @@
+"""Stateless JWT authentication.
+
+``JWTAuthentication`` loads the ``User`` row on every authenticated request.
+The access token is signed by us and already names the user, so
+:class:`ClaimsJWTAuthentication` builds a :class:`ClaimsUser` straight from
+its claims (``id``, ``email``, ``role``, ``is_staff``, ``is_superuser``,
+``is_active``, ``activated``; see ``add_user_claims`` in tokens.py).
+Permission checks such as ``IsAuthenticated`` / ``IsAdminUser`` therefore
+need no query.
+
+The real row is loaded lazily, the first time a view reads an attribute
+outside the claims. It comes from a short-TTL per-process cache
+(``USERS_AUTH_CACHE_TTL``) that ``post_save`` / ``post_delete`` on ``User``
+invalidate (see signals.py).
+
+Notes
+-----
+- Claims are as fresh as the access token: a role or staff change is seen
+  on the next refresh (``ACCESS_TOKEN_LIFETIME``), which re-stamps them.
+- Tokens issued without the claims, or ``CHECK_REVOKE_TOKEN``, fall back to
+  the stock database lookup.
+- A ``ClaimsUser`` is not a model instance: pass ``request.user.instance``
+  where a ``User`` is required (foreign keys, ``save()``).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import USER_CLAIMS
+
+
+class _UserCache:
+    """Thread-safe, size-bounded ``pk -> (user, valid_until)`` map."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pk):
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop(pk, None)
+                return None
+            self._entries.move_to_end(pk)
+            return entry[0]
+
+    def put(self, pk, user, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[pk] = (user, time.monotonic() + ttl)
+            self._entries.move_to_end(pk)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, pk) -> None:
+        with self._lock:
+            self._entries.pop(pk, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_users = _UserCache()
+
+
+def get_cached_user(pk):
+    """Return the ``User`` with ``pk`` from the per-process cache or the DB."""
+
+    pk = str(pk)  # token claims carry the id as a string
+    user = _users.get(pk)
+    if user is None:
+        User = get_user_model()
+        user = User._default_manager.filter(**{api_settings.USER_ID_FIELD: pk}).first()
+        if user is not None:
+            _users.put(pk, user, getattr(settings, "USERS_AUTH_CACHE_TTL", 30))
+    return user
+
+
+def invalidate_cached_user(pk) -> None:
+    _users.discard(str(pk))
+
+
+def reset_user_cache() -> None:
+    _users.clear()
+
+
+class ClaimsUser(TokenUser):
+    """User backed by verified token claims, loading the row only on demand."""
+
+    @cached_property
+    def instance(self):
+        """The real ``User`` (one cached lookup, on first use)."""
+
+        return get_cached_user(self.id)
+
+    @property
+    def is_active(self) -> bool:
+        return self.token.get("is_active", True)
+
+    @property
+    def groups(self):
+        return self.instance.groups
+
+    @property
+    def user_permissions(self):
+        return self.instance.user_permissions
+
+    def get_username(self) -> str:
+        return self.token.get("email", "")
+
+    def get_all_permissions(self, obj=None) -> set:
+        return self.instance.get_all_permissions(obj)
+
+    def has_perm(self, perm, obj=None) -> bool:
+        return self.instance.has_perm(perm, obj)
+
+    def has_perms(self, perm_list, obj=None) -> bool:
+        return self.instance.has_perms(perm_list, obj)
+
+    def has_module_perms(self, module) -> bool:
+        return self.instance.has_module_perms(module)
+
+    def __getattr__(self, attr):
+        if attr in USER_CLAIMS:
+            return self.token.get(attr)
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.instance, attr)
+
+    def __str__(self) -> str:
+        return self.token.get("email", "")
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` without the per-request ``User`` query."""
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN or any(
+            claim not in validated_token for claim in USER_CLAIMS
+        ):
+            return super().get_user(validated_token)
+        user = ClaimsUser(validated_token)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            return super().get_user(validated_token)  # raises "User is inactive"
+        return user
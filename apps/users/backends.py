@@ -0,0 +1,46 @@
+"""Authentication backends."""
+
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+
+from .hashing import get_hash_pool
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """``ModelBackend`` that verifies passwords on the bounded hash pool.
+
+    The user lookup and any password upgrade save stay on the request thread
+    (DB connections are thread-local); only the hash runs on the pool. Used by
+    every ``authenticate()`` call: JWT token obtain, ``AuthTokenSerializer``
+    and the admin login.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        pool = get_hash_pool()
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so response time does not reveal unknown emails.
+            pool.run(make_password, password)
+            return None
+
+        needs_upgrade = []
+        valid = pool.run(check_password, password, user.password, needs_upgrade.append)
+        if not (valid and self.user_can_authenticate(user)):
+            return None
+
+        if needs_upgrade:
+            # Hasher/iterations changed since the password was set.
+            user.password = pool.run(make_password, password)
+            user.save(update_fields=["password"])
+        return user
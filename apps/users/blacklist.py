@@ -0,0 +1,189 @@
+"""Cached SimpleJWT token blacklist.
+
+With ``ROTATE_REFRESH_TOKENS`` and ``BLACKLIST_AFTER_ROTATION`` every refresh
+and verify asks the database whether the token's JTI is blacklisted. The
+answer is almost always "no", and once a JTI is blacklisted it stays so
+until the token expires, so both answers cache well:
+
+1. A per-process LRU of recently checked JTIs. Blacklisted entries are kept
+   until the token expires. "Not blacklisted" entries are kept for only
+   ``JWT_BLACKLIST_NEGATIVE_TTL`` seconds (0 disables them), because another
+   process may blacklist the token at any time.
+2. One cache key per blacklisted JTI in the shared cache (Redis in
+   production). Each key expires with its token.
+
+Blacklisting writes to the database first, then to both tiers.
+
+Negative cache
+--------------
+A missing shared key can only prove "not blacklisted" if the shared tier
+holds *every* blacklisted JTI, for every process. That requires a cache
+that all workers share and that never evicts keys, so it is only trusted
+when the backend is shared (not ``LocMemCache``, where each worker sees only
+its own writes) and ``JWT_BLACKLIST_CACHE_NOEVICTION`` is set (Redis with
+``maxmemory-policy noeviction``). Otherwise a token blacklisted through one
+worker could be replayed against another, so a miss always asks the
+database; only positive answers are served from the cache.
+
+When trusted, :func:`warm_blacklist` copies the unexpired blacklist from
+the database and then sets a ``loaded`` marker. While the marker exists, a
+miss skips the database entirely. This is the exact equivalent of a bloom
+filter's "definitely absent" answer, with no false positives. Without the
+marker (cold or flushed cache), lookups fall back to the database and one
+process re-warms the tier every ``JWT_BLACKLIST_REWARM_INTERVAL`` seconds.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from apps.utils.cache import is_shared_cache
+
+KEY_PREFIX = "jwt:bl"
+LOADED_KEY = f"{KEY_PREFIX}:loaded"
+WARM_LOCK_KEY = f"{KEY_PREFIX}:warming"
+
+
+def get_cache():
+    """Return the shared cache backend holding blacklisted JTIs."""
+
+    return caches[getattr(settings, "JWT_BLACKLIST_CACHE_ALIAS", "default")]
+
+
+def negative_cache_trusted(cache) -> bool:
+    """Whether a missing key in ``cache`` proves a JTI is not blacklisted."""
+
+    return is_shared_cache(cache) and getattr(settings, "JWT_BLACKLIST_CACHE_NOEVICTION", False)
+
+
+def jti_key(jti: str) -> str:
+    return f"{KEY_PREFIX}:{jti}"
+
+
+def _max_timeout() -> int:
+    return int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+
+
+def _remaining(exp: int | None) -> int:
+    """Seconds until ``exp`` (a token's ``exp`` claim), capped at the refresh lifetime."""
+
+    if exp is None:
+        return _max_timeout()
+    return max(1, min(int(exp - time.time()), _max_timeout()))
+
+
+class _RecentJTIs:
+    """Thread-safe LRU of ``jti -> (blacklisted, valid_until)``."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[bool, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, jti: str) -> bool | None:
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[jti]
+                return None
+            self._entries.move_to_end(jti)
+            return entry[0]
+
+    def put(self, jti: str, blacklisted: bool, ttl: float) -> None:
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[jti] = (blacklisted, time.monotonic() + ttl)
+            self._entries.move_to_end(jti)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_recent = _RecentJTIs(getattr(settings, "JWT_BLACKLIST_LRU_SIZE", 10_000))
+
+
+def reset_local_blacklist() -> None:
+    """Forget the per-process tier (tests, after fork)."""
+
+    _recent.clear()
+
+
+def remember_blacklisted(jti: str, exp: int | None = None) -> None:
+    """Record a blacklisted JTI in both tiers (call after the DB write)."""
+
+    timeout = _remaining(exp)
+    get_cache().set(jti_key(jti), 1, timeout=timeout)
+    _recent.put(jti, True, timeout)
+
+
+def is_blacklisted(jti: str, exp: int | None = None) -> bool:
+    """Return whether ``jti`` is blacklisted, from the cache when it can prove it."""
+
+    local = _recent.get(jti)
+    if local is not None:
+        return local
+
+    cache = get_cache()
+    trusted = negative_cache_trusted(cache)
+    found = cache.get_many([jti_key(jti), LOADED_KEY] if trusted else [jti_key(jti)])
+    if jti_key(jti) in found:
+        blacklisted = True
+    elif LOADED_KEY in found:
+        blacklisted = False
+    else:
+        blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        if blacklisted:
+            cache.set(jti_key(jti), 1, timeout=_remaining(exp))
+        if trusted and cache.add(WARM_LOCK_KEY, 1, timeout=60):
+            warm_blacklist()
+
+    if blacklisted:
+        _recent.put(jti, True, _remaining(exp))
+    else:
+        _recent.put(jti, False, getattr(settings, "JWT_BLACKLIST_NEGATIVE_TTL", 0))
+    return blacklisted
+
+
+def warm_blacklist(chunk_size: int = 2000) -> int:
+    """Copy every unexpired blacklisted JTI into the shared tier; return how many."""
+
+    cache = get_cache()
+    now = aware_utcnow()
+    rows = (
+        BlacklistedToken.objects.filter(token__expires_at__gt=now)
+        .values_list("token__jti", flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+    total = 0
+    batch: dict[str, int] = {}
+    for jti in rows:
+        batch[jti_key(jti)] = 1
+        if len(batch) >= chunk_size:
+            cache.set_many(batch, timeout=_max_timeout())
+            total += len(batch)
+            batch = {}
+    if batch:
+        cache.set_many(batch, timeout=_max_timeout())
+        total += len(batch)
+
+    cache.set(
+        LOADED_KEY,
+        time.time(),
+        timeout=getattr(settings, "JWT_BLACKLIST_REWARM_INTERVAL", 3600),
+    )
+    cache.delete(WARM_LOCK_KEY)
+    return total
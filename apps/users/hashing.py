@@ -0,0 +1,140 @@
+"""Bounded worker pool for password hashing.
+
+A PBKDF2 verification takes a large slice of CPU time. Running it on the request
+thread means a burst of logins occupies every gunicorn thread and starves
+all other endpoints. Instead, hashing runs in a small dedicated thread pool
+(``hashlib.pbkdf2_hmac`` releases the GIL, so hashes run in parallel with
+request threads) with admission control:
+
+- At most ``AUTH_HASH_MAX_IN_FLIGHT`` hashes are admitted per process,
+  running or queued. Each admitted request blocks its thread until its hash
+  is done, so the default (``GUNICORN_THREADS - 1``) always leaves a thread
+  for other traffic. Beyond that the request fails fast with
+  ``503 Service Unavailable`` and ``Retry-After``.
+- ``AUTH_HASH_POOL_SIZE`` threads run the admitted hashes.
+- Outside DRF (``authenticate()`` from the admin login) the 503 comes from
+  :class:`HashPoolSaturatedMiddleware`.
+- Hash time, queue wait, in-flight count and rejections are exported to
+  Prometheus (see apps/utils/metrics.py).
+
+The pool is created lazily so it is never inherited across a fork.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from apps.utils import metrics
+
+
+class HashPoolSaturated(APIException):
+    """Too many concurrent password hashes: ask the client to retry later."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Authentication is temporarily busy, please retry shortly.")
+    default_code = "authentication_busy"
+
+    def __init__(self, detail=None, code=None, wait: int | None = None):
+        super().__init__(detail, code)
+        # DRF's exception handler turns ``wait`` into a Retry-After header.
+        self.wait = wait if wait is not None else getattr(settings, "AUTH_HASH_RETRY_AFTER", 1)
+
+
+class PasswordHashPool:
+    """Run hash functions on a bounded pool, rejecting work when saturated."""
+
+    def __init__(self, workers: int, max_in_flight: int, timeout: float):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=min(workers, max_in_flight), thread_name_prefix="password-hash"
+        )
+        # Queued hashes hold a slot too: their request threads are blocked.
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+
+    def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            metrics.password_hash_rejected_total.inc()
+            raise HashPoolSaturated()
+
+        metrics.password_hash_in_flight.inc()
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            metrics.password_hash_queue_wait_seconds.observe(started - submitted)
+            try:
+                return func(*args)
+            finally:
+                metrics.password_hash_seconds.observe(time.perf_counter() - started)
+
+        future = self._executor.submit(task)
+        # The slot is held until the hash really finishes, even if we time out.
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError as exc:
+            raise HashPoolSaturated() from exc
+
+    def _release(self, future) -> None:
+        metrics.password_hash_in_flight.dec()
+        self._slots.release()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: PasswordHashPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_hash_pool() -> PasswordHashPool:
+    """Return the process-wide pool, creating it on first use."""
+
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                threads = getattr(settings, "SERVER_THREADS", 4)
+                _pool = PasswordHashPool(
+                    workers=getattr(settings, "AUTH_HASH_POOL_SIZE", 2),
+                    max_in_flight=getattr(settings, "AUTH_HASH_MAX_IN_FLIGHT", max(1, threads - 1)),
+                    timeout=getattr(settings, "AUTH_HASH_TIMEOUT", 10.0),
+                )
+    return _pool
+
+
+def reset_hash_pool() -> None:
+    """Discard the pool (after fork, on settings change, in tests)."""
+
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+
+
+class HashPoolSaturatedMiddleware(MiddlewareMixin):
+    """Answer :class:`HashPoolSaturated` raised by plain Django views with a 503.
+
+    DRF views turn it into a 503 themselves; Django's ``authenticate()`` (the
+    admin login) would let it escape as a 500.
+    """
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashPoolSaturated):
+            return None
+        response = HttpResponse(
+            str(exception.detail), status=exception.status_code, content_type="text/plain"
+        )
+        response["Retry-After"] = str(exception.wait)
+        return response
@@ -0,0 +1,23 @@
+"""Entry point of the password hashing processes used by bulk imports.
+
+The pool (see imports.py) uses the ``spawn`` start method: the workers are
+fresh interpreters, not forks of a multi-threaded gunicorn worker. A spawned
+process unpickles its initializer *before* Django is set up, so this module
+must not import models, DRF or anything else that needs the app registry.
+"""
+
+from __future__ import annotations
+
+import os
+
+
+def init_hash_worker(settings_module: str, password_hashers: list[str]) -> None:  # pragma: no cover
+    """Set Django up with the parent's settings module and password hashers."""
+
+    import django
+    from django.conf import settings
+
+    os.environ["DJANGO_SETTINGS_MODULE"] = settings_module
+    django.setup()
+    # Hash exactly like the parent, even if it changed the hashers at runtime.
+    settings.PASSWORD_HASHERS = password_hashers
@@ -0,0 +1,299 @@
+"""Bulk user import.
+
+Creating users one request at a time costs a ``UniqueValidator`` query, a
+PBKDF2 hash on the request thread and an ``INSERT`` per user. The importer
+processes a whole file instead:
+
+1. Rows (JSON objects or CSV lines) are validated in memory with a plain
+   serializer: no per-row uniqueness query.
+2. Email uniqueness is checked with one ``email__in`` query per batch, and
+   duplicates inside the file are rejected.
+3. Passwords are hashed in a process pool (hashing is CPU bound and holds
+   the GIL, so threads would not help).
+4. Users are inserted with ``bulk_create`` in configurable batches.
+
+The result is a per-row report: rows that fail validation or collide with an
+existing email are listed with their errors, everything else is created.
+
+Notes
+-----
+- The hashing pool is created once per process, on first use, and reused
+  by every batch and import. It uses the ``spawn`` start method (forking a
+  multi-threaded gunicorn worker is unsafe) and the workers load the
+  parent's settings module (see hashworker.py).
+- Imports above ``USERS_IMPORT_SYNC_LIMIT`` rows do not run on the request:
+  :func:`start_import_job` records a :class:`~.models.UserImportJob` and
+  runs it on a single background thread per process, so thousands of
+  PBKDF2 hashes never hit the gunicorn timeout. ``manage.py import_users``
+  remains the tool for very large files.
+- A queued job only lives in the memory of the worker that accepted it
+  (the rows include plain-text passwords, which are never stored). If that
+  worker dies or is recycled first, ``manage.py fail_stale_imports`` (run
+  periodically, see docker-compose.yml) marks the job FAILED once it is
+  older than ``USERS_IMPORT_JOB_TIMEOUT`` seconds, so clients stop polling
+  and upload the file again.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from apps.utils.fastjson import loads
+
+from .hashworker import init_hash_worker
+from .models import User, UserImportJob
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FIELDS = ("email", "password", "name", "role")
+
+
+class BulkUserRowSerializer(serializers.Serializer):
+    """Validation of one imported row (uniqueness is checked per batch)."""
+
+    email = serializers.EmailField()
+    password = serializers.CharField(min_length=8, trim_whitespace=False)
+    name = serializers.CharField(max_length=255, required=False, allow_blank=True, default="")
+    role = serializers.ChoiceField(choices=User.Types.choices, default=User.Types.CUSTOMER)
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def add_error(self, row: int, email, errors) -> None:
+        self.errors.append({"row": row, "email": email, "errors": errors})
+
+    def as_dict(self) -> dict:
+        return {"created": self.created, "failed": len(self.errors), "errors": self.errors}
+
+
+def parse_rows(content: bytes | str, content_format: str) -> list[dict]:
+    """Decode a JSON array / ``{"users": [...]}`` or a CSV document with a header."""
+
+    if content_format == "json":
+        data = loads(content)
+        if isinstance(data, dict):
+            data = data.get("users")
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ValueError('Expected a JSON array of objects (or {"users": [...]}).')
+        return data
+    if content_format == "csv":
+        if isinstance(content, bytes):
+            content = content.decode("utf-8-sig")
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames or "email" not in reader.fieldnames:
+            raise ValueError("CSV input needs a header row with at least an 'email' column.")
+        return [{k: v for k, v in row.items() if k in IMPORT_FIELDS} for row in reader]
+    raise ValueError(f"Unknown import format {content_format!r}.")
+
+
+_hash_pools: dict[int, ProcessPoolExecutor] = {}
+_runner: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def get_hash_process_pool(workers: int) -> ProcessPoolExecutor:
+    """Return this process's hashing pool of ``workers`` processes, creating it once."""
+
+    with _lock:
+        pool = _hash_pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_hash_worker,
+                # Set by manage.py / wsgi.py / asgi.py (settings.SETTINGS_MODULE
+                # is None under override_settings).
+                initargs=(os.environ["DJANGO_SETTINGS_MODULE"], list(settings.PASSWORD_HASHERS)),
+            )
+            _hash_pools[workers] = pool
+        return pool
+
+
+def reset_import_pools() -> None:
+    """Drop the hashing pools and the job runner (after fork, in tests)."""
+
+    global _runner
+    with _lock:
+        for pool in _hash_pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pools.clear()
+        if _runner is not None:
+            _runner.shutdown(wait=False)
+        _runner = None
+
+
+def hash_passwords(passwords: list[str], workers: int | None = None) -> list[str]:
+    """Hash ``passwords`` with the configured hasher, in parallel when possible."""
+
+    if workers is None:
+        workers = getattr(settings, "USERS_IMPORT_HASH_WORKERS", 0) or os.cpu_count() or 1
+    if min(workers, len(passwords)) <= 1:
+        return [make_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    pool = get_hash_process_pool(workers)
+    return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def import_users(
+    rows: list[dict],
+    batch_size: int | None = None,
+    workers: int | None = None,
+    dry_run: bool = False,
+) -> ImportReport:
+    """Validate, hash and insert ``rows``; return the per-row report."""
+
+    batch_size = batch_size or getattr(settings, "USERS_IMPORT_BATCH_SIZE", 500)
+    report = ImportReport()
+
+    valid: list[tuple[int, dict]] = []
+    seen: set[str] = set()
+    for number, row in enumerate(rows, start=1):
+        serializer = BulkUserRowSerializer(data=row)
+        if not serializer.is_valid():
+            report.add_error(number, row.get("email"), serializer.errors)
+            continue
+        data = serializer.validated_data
+        data["email"] = User.objects.normalize_email(data["email"])
+        if data["email"] in seen:
+            report.add_error(number, data["email"], {"email": ["Duplicate email in import."]})
+            continue
+        seen.add(data["email"])
+        valid.append((number, data))
+
+    for start in range(0, len(valid), batch_size):
+        _import_batch(valid[start : start + batch_size], report, workers, dry_run)
+    report.errors.sort(key=lambda error: error["row"])
+    return report
+
+
+def _import_batch(batch, report: ImportReport, workers, dry_run: bool) -> None:
+    existing = set(
+        User.objects.filter(email__in=[data["email"] for _, data in batch]).values_list(
+            "email", flat=True
+        )
+    )
+    pending = []
+    for number, data in batch:
+        if data["email"] in existing:
+            report.add_error(
+                number, data["email"], {"email": ["This email has already been taken."]}
+            )
+        else:
+            pending.append((number, data))
+    if dry_run:
+        # Report what would be created, without hashing or writing.
+        report.created += len(pending)
+        return
+    if not pending:
+        return
+
+    hashes = hash_passwords([data["password"] for _, data in pending], workers)
+    users = [
+        User(
+            email=data["email"],
+            password=hashed,
+            name=data["name"],
+            role=data["role"],
+        )
+        for (_, data), hashed in zip(pending, hashes, strict=True)
+    ]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+    except IntegrityError:
+        # Lost a race with a concurrent signup: insert row by row to report it.
+        for (number, data), user in zip(pending, users, strict=True):
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+            except IntegrityError:
+                report.add_error(
+                    number, data["email"], {"email": ["This email has already been taken."]}
+                )
+            else:
+                report.created += 1
+        return
+    report.created += len(users)
+
+
+def get_import_runner() -> ThreadPoolExecutor:
+    """Return the background thread running import jobs, one job at a time."""
+
+    global _runner
+    with _lock:
+        if _runner is None:
+            _runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="user-import")
+        return _runner
+
+
+def start_import_job(rows: list[dict]) -> UserImportJob:
+    """Record an import of ``rows`` and run it in the background once committed."""
+
+    job = UserImportJob.objects.create(rows=len(rows))
+    transaction.on_commit(lambda: get_import_runner().submit(_run_on_runner, job.pk, rows))
+    return job
+
+
+def _run_on_runner(job_id: int, rows: list[dict]) -> None:
+    try:
+        run_import_job(job_id, rows)
+    finally:
+        # The runner thread's connections would otherwise stay open until exit.
+        connections.close_all()
+
+
+def run_import_job(job_id: int, rows: list[dict]) -> None:
+    """Run a recorded import and store its report."""
+
+    jobs = UserImportJob.objects.filter(pk=job_id)
+    try:
+        jobs.update(status=UserImportJob.Status.RUNNING)
+        report = import_users(rows)
+        jobs.update(
+            status=UserImportJob.Status.DONE,
+            report=report.as_dict(),
+            finished_at=timezone.now(),
+        )
+    except Exception:
+        logger.exception("User import job %s failed", job_id)
+        jobs.update(status=UserImportJob.Status.FAILED, finished_at=timezone.now())
+
+
+#: Report of a job whose worker stopped before finishing it.
+INTERRUPTED_REPORT = {
+    "detail": "The import was interrupted before it finished. Please upload the file again."
+}
+
+
+def fail_stale_jobs(max_age: float | None = None) -> int:
+    """Mark jobs pending or running for over ``max_age`` seconds as failed.
+
+    Returns how many jobs were marked. ``max_age`` defaults to
+    ``USERS_IMPORT_JOB_TIMEOUT``.
+    """
+
+    if max_age is None:
+        max_age = getattr(settings, "USERS_IMPORT_JOB_TIMEOUT", 3600)
+    now = timezone.now()
+    return UserImportJob.objects.filter(
+        status__in=(UserImportJob.Status.PENDING, UserImportJob.Status.RUNNING),
+        created_at__lt=now - timedelta(seconds=max_age),
+    ).update(status=UserImportJob.Status.FAILED, report=INTERRUPTED_REPORT, finished_at=now)
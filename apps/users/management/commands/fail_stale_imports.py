@@ -0,0 +1,47 @@
+"""Fail background user imports whose worker stopped before finishing them.
+
+Import jobs run in the memory of the gunicorn worker that accepted them
+(see apps/users/imports.py); a worker killed or recycled meanwhile leaves
+its jobs PENDING or RUNNING forever. This marks those older than
+``USERS_IMPORT_JOB_TIMEOUT`` seconds as FAILED.
+
+Examples::
+
+    python manage.py fail_stale_imports                   # once (cron)
+    python manage.py fail_stale_imports --interval 600    # loop (docker-compose)
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.users.imports import fail_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Mark interrupted background user imports as failed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age",
+            type=float,
+            default=None,
+            help="Seconds after which an unfinished job is failed "
+            "(default: USERS_IMPORT_JOB_TIMEOUT).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Run forever, checking every N seconds (0 = run once).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            failed = fail_stale_jobs(options["max_age"])
+            self.stdout.write(self.style.SUCCESS(f"Failed {failed} stale import jobs."))
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,64 @@
+"""Delete expired SimpleJWT outstanding/blacklisted tokens in small batches.
+
+Unlike SimpleJWT's ``flushexpiredtokens`` (one unbounded DELETE), each batch
+is its own short transaction, so the tables are never locked for long.
+
+Examples::
+
+    python manage.py prune_tokens                    # once (cron)
+    python manage.py prune_tokens --interval 3600    # loop (docker-compose)
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+def prune_expired_tokens(batch_size: int = 1000, pause: float = 0.0) -> int:
+    """Delete expired tokens ``batch_size`` rows at a time; return how many."""
+
+    now = aware_utcnow()
+    deleted = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+class Command(BaseCommand):
+    help = "Prune expired JWT outstanding/blacklisted tokens in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause", type=float, default=0.0, help="Seconds to sleep between batches."
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Run forever, pruning every N seconds (0 = run once).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = prune_expired_tokens(options["batch_size"], options["pause"])
+            self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} expired tokens."))
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -1,5 +1,15 @@
 from django.contrib.auth.models import AbstractUser
-from django.db.models import TextChoices, CharField, EmailField, BooleanField
+from django.db.models import (
+    BooleanField,
+    CharField,
+    DateTimeField,
+    EmailField,
+    Index,
+    JSONField,
+    Model,
+    PositiveIntegerField,
+    TextChoices,
+)
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
@@ -35,6 +45,12 @@ class User(AbstractUser):
 
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Keyset pagination by join date (UserCursorPagination).
+            Index(fields=["date_joined", "id"], name="users_user_joined_id_idx"),
+        ]
+
     def get_absolute_url(self) -> str:
         """Get URL for user's detail view.
 
@@ -47,3 +63,27 @@ class User(AbstractUser):
     def __str__(self):
         """For returning full names."""
         return f"{self.first_name} {self.last_name}"
+
+
+class UserImportJob(Model):
+    """A bulk user import run in the background (see imports.py).
+
+    Large imports hash thousands of passwords, far longer than a request may
+    take: the API records a job, answers ``202 Accepted`` and the import
+    runs on a worker thread. The per-row report is stored when it finishes.
+    """
+
+    class Status(TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    status = CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    rows = PositiveIntegerField()
+    report = JSONField(null=True, blank=True)
+    created_at = DateTimeField(auto_now_add=True)
+    finished_at = DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Import #{self.pk} ({self.status})"
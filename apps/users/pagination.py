@@ -0,0 +1,21 @@
+"""Pagination for the users API."""
+
+from __future__ import annotations
+
+from apps.utils.pagination import KeysetPagination
+
+
+class UserCursorPagination(KeysetPagination):
+    """Keyset pagination over users.
+
+    Each ordering is backed by an index: the primary key, or the composite
+    ``(date_joined, id)`` index declared on ``User.Meta``.
+    """
+
+    orderings = {
+        "id": ("id",),
+        "-id": ("-id",),
+        "date_joined": ("date_joined", "id"),
+        "-date_joined": ("-date_joined", "-id"),
+    }
+    default_ordering = "id"
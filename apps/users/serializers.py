@@ -6,6 +6,8 @@ from django.contrib.auth import authenticate, get_user_model
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
+from .models import UserImportJob
+
 User = get_user_model()
 
 
@@ -47,6 +49,15 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
 
+class UserImportJobSerializer(serializers.ModelSerializer):
+    """Status (and, once finished, the per-row report) of a background import."""
+
+    class Meta:
+        model = UserImportJob
+        fields = ("id", "status", "rows", "created_at", "finished_at", "report")
+        read_only_fields = fields
+
+
 class AuthTokenSerializer(serializers.Serializer):
     """Serializer used by login/token endpoints if you add them later."""
 
@@ -0,0 +1,21 @@
+"""Cache invalidation for users.
+
+Writes to a ``User`` drop it from the per-process user cache used by
+``ClaimsJWTAuthentication`` (see authentication.py).
+"""
+
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save
+
+from .authentication import invalidate_cached_user
+from .models import User
+
+
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+def connect_signals() -> None:
+    post_save.connect(invalidate_user_cache, sender=User, dispatch_uid="users-auth-cache")
+    post_delete.connect(invalidate_user_cache, sender=User, dispatch_uid="users-auth-cache")
@@ -1,3 +1,449 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.users.authentication import ClaimsUser, reset_user_cache
+from apps.users.blacklist import is_blacklisted, reset_local_blacklist, warm_blacklist
+from apps.users.hashing import get_hash_pool, reset_hash_pool
+from apps.users.imports import (
+    get_hash_process_pool,
+    hash_passwords,
+    import_users,
+    reset_import_pools,
+    run_import_job,
+)
+from apps.users.models import User, UserImportJob
+from apps.users.tokens import RefreshToken
+from apps.utils import metrics
+
+
+class UserKeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@example.com", is_staff=True)
+        for i in range(5):
+            User.objects.create(email=f"user{i}@example.com", role=User.Types.CUSTOMER)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def walk(self, url):
+        emails = []
+        while url:
+            payload = self.client.get(url).json()
+            emails += [row["email"] for row in payload["results"]]
+            url = payload["next"]
+        return emails
+
+    def test_pages_follow_cursor_without_count(self):
+        response = self.client.get("/users/?limit=2")
+        self.assertNotIn("count", response.json())
+        self.assertNotIn("approximate_count", response.json())
+
+        emails = self.walk("/users/?limit=2")
+        expected = list(User.objects.order_by("id").values_list("email", flat=True))
+        self.assertEqual(emails, expected)
+
+    def test_descending_join_date_ordering(self):
+        emails = self.walk("/users/?limit=4&ordering=-date_joined")
+        expected = list(
+            User.objects.order_by("-date_joined", "-id").values_list("email", flat=True)
+        )
+        self.assertEqual(emails, expected)
+
+    def test_page_does_not_count_rows(self):
+        with self.assertNumQueries(1):
+            self.client.get("/users/list/?limit=3")
+
+    def test_opt_in_approximate_count(self):
+        payload = self.client.get("/users/?limit=2&count=approx").json()
+        self.assertEqual(payload["approximate_count"], 6)
+
+    def test_permission_view_is_paginated(self):
+        payload = self.client.get("/users/list/?limit=2").json()
+        self.assertEqual(len(payload["results"]), 2)
+        self.assertIsNotNone(payload["next"])
+        self.assertNotIn("password", payload["results"][0])
+
+
+class UserExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@example.com", is_staff=True, name="Ad, Min")
+        User.objects.create(email="owner@example.com", role=User.Types.OWNER)
+        User.objects.create(email="customer@example.com", role=User.Types.CUSTOMER)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_csv_export_streams_selected_fields(self):
+        response = self.client.get("/users/export/?fields=email,name")
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "email,name")
+        self.assertEqual(lines[1], 'admin@example.com,"Ad, Min"')
+        self.assertEqual(len(lines), 4)
+
+    def test_csv_export_neutralizes_formulas(self):
+        User.objects.create(email="evil@example.com", name='=HYPERLINK("http://x")')
+        response = self.client.get("/users/export/?fields=email,name")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[-1], 'evil@example.com,"\'=HYPERLINK(""http://x"")"')
+
+    def test_ndjson_export_filters_roles(self):
+        response = self.client.get("/users/export/?output=ndjson&role=OWNER,customer&fields=email")
+        content = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            content, ['{"email":"owner@example.com"}', '{"email":"customer@example.com"}']
+        )
+
+    def test_invalid_selection_is_rejected(self):
+        self.assertEqual(self.client.get("/users/export/?fields=password").status_code, 400)
+        self.assertEqual(self.client.get("/users/export/?role=ROOT").status_code, 400)
+
+    def test_export_is_admin_only(self):
+        self.client.force_authenticate(User.objects.get(email="owner@example.com"))
+        self.assertEqual(self.client.get("/users/export/").status_code, 403)
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command("export_users", "--format", "ndjson", "--role", "OWNER", stdout=out)
+        self.assertIn('"email":"owner@example.com"', out.getvalue())
+
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, USERS_IMPORT_HASH_WORKERS=1)
+class UserImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@example.com", is_staff=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_import_reports_row_errors_and_creates_the_rest(self):
+        rows = [
+            {"email": "new@example.com", "password": "correct-horse", "role": "OWNER"},
+            {"email": "admin@example.com", "password": "correct-horse"},
+            {"email": "new@example.com", "password": "correct-horse"},
+            {"email": "not-an-email", "password": "short"},
+        ]
+        report = import_users(rows, batch_size=2)
+
+        self.assertEqual(report.created, 1)
+        self.assertEqual([error["row"] for error in report.errors], [2, 3, 4])
+        user = User.objects.get(email="new@example.com")
+        self.assertEqual(user.role, User.Types.OWNER)
+        self.assertTrue(user.check_password("correct-horse"))
+
+    def test_uniqueness_is_checked_once_per_batch(self):
+        rows = [{"email": f"u{i}@example.com", "password": "correct-horse"} for i in range(10)]
+        # 1 uniqueness query + 1 insert per batch (plus savepoint handling).
+        with self.assertNumQueries(4 * 2):
+            import_users(rows, batch_size=5)
+        self.assertEqual(User.objects.count(), 11)
+
+    def test_csv_endpoint(self):
+        body = "email,password,name\nbob@example.com,correct-horse,Bob\n"
+        response = self.client.post("/users/import/", body, content_type="text/csv")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual(User.objects.get(email="bob@example.com").name, "Bob")
+
+    def test_json_dry_run_does_not_write(self):
+        rows = [{"email": "dry@example.com", "password": "correct-horse"}]
+        response = self.client.post("/users/import/?dry_run=1", rows, format="json")
+        self.assertEqual(response.json()["created"], 1)
+        self.assertFalse(User.objects.filter(email="dry@example.com").exists())
+
+    def test_hashing_in_process_pool(self):
+        self.addCleanup(reset_import_pools)
+        hashes = hash_passwords(["first-password", "second-password"], workers=2)
+        self.assertTrue(check_password("second-password", hashes[1]))
+
+        # One pool per process, reused by every batch of every import.
+        pool = get_hash_process_pool(2)
+        rows = [{"email": f"p{i}@example.com", "password": "correct-horse"} for i in range(4)]
+        self.assertEqual(import_users(rows, batch_size=2, workers=2).created, 4)
+        self.assertIs(get_hash_process_pool(2), pool)
+
+    @override_settings(USERS_IMPORT_SYNC_LIMIT=1)
+    def test_large_import_runs_as_background_job(self):
+        rows = [{"email": f"job{i}@example.com", "password": "correct-horse"} for i in range(2)]
+        runner = mock.Mock()
+        with (
+            mock.patch("apps.users.imports.get_import_runner", return_value=runner),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            response = self.client.post("/users/import/", rows, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], "PENDING")
+        self.assertFalse(User.objects.filter(email__startswith="job").exists())
+
+        (_, job_id, job_rows), _ = runner.submit.call_args
+        run_import_job(job_id, job_rows)
+        job = self.client.get(response["Location"]).json()
+        self.assertEqual(job["status"], "DONE")
+        self.assertEqual(job["report"]["created"], 2)
+
+    def test_jobs_lost_with_their_worker_are_failed(self):
+        lost = UserImportJob.objects.create(rows=10, status=UserImportJob.Status.RUNNING)
+        queued = UserImportJob.objects.create(rows=10)
+        done = UserImportJob.objects.create(rows=10, status=UserImportJob.Status.DONE)
+        old = timezone.now() - timedelta(hours=2)
+        UserImportJob.objects.filter(pk__in=(lost.pk, done.pk)).update(created_at=old)
+
+        call_command("fail_stale_imports", stdout=StringIO())
+        statuses = dict(UserImportJob.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[lost.pk], UserImportJob.Status.FAILED)
+        self.assertEqual(statuses[queued.pk], UserImportJob.Status.PENDING)  # recent: may still run
+        self.assertEqual(statuses[done.pk], UserImportJob.Status.DONE)
+        self.assertIn("detail", UserImportJob.objects.get(pk=lost.pk).report)
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    AUTH_HASH_POOL_SIZE=1,
+    AUTH_HASH_MAX_IN_FLIGHT=1,
+    AUTH_HASH_RETRY_AFTER=3,
+)
+class PooledLoginTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="login@example.com", password="correct-horse")  # noqa: S106
+
+    def setUp(self):
+        reset_hash_pool()
+        self.addCleanup(reset_hash_pool)
+
+    def test_token_obtain_verifies_on_pool(self):
+        logins = [metrics.logins.success._value.get(), metrics.logins.failure._value.get()]
+        response = self.client.post(
+            "/api/token/", {"email": "login@example.com", "password": "correct-horse"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.json())
+
+        response = self.client.post(
+            "/api/token/", {"email": "login@example.com", "password": "nope"}
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(
+            [metrics.logins.success._value.get(), metrics.logins.failure._value.get()],
+            [logins[0] + 1, logins[1] + 1],
+        )
+
+    def test_saturated_pool_returns_503_with_retry_after(self):
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        holder = threading.Thread(target=get_hash_pool().run, args=(block,))
+        holder.start()
+        self.addCleanup(holder.join)
+        self.addCleanup(release.set)
+        started.wait(5)
+
+        response = self.client.post(
+            "/api/token/", {"email": "login@example.com", "password": "correct-horse"}
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "3")
+
+        # Django's authenticate() (admin login) gets the same 503, not a 500.
+        response = self.client.post(
+            "/admin/login/", {"username": "login@example.com", "password": "correct-horse"}
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "3")
+
+
+class TokenBlacklistCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="jwt@example.com")
+
+    def setUp(self):
+        cache.clear()
+        reset_local_blacklist()
+
+    def test_rotated_refresh_token_is_rejected(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        first = self.client.post("/api/token/refresh/", {"refresh": refresh})
+        self.assertEqual(first.status_code, 200)
+
+        reset_local_blacklist()  # as if replayed against another worker
+        replay = self.client.post("/api/token/refresh/", {"refresh": refresh})
+        self.assertEqual(replay.status_code, 401)
+
+    @override_settings(JWT_BLACKLIST_CACHE_NOEVICTION=True)
+    def test_warm_negative_cache_skips_database(self):
+        token = RefreshToken.for_user(self.user)
+        # Trusted only on a shared, non-evicting backend (Redis in production).
+        with mock.patch("apps.users.blacklist.is_shared_cache", return_value=True):
+            self.assertFalse(is_blacklisted(token["jti"]))  # cold: DB + warm
+
+            with self.assertNumQueries(0):
+                response = self.client.post("/api/token/verify/", {"token": str(token)})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(JWT_BLACKLIST_CACHE_NOEVICTION=True)
+    def test_process_local_cache_never_proves_absence(self):
+        # Two gunicorn workers with the default LocMemCache: each has its own.
+        worker_a, worker_b = LocMemCache("worker-a", {}), LocMemCache("worker-b", {})
+        refresh = str(RefreshToken.for_user(self.user))
+        with mock.patch("apps.users.blacklist.get_cache", return_value=worker_b):
+            warm_blacklist()  # B is warm, before the token is blacklisted
+        with mock.patch("apps.users.blacklist.get_cache", return_value=worker_a):
+            rotated = self.client.post("/api/token/refresh/", {"refresh": refresh})
+        self.assertEqual(rotated.status_code, 200)
+
+        reset_local_blacklist()
+        with mock.patch("apps.users.blacklist.get_cache", return_value=worker_b):
+            replay = self.client.post("/api/token/refresh/", {"refresh": refresh})
+        self.assertEqual(replay.status_code, 401)
+
+    def test_cold_cache_falls_back_to_database(self):
+        token = RefreshToken.for_user(self.user)
+        token.blacklist()
+        cache.clear()
+        reset_local_blacklist()
+
+        self.assertTrue(is_blacklisted(token["jti"]))
+        response = self.client.post("/api/token/verify/", {"token": str(token)})
+        self.assertEqual(response.status_code, 400)
+
+    def test_prune_deletes_expired_tokens_in_batches(self):
+        now = timezone.now()
+        for i in range(5):
+            outstanding = OutstandingToken.objects.create(
+                jti=f"old{i}",
+                token="x",  # noqa: S106
+                expires_at=now - timedelta(days=1),
+            )
+            BlacklistedToken.objects.create(token=outstanding)
+        RefreshToken.for_user(self.user)
+
+        call_command("prune_tokens", batch_size=2, stdout=StringIO())
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class ClaimsAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="boss@example.com", is_staff=True, name="Boss")
+
+    def setUp(self):
+        cache.clear()
+        reset_user_cache()
+        self.refresh = RefreshToken.for_user(self.admin)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+
+    def test_token_carries_user_claims(self):
+        access = self.refresh.access_token
+        self.assertEqual(access["email"], "boss@example.com")
+        self.assertEqual(access["role"], User.Types.ADMIN)
+        self.assertTrue(access["is_staff"])
+        self.assertTrue(access["activated"])
+
+    def test_admin_endpoint_needs_no_user_query(self):
+        reset_user_cache()
+        with self.assertNumQueries(1):  # the page itself
+            response = self.client.get("/users/list/?limit=5")
+        self.assertEqual(response.status_code, 200)
+
+    def test_row_is_loaded_on_demand_and_invalidated_on_save(self):
+        user = ClaimsUser(self.refresh.access_token)
+        with self.assertNumQueries(0):
+            self.assertEqual(user.role, User.Types.ADMIN)
+        reset_user_cache()
+        with self.assertNumQueries(1):
+            self.assertEqual(user.name, "Boss")
+        with self.assertNumQueries(0):
+            self.assertEqual(ClaimsUser(self.refresh.access_token).name, "Boss")
+
+        self.admin.name = "Chief"
+        self.admin.save()
+        self.assertEqual(ClaimsUser(self.refresh.access_token).name, "Chief")
+
+    def test_refresh_restamps_claims(self):
+        User.objects.filter(pk=self.admin.pk).update(is_staff=False)
+        reset_user_cache()
+        response = self.client.post("/api/token/refresh/", {"refresh": str(self.refresh)})
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        self.assertEqual(self.client.get("/users/list/").status_code, 403)
+
+
+@override_settings(QUERY_BUDGET_MODE="raise")
+class QueryBudgetContractTests(TestCase):
+    """Users and token endpoints stay within their declared budgets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email="budget@example.com",
+            password="correct-horse",  # noqa: S106
+            is_staff=True,
+        )
+        for i in range(3):
+            User.objects.create(email=f"member{i}@example.com")
+
+    def setUp(self):
+        cache.clear()
+        reset_user_cache()
+        reset_local_blacklist()
+        reset_hash_pool()
+        self.addCleanup(reset_hash_pool)
+        self.client = APIClient()
+        token = RefreshToken.for_user(self.admin).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_user_endpoints(self):
+        member = User.objects.get(email="member0@example.com")
+        rows = [{"email": "in@example.com", "password": "Imp0rt-pw!"}]
+        requests = [
+            ("get", "/users/", None, 200),
+            ("get", f"/users/{member.pk}/", None, 200),
+            ("post", "/users/", {"email": "new@example.com", "password": "Sup3r-secret!"}, 201),
+            ("patch", f"/users/{member.pk}/", {"first_name": "Ann"}, 200),
+            ("delete", f"/users/{member.pk}/", None, 204),
+            ("get", "/users/list/", None, 200),
+            ("get", "/users/export/", None, 200),
+            ("post", "/users/import/", rows, 201),
+        ]
+        for method, path, data, status in requests:
+            with self.subTest(method=method, path=path):
+                response = getattr(self.client, method)(path, data, format="json")
+                self.assertEqual(response.status_code, status)
+
+    def test_token_endpoints(self):
+        credentials = {"email": "budget@example.com", "password": "correct-horse"}
+        tokens = self.client.post("/api/token/", credentials, format="json").json()
+        self.assertEqual(
+            self.client.post("/api/token/verify/", {"token": tokens["access"]}).status_code, 200
+        )
+        refreshed = self.client.post("/api/token/refresh/", {"refresh": tokens["refresh"]})
+        self.assertEqual(refreshed.status_code, 200)
+        rotated = refreshed.json()["refresh"]
+        response = self.client.post("/api/token/blacklist/", {"refresh": rotated})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,132 @@
+"""SimpleJWT tokens and serializers.
+
+- Blacklist checks and writes go through the cached blacklist (blacklist.py).
+- The user is read once per request through the per-process user cache
+  (SimpleJWT loads it again in ``blacklist()`` and ``outstand()``, four
+  queries for one refresh).
+- Tokens carry the user claims read by ``ClaimsJWTAuthentication``
+  (authentication.py); they are re-stamped from the current row whenever an
+  access token is issued, so a refresh picks up role/staff changes.
+
+Wired through ``SIMPLE_JWT["TOKEN_*_SERIALIZER"]`` so the stock token views
+in djangodemo/urls.py use them unchanged.
+"""
+
+from __future__ import annotations
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .blacklist import is_blacklisted, remember_blacklisted
+
+# User fields copied into every token (the user id is SimpleJWT's own claim).
+USER_CLAIMS = ("email", "role", "is_staff", "is_superuser", "is_active", "activated")
+
+
+def add_user_claims(token, user) -> None:
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+
+
+class CachedBlacklistMixin:
+    """Check and write the blacklist through apps/users/blacklist.py."""
+
+    def check_blacklist(self) -> None:
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload.get("exp")):
+            raise TokenError(_("Token is blacklisted"))
+
+    def get_user(self):
+        from .authentication import get_cached_user
+
+        return get_cached_user(self.payload.get(api_settings.USER_ID_CLAIM))
+
+    def _outstanding_fields(self) -> dict:
+        return {
+            "created_at": self.current_time,
+            "token": str(self),
+            "expires_at": datetime_from_epoch(self.payload["exp"]),
+        }
+
+    def blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        # A callable default is only evaluated (user lookup) on create.
+        token, _ = OutstandingToken.objects.get_or_create(
+            jti=jti, defaults={"user": self.get_user, **self._outstanding_fields()}
+        )
+        result = BlacklistedToken.objects.get_or_create(token=token)
+        remember_blacklisted(jti, self.payload.get("exp"))
+        return result
+
+    def outstand(self):
+        # Only called right after set_jti() (rotation): the jti is new, so
+        # skip get_or_create's SELECT.
+        return OutstandingToken.objects.create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            user=self.get_user(),
+            **self._outstanding_fields(),
+        )
+
+
+class RefreshToken(CachedBlacklistMixin, tokens.RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        add_user_claims(token, user)
+        return token
+
+    @property
+    def access_token(self):
+        from .authentication import get_cached_user
+
+        user = get_cached_user(self[api_settings.USER_ID_CLAIM])
+        if user is not None:
+            add_user_claims(self, user)
+        return super().access_token
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        # SimpleJWT's validate() with the user read through the user cache.
+        refresh = self.token_class(attrs["refresh"])
+        user = refresh.get_user()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account"
+            )
+
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+        return data
+
+
+class TokenBlacklistSerializer(jwt_serializers.TokenBlacklistSerializer):
+    token_class = RefreshToken
+
+
+class TokenVerifySerializer(jwt_serializers.TokenVerifySerializer):
+    def validate(self, attrs):
+        token = tokens.UntypedToken(attrs["token"])
+        if api_settings.BLACKLIST_AFTER_ROTATION and is_blacklisted(
+            token.get(api_settings.JTI_CLAIM), token.get("exp")
+        ):
+            raise ValidationError(_("Token is blacklisted"))
+        return {}
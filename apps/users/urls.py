@@ -9,6 +9,9 @@ router.register('', views.UserViewSet, basename='user')
 
 urlpatterns = [
     path('list/', views.PermissionView.as_view(), name='list'),
+    path('export/', views.UserExportView.as_view(), name='export'),
+    path('import/', views.UserImportView.as_view(), name='import'),
+    path('import/<int:pk>/', views.UserImportJobView.as_view(), name='import-job'),
     path('', include(router.urls)),
 ]
 
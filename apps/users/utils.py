@@ -1,6 +0,0 @@
-# import aioboto3
-from functools import partial
-import asyncio
-from asgiref.sync import sync_to_async
-
-
@@ -4,22 +4,44 @@ Notes
 -----
 - Uses DRF viewsets for standard CRUD.
 - Adds an extra admin-only endpoint (PermissionView) used in the template.
+- Admins can stream a full export (UserExportView, see exports.py) and
+  bulk-import users (UserImportView, see imports.py).
+- Lists use keyset pagination (see pagination.py) and the fast values()
+  serializer (apps/utils/serializers.py).
 - Applies a stricter rate limit to user creation to reduce abuse.
+- Lists and retrieves read from a replica when one is configured, unless
+  the client just wrote (apps/utils/dbrouter.py).
+- Every endpoint declares its query budget (apps/utils/querybudget.py),
+  including the SimpleJWT token views below.
+- Logins and token refreshes are counted by outcome
+  (``auth_logins_total`` / ``auth_token_refreshes_total``).
 """
 
 from __future__ import annotations
 
-from django.utils.decorators import method_decorator
-from django_ratelimit.decorators import ratelimit
-from rest_framework import status, viewsets
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from rest_framework import generics, status, viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt import views as jwt_views
 
 from drf_spectacular.utils import extend_schema, extend_schema_view
 
-from .models import User
-from .serializers import UserSerializer
+from apps.utils import metrics
+from apps.utils.dbrouter import ReplicaReadMixin
+from apps.utils.querybudget import QueryBudget
+from apps.utils.ratelimit import ratelimit
+from apps.utils.serializers import FastListMixin
+
+from .exports import EXPORT_FORMATS, iter_export, parse_fields, parse_roles
+from .imports import import_users, parse_rows, start_import_job
+from .models import User, UserImportJob
+from .pagination import UserCursorPagination
+from .serializers import UserImportJobSerializer, UserSerializer
 
 
 @extend_schema_view(
@@ -30,25 +52,153 @@ from .serializers import UserSerializer
     partial_update=extend_schema(description="Partially update a user by id.", request=UserSerializer, responses={200: UserSerializer}, methods=["patch"]),
     destroy=extend_schema(description="Delete a user by id.", responses={204: None}, methods=["delete"]),
 )
-class UserViewSet(viewsets.ModelViewSet):
-    """CRUD operations for users."""
+class UserViewSet(ReplicaReadMixin, FastListMixin, viewsets.ModelViewSet):
+    """CRUD operations for users (reads from a replica when configured)."""
 
     permission_classes = (IsAuthenticated,)
     serializer_class = UserSerializer
     queryset = User.objects.all().order_by("id")
+    # performance: keyset pagination (no OFFSET scans, no COUNT(*))
+    pagination_class = UserCursorPagination
+    replica_actions = frozenset({"list", "retrieve"})
+    query_budgets = {
+        "list": QueryBudget(2),  # page + opt-in approximate count
+        "retrieve": QueryBudget(1),
+        "create": QueryBudget(2),
+        "update": QueryBudget(2),
+        "partial_update": QueryBudget(2),
+        "destroy": QueryBudget(7),  # cascades to groups, permissions, tokens, admin log
+    }
 
-    @method_decorator(ratelimit(key="ip", rate="10/m", method="POST", block=True))
+    @ratelimit("10/m", key="ip", methods=("POST",))
     def create(self, request, *args, **kwargs):
         """Create a user (rate-limited)."""
         return super().create(request, *args, **kwargs)
 
 
-class PermissionView(APIView):
-    """Example admin-only endpoint."""
+class PermissionView(ReplicaReadMixin, FastListMixin, generics.ListAPIView):
+    """Example admin-only endpoint (keyset paginated)."""
 
     permission_classes = (IsAdminUser,)
+    serializer_class = UserSerializer
+    queryset = User.objects.all().order_by("id")
+    pagination_class = UserCursorPagination
+    query_budget = QueryBudget(1)
 
     @extend_schema(request=None, description="User requests only for admin.")
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class UserExportView(APIView):
+    """Admin-only streaming export of users (CSV or NDJSON).
+
+    Query parameters: ``output`` (csv|ndjson), ``fields`` (comma separated)
+    and ``role`` (repeatable or comma separated ``User.Types`` values).
+    """
+
+    permission_classes = (IsAdminUser,)
+    # The rows are read while the response streams, after the check.
+    query_budget = QueryBudget(1)
+
+    @extend_schema(
+        request=None, responses={200: None}, description="Stream users as CSV or NDJSON."
+    )
     def get(self, request):
-        serializer = UserSerializer(User.objects.all().order_by("id"), many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        export_format = request.query_params.get("output", "csv")
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({"output": f"Choose one of: {', '.join(EXPORT_FORMATS)}."})
+        try:
+            fields = parse_fields(request.query_params.get("fields"))
+            roles = parse_roles(request.query_params.getlist("role"))
+        except ValueError as exc:
+            raise ValidationError({"detail": str(exc)}) from exc
+
+        response = StreamingHttpResponse(
+            iter_export(export_format, fields, roles), content_type=EXPORT_FORMATS[export_format]
+        )
+        response["Content-Disposition"] = f'attachment; filename="users.{export_format}"'
+        return response
+
+
+class UserImportView(APIView):
+    """Admin-only bulk import of users.
+
+    Accepts a JSON array of ``{email, password, name, role}`` objects (or
+    ``{"users": [...]}``) or a ``text/csv`` body with a header row. Add
+    ``?dry_run=1`` to only validate. Responds with a per-row error report.
+
+    Imports of more than ``USERS_IMPORT_SYNC_LIMIT`` rows run in the
+    background: the response is ``202 Accepted`` with the job, whose status
+    and report are served by UserImportJobView (``Location`` header).
+    """
+
+    permission_classes = (IsAdminUser,)
+    # Per batch of USERS_IMPORT_BATCH_SIZE rows: lookup + bulk insert.
+    query_budget = QueryBudget(4)
+
+    @extend_schema(request=None, description="Bulk-import users from JSON or CSV.")
+    def post(self, request):
+        content_format = "csv" if request.content_type.startswith("text/csv") else "json"
+        try:
+            rows = parse_rows(request.body, content_format)
+        except ValueError as exc:
+            raise ValidationError({"detail": str(exc)}) from exc
+
+        dry_run = request.query_params.get("dry_run") in ("1", "true")
+        if not dry_run and len(rows) > getattr(settings, "USERS_IMPORT_SYNC_LIMIT", 50):
+            job = start_import_job(rows)
+            location = reverse("import-job", kwargs={"pk": job.pk})
+            return Response(
+                UserImportJobSerializer(job).data,
+                status=status.HTTP_202_ACCEPTED,
+                headers={"Location": location},
+            )
+
+        report = import_users(rows, dry_run=dry_run)
+        created = report.created and not dry_run
+        return Response(
+            report.as_dict(), status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+
+class UserImportJobView(generics.RetrieveAPIView):
+    """Admin-only status and report of a background user import."""
+
+    permission_classes = (IsAdminUser,)
+    serializer_class = UserImportJobSerializer
+    queryset = UserImportJob.objects.all()
+    query_budget = QueryBudget(1)
+
+
+# ---------------------------------------------------------------------
+# SimpleJWT token endpoints (serializers in tokens.py), with budgets
+# ---------------------------------------------------------------------
+class OutcomeMetricMixin:
+    """Count every response (including throttled ones) in ``outcome_metric``."""
+
+    outcome_metric = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        metrics.record_outcome(self.outcome_metric, response.status_code)
+        return response
+
+
+class TokenObtainPairView(OutcomeMetricMixin, jwt_views.TokenObtainPairView):
+    query_budget = QueryBudget(3)
+    outcome_metric = metrics.logins
+
+
+class TokenRefreshView(OutcomeMetricMixin, jwt_views.TokenRefreshView):
+    # blacklist check, user, blacklist the old token, outstand the new one
+    query_budget = QueryBudget(9)
+    outcome_metric = metrics.token_refreshes
+
+
+class TokenVerifyView(jwt_views.TokenVerifyView):
+    query_budget = QueryBudget(2)
+
+
+class TokenBlacklistView(jwt_views.TokenBlacklistView):
+    query_budget = QueryBudget(7)
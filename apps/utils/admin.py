@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import CSPViolation
+
+
+@admin.register(CSPViolation)
+class CSPViolationAdmin(admin.ModelAdmin):
+    list_display = ("window", "directive", "blocked_uri", "document_uri", "count", "last_seen")
+    list_filter = ("directive",)
+    search_fields = ("blocked_uri", "document_uri")
+    date_hierarchy = "window"
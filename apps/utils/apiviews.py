@@ -2,12 +2,23 @@
 
 from __future__ import annotations
 
-from django.utils.timezone import now
 import logging
-from rest_framework.permissions import AllowAny
+
+import orjson
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.utils.decorators import method_decorator
+from django.utils.timezone import now
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from . import csp
+from .fastjson import FastJsonResponse
+from .ratelimit import ratelimit
 
 logger = logging.getLogger(__name__)
 
@@ -24,17 +35,89 @@ class HealthCheckView(APIView):
         return Response({"status": "ok", "timestamp": now().isoformat()})
 
 
-class CSPReportView(APIView):
-    """Receive CSP violation reports.
+async def health_check(request):
+    """Async ``HealthCheckView`` (same payload, no DRF, no thread hop).
 
-    Browsers send reports as JSON when you enable CSP report-only or report-uri.
-    We keep this endpoint extremely lightweight: it only logs the payload.
+    Mounted instead of the DRF view when ``ASYNC_VIEWS_ENABLED`` is set.
     """
 
-    permission_classes = [AllowAny]
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    return FastJsonResponse({"status": "ok", "timestamp": now().isoformat()})
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class CSPReportView(View):
+    """Receive CSP violation reports (``report-uri`` and ``report-to``).
+
+    A plain Django view: no DRF negotiation or parsing, and nothing is read
+    from oversized or mistyped requests. Valid reports are fingerprinted and
+    counted by the aggregator in csp.py; nothing is logged per report.
+    Always answers 204 except for rejected requests (413 / 415 / 400).
+    """
+
+    http_method_names = ["post"]
 
+    @ratelimit(settings.CSP_REPORT_RATE, key="ip", block=False)
     def post(self, request):
-        payload = request.data
-        # Avoid logging huge bodies; browsers typically send small JSON objects.
-        logger.warning("CSP report received", extra={"csp_report": payload})
-        return Response({"status": "ok"})
+        max_bytes = settings.CSP_REPORT_MAX_BYTES
+        try:
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        if length > max_bytes:
+            csp.record("too_large")
+            return HttpResponse(status=413)
+        if request.content_type.lower() not in csp.CONTENT_TYPES:
+            csp.record("bad_content_type")
+            return HttpResponse(status=415)
+        if not request.ratelimit.allowed:
+            csp.record("throttled")
+            return HttpResponse(status=204)
+
+        body = request.read(max_bytes + 1)  # Content-Length may be absent
+        if len(body) > max_bytes:
+            csp.record("too_large")
+            return HttpResponse(status=413)
+        try:
+            payload = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            csp.record("invalid")
+            return HttpResponse(status=400)
+
+        fingerprints = [
+            key
+            for key in map(
+                csp.fingerprint, csp.extract_reports(payload, settings.CSP_REPORT_MAX_ITEMS)
+            )
+            if key is not None
+        ]
+        if not fingerprints:
+            csp.record("invalid")
+            return HttpResponse(status=400)
+        csp.get_aggregator().add(fingerprints)
+        csp.record("accepted", len(fingerprints))
+        return HttpResponse(status=204)
+
+
+class CSPViolationTopView(APIView):
+    """Most frequent CSP violations (admin only).
+
+    Query parameters: ``hours`` (default 24, max 720), ``limit`` (default 20,
+    max 100) and ``directive`` (e.g. ``script-src-elem``).
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            hours = min(int(request.query_params.get("hours", 24)), 720)
+            limit = min(int(request.query_params.get("limit", 20)), 100)
+        except ValueError as exc:
+            raise ValidationError({"detail": "hours and limit must be integers."}) from exc
+        violations = csp.top_violations(
+            hours=max(hours, 1),
+            limit=max(limit, 1),
+            directive=request.query_params.get("directive"),
+        )
+        return Response({"hours": hours, "results": violations})
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class UtilsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.utils'
+
+    def ready(self):
+        # Connect the connection_created receivers before any connection opens.
+        from . import dbmetrics, dbpool  # noqa: F401
+
+        if getattr(settings, "TEMPLATE_WARMUP", False):
+            from .warmup import warm_templates_on_startup
+
+            warm_templates_on_startup()
@@ -0,0 +1,22 @@
+"""Helpers about the configured cache backends.
+
+Several features keep state in ``CACHES`` that every worker process must
+agree on (content generation counters, the JWT blacklist). Without
+``REDIS_URL`` the settings fall back to ``LocMemCache``, where each process
+has its own entries, so those features need to know whether a write made by
+one process is visible to the others.
+"""
+
+from __future__ import annotations
+
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+#: Backends whose entries are private to the process (or not stored at all).
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared_cache(cache) -> bool:
+    """Whether every worker process reads and writes the same entries through ``cache``."""
+
+    return not isinstance(cache, PROCESS_LOCAL_BACKENDS)
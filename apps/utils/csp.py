@@ -0,0 +1,340 @@
+"""CSP violation report ingestion.
+
+A single page view with a bad policy can send dozens of identical reports,
+so reports are never logged or stored one by one:
+
+1. ``CSPReportView`` rejects oversized bodies (``CSP_REPORT_MAX_BYTES``,
+   checked on ``Content-Length`` before reading) and unknown content types
+   before parsing anything.
+2. Each report is reduced to a fingerprint ``(directive, blocked URI,
+   document URI)``. URIs lose their query string and fragment, so session
+   ids and cache busters do not explode the cardinality.
+3. :class:`CSPReportAggregator` counts fingerprints in process memory. A
+   background thread flushes the counts every ``CSP_REPORT_FLUSH_INTERVAL``
+   seconds, or as soon as ``CSP_REPORT_MAX_KEYS`` distinct fingerprints are
+   buffered; request threads never wait for a flush:
+
+   - with ``CSP_REPORT_REDIS_URL``, every process adds its counts to one
+     Redis hash (one pipelined ``HINCRBY`` batch); the process that wins
+     the flush lock drains the hash into the database;
+   - without Redis, or when pushing to it fails, each process writes its
+     own counts. Counts that did reach Redis are never written directly
+     too, so a failure while draining cannot count a report twice.
+
+4. The database keeps one :class:`~apps.utils.models.CSPViolation` row per
+   fingerprint and hour; :func:`top_violations` sums them for the admin
+   endpoint.
+
+Both report formats are accepted: ``application/csp-report`` (``report-uri``)
+and ``application/reports+json`` (Reporting API, ``report-to``).
+
+Notes
+-----
+- Counts are attributed to the hour they are flushed in, and counts still
+  buffered when a process is killed are lost (they are flushed at a clean
+  exit). Both are fine for spotting what a policy breaks.
+- The flush thread is started by the first report a process receives, so
+  it never crosses a fork.
+- ``csp_reports_total{outcome}`` counts accepted and rejected reports.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+from collections import Counter
+from datetime import timedelta
+from urllib.parse import urlsplit, urlunsplit
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = frozenset(
+    {"application/csp-report", "application/reports+json", "application/json"}
+)
+
+Fingerprint = tuple[str, str, str]
+_SEPARATOR = "\x1f"
+
+
+def _clean_uri(value) -> str:
+    value = str(value or "")
+    if "://" in value:
+        # Keep scheme, host and path; drop credentials, query and fragment.
+        parts = urlsplit(value)
+        value = urlunsplit((parts.scheme, parts.hostname or "", parts.path, "", ""))
+    return value[:255]
+
+
+def fingerprint(report: dict) -> Fingerprint | None:
+    """Reduce one report body (either format) to its fingerprint."""
+
+    if not isinstance(report, dict):
+        return None
+    directive = (
+        report.get("effective-directive")
+        or report.get("effectiveDirective")
+        or report.get("violated-directive")
+        or report.get("violatedDirective")
+        or ""
+    )
+    directive = str(directive).split(" ", 1)[0][:64]
+    if not directive:
+        return None
+    blocked = report.get("blocked-uri", report.get("blockedURL"))
+    document = report.get("document-uri", report.get("documentURL"))
+    return directive, _clean_uri(blocked), _clean_uri(document)
+
+
+def extract_reports(payload, max_items: int) -> list[dict]:
+    """Return the report bodies of a parsed payload (at most ``max_items``)."""
+
+    if isinstance(payload, dict):
+        body = payload.get("csp-report")
+        return [body] if isinstance(body, dict) else []
+    if isinstance(payload, list):
+        return [
+            item.get("body")
+            for item in payload[:max_items]
+            if isinstance(item, dict) and item.get("type") == "csp-violation"
+        ]
+    return []
+
+
+# ---------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------
+def store_counts(counts: dict[Fingerprint, int], now=None) -> int:
+    """Add ``counts`` to the hourly rows in one transaction; return the total."""
+
+    from .models import CSPViolation
+
+    if not counts:
+        return 0
+    now = now or timezone.now()
+    window = now.replace(minute=0, second=0, microsecond=0)
+    for attempt in (1, 2):
+        try:
+            with transaction.atomic():
+                rows = {
+                    (row.directive, row.blocked_uri, row.document_uri): row
+                    for row in CSPViolation.objects.select_for_update().filter(
+                        window=window, directive__in={key[0] for key in counts}
+                    )
+                }
+                updated, created = [], []
+                for key, count in counts.items():
+                    row = rows.get(key)
+                    if row is None:
+                        directive, blocked_uri, document_uri = key
+                        created.append(
+                            CSPViolation(
+                                window=window,
+                                directive=directive,
+                                blocked_uri=blocked_uri,
+                                document_uri=document_uri,
+                                count=count,
+                                last_seen=now,
+                            )
+                        )
+                    else:
+                        row.count += count
+                        row.last_seen = now
+                        updated.append(row)
+                CSPViolation.objects.bulk_update(updated, ["count", "last_seen"])
+                CSPViolation.objects.bulk_create(created)
+            break
+        except IntegrityError:
+            # Another process created one of the rows first: the retry
+            # finds and increments it.
+            if attempt == 2:
+                raise
+    return sum(counts.values())
+
+
+def top_violations(hours: int = 24, limit: int = 20, directive: str | None = None) -> list[dict]:
+    """Most frequent fingerprints over the last ``hours`` hours."""
+
+    from .models import CSPViolation
+
+    since = (timezone.now() - timedelta(hours=hours)).replace(minute=0, second=0, microsecond=0)
+    queryset = CSPViolation.objects.filter(window__gte=since)
+    if directive:
+        queryset = queryset.filter(directive=directive)
+    return list(
+        queryset.values("directive", "blocked_uri", "document_uri")
+        .annotate(count=Sum("count"), last_seen=Max("last_seen"))
+        .order_by("-count")[:limit]
+    )
+
+
+# ---------------------------------------------------------------------
+# Aggregation
+# ---------------------------------------------------------------------
+class CSPReportAggregator:
+    """In-process fingerprint counts, flushed in bulk (see module docstring)."""
+
+    def __init__(
+        self,
+        redis_url: str = "",
+        prefix: str = "csp",
+        flush_interval: float = 30.0,
+        max_keys: int = 1000,
+    ):
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self.hash_key = f"{prefix}:counts"
+        self.lock_key = f"{prefix}:flush-lock"
+        self._counts: Counter[Fingerprint] = Counter()
+        self._lock = threading.Lock()
+        self._flushing = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._redis = None
+        if redis_url:
+            import redis
+
+            self._redis = redis.Redis.from_url(
+                redis_url, socket_timeout=0.5, socket_connect_timeout=0.5
+            )
+
+    def add(self, fingerprints) -> None:
+        with self._lock:
+            self._counts.update(fingerprints)
+            full = len(self._counts) >= self.max_keys
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="csp-report-flush", daemon=True
+                )
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:  # noqa: BLE001 - keep the thread alive
+                logger.exception("Could not store CSP reports")
+            finally:
+                connections.close_all()
+
+    def stop(self) -> None:
+        """Stop the flush thread (buffered counts stay until :meth:`flush`)."""
+
+        self._stopped.set()
+        self._wake.set()
+
+    def flush(self) -> int:
+        """Flush buffered counts; return how many reports reached the database."""
+
+        # One flush at a time per process; concurrent callers keep counting.
+        if not self._flushing.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                counts, self._counts = self._counts, Counter()
+            if self._redis is not None:
+                counts = self._flush_redis(counts)
+            try:
+                stored = store_counts(counts)
+            except Exception:
+                # Keep the counts (including any drained from Redis) for the
+                # next flush rather than dropping them with the failed write.
+                with self._lock:
+                    self._counts.update(counts)
+                raise
+            if stored:
+                logger.info("Stored %s CSP reports (%s fingerprints)", stored, len(counts))
+            return stored
+        finally:
+            self._flushing.release()
+
+    def _flush_redis(self, counts: dict[Fingerprint, int]) -> dict[Fingerprint, int]:
+        """Push local counts to Redis; return what this process must store."""
+
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key, count in counts.items():
+                pipe.hincrby(self.hash_key, _SEPARATOR.join(key), count)
+            pipe.execute()
+        except Exception:  # noqa: BLE001 - degrade to a direct write
+            logger.warning("Redis unavailable, storing CSP counts directly")
+            return counts
+        # From here on the counts are in Redis: on failure, leave them there
+        # for the next drain instead of storing them directly as well.
+        try:
+            return self._drain_redis()
+        except Exception:  # noqa: BLE001
+            logger.warning("Could not drain CSP counts from Redis, retrying next flush")
+            return {}
+
+    def _drain_redis(self) -> dict[Fingerprint, int]:
+        """Take the shared counts out of Redis if this process wins the lock."""
+
+        ttl = max(1, int(self.flush_interval * 1000))
+        if not self._redis.set(self.lock_key, 1, nx=True, px=ttl):
+            return {}
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.hgetall(self.hash_key)
+        pipe.delete(self.hash_key)
+        shared, _ = pipe.execute()
+        return {
+            tuple(field.decode().split(_SEPARATOR, 2)): int(value)
+            for field, value in shared.items()
+        }
+
+
+_aggregator: CSPReportAggregator | None = None
+_aggregator_lock = threading.Lock()
+
+
+def get_aggregator() -> CSPReportAggregator:
+    """Return the process-wide aggregator (flushed at exit)."""
+
+    global _aggregator
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = CSPReportAggregator(
+                    redis_url=getattr(settings, "CSP_REPORT_REDIS_URL", ""),
+                    prefix=getattr(settings, "CSP_REPORT_KEY_PREFIX", "csp"),
+                    flush_interval=getattr(settings, "CSP_REPORT_FLUSH_INTERVAL", 30),
+                    max_keys=getattr(settings, "CSP_REPORT_MAX_KEYS", 1000),
+                )
+                atexit.register(_flush_at_exit, _aggregator)
+    return _aggregator
+
+
+def _flush_at_exit(aggregator: CSPReportAggregator) -> None:
+    try:
+        aggregator.flush()
+    except Exception:  # noqa: BLE001 - the database may already be gone
+        logger.exception("Could not store buffered CSP reports at exit")
+
+
+def reset_aggregator() -> None:
+    """Drop the aggregator without flushing (tests, after fork)."""
+
+    global _aggregator
+    with _aggregator_lock:
+        atexit.unregister(_flush_at_exit)
+        if _aggregator is not None:
+            _aggregator.stop()
+        _aggregator = None
+
+
+def record(outcome: str, count: int = 1) -> None:
+    metrics.csp_reports[outcome].inc(count)
@@ -0,0 +1,166 @@
+"""Per-route database instrumentation.
+
+``django_prometheus`` database backends only count queries globally.
+:class:`DBInstrumentationMiddleware` records the queries of a request in
+a :class:`QueryStats` and, once the response is ready, observes three
+histograms labelled by route (URL name, or route pattern for unnamed URLs):
+
+- ``django_route_db_queries``: queries per request;
+- ``django_route_db_query_seconds``: DB time per request;
+- ``django_route_db_duplicate_queries``: queries whose SQL (before
+  parameters are bound) already ran in the same request. That is the
+  signature of an N+1, e.g. a serializer walking an un-prefetched relation.
+
+The stats of the current request are also available as
+``request.db_stats``.
+
+Notes
+-----
+- The SQL is compared as a template (``... WHERE id = %s``), so ten lookups
+  with different ids count as nine duplicates, which is the point.
+- Requests that do not resolve to a route (404) are labelled
+  ``<unresolved>`` so label cardinality stays bounded.
+- The wrapper costs two ``perf_counter`` calls and a dict update per query.
+- Django connections are per thread, and under ASGI the ORM runs in
+  ``sync_to_async`` threads, not on the event loop where the middleware
+  runs. So every connection gets one permanent execute wrapper when it is
+  opened (``connection_created``), which forwards queries to the recorders
+  of :func:`record_queries` held in a context variable. ``sync_to_async``
+  copies the context to the thread running the query, so the request's
+  recorders see it. Outside a recording block the wrapper costs one
+  context variable lookup.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import metrics
+
+UNRESOLVED = "<unresolved>"
+
+_recorders: ContextVar[tuple] = ContextVar("db_recorders", default=())
+
+
+class QueryStats:
+    """``execute_wrapper`` counting queries, DB time and repeated SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter[str] = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self) -> int:
+        return self.count - len(self.statements)
+
+    def repeated(self, minimum: int = 2) -> list[tuple[str, int]]:
+        """SQL run at least ``minimum`` times, most repeated first."""
+
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= minimum]
+
+
+def _dispatch(execute, sql, params, many, context):
+    """Execute wrapper of every connection: run the active recorders."""
+
+    for recorder in _recorders.get():
+        execute = partial(recorder, execute)
+    return execute(sql, params, many, context)
+
+
+def install(connection) -> None:
+    """Add the dispatching execute wrapper to ``connection`` (once)."""
+
+    if _dispatch not in connection.execute_wrappers:
+        # First, so ``execute_wrapper()`` blocks (which pop the last
+        # wrapper on exit) never remove it.
+        connection.execute_wrappers.insert(0, _dispatch)
+
+
+@receiver(connection_created)
+def _install_on_connect(sender, connection, **kwargs) -> None:
+    install(connection)
+
+
+@contextmanager
+def record_queries(stats: QueryStats | None = None):
+    """Record the queries run inside the block, in whichever thread runs them.
+
+    Covers the queries of this context and of the ``sync_to_async`` calls
+    it makes (see the module docstring).
+    """
+
+    stats = stats if stats is not None else QueryStats()
+    # Connections of this thread opened before the signal was connected.
+    for alias in connections:
+        install(connections[alias])
+    token = _recorders.set((*_recorders.get(), stats))
+    try:
+        yield stats
+    finally:
+        _recorders.reset(token)
+
+
+def route_name(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNRESOLVED
+    return match.view_name or match.route or UNRESOLVED
+
+
+def observe(route: str, stats: QueryStats) -> None:
+    metrics.route_db_queries[route].observe(stats.count)
+    metrics.route_db_query_seconds[route].observe(stats.duration)
+    metrics.route_db_duplicate_queries[route].observe(stats.duplicates)
+
+
+class DBInstrumentationMiddleware:
+    """Export per-route query count, DB time and duplicate queries.
+
+    Place it near the top of ``MIDDLEWARE`` so queries run by other
+    middleware (sessions, authentication) are attributed to the route too.
+    Disabled with ``DB_INSTRUMENTATION_ENABLED=False``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with record_queries() as stats:
+            request.db_stats = stats
+            response = self.get_response(request)
+        observe(route_name(request), stats)
+        return response
+
+    async def __acall__(self, request):
+        with record_queries() as stats:
+            request.db_stats = stats
+            response = await self.get_response(request)
+        observe(route_name(request), stats)
+        return response
@@ -0,0 +1,126 @@
+"""Prometheus metrics for the PostgreSQL connection pools.
+
+With ``DB_POOL`` (settings/base.py) Django keeps one ``psycopg_pool``
+pool per database alias and process. :func:`sample` copies the pools' own
+statistics into the ``django_db_pool_*`` metrics (apps/utils/metrics.py),
+next to the ``django_db_*`` metrics of ``django_prometheus``, labelled by
+alias:
+
+- ``django_db_pool_size`` / ``django_db_pool_available`` /
+  ``django_db_pool_max_size``: open, idle and maximum connections;
+- ``django_db_pool_saturation``: busy connections / max size (1.0 means
+  every new request waits);
+- ``django_db_pool_requests_waiting``: requests waiting for a connection;
+- ``django_db_pool_requests_total``, ``django_db_pool_requests_queued_total``
+  and ``django_db_pool_wait_seconds_total``: checkouts, checkouts that had
+  to wait, and the time they waited (mean wait =
+  ``rate(wait_seconds) / rate(requests_queued)``);
+- ``django_db_pool_timeouts_total``: checkouts that gave up after
+  ``DB_POOL_TIMEOUT``; ``django_db_pool_connections_lost_total``:
+  connections found broken by the health check.
+
+Notes
+-----
+- Each worker samples its own pools every ``DB_POOL_METRICS_INTERVAL``
+  seconds from a daemon thread, started when the process opens its first
+  pooled connection (:func:`start_sampler`), so idle workers keep
+  reporting and the metrics do not depend on any middleware. A scrape-time
+  collector would only see the worker answering the scrape in
+  multiprocess mode.
+- The pool counters are popped (reset) on every sample and added to the
+  Prometheus counters.
+- Reading the statistics takes the pool's lock briefly, no database
+  round trip.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Prometheus counter -> psycopg_pool statistic (present once non-zero).
+COUNTERS = (
+    (metrics.db_pool_requests_total, "requests_num"),
+    (metrics.db_pool_requests_queued_total, "requests_queued"),
+    (metrics.db_pool_timeouts_total, "requests_errors"),
+    (metrics.db_pool_connections_lost_total, "connections_lost"),
+)
+
+_sampler: threading.Thread | None = None
+_sampler_lock = threading.Lock()
+
+
+def existing_pools() -> dict:
+    """Pools this process has created, by alias.
+
+    ``connection.pool`` would create a missing pool (and open connections),
+    e.g. in a gunicorn master whose pools were closed before forking.
+    """
+
+    pools = {}
+    for alias in connections:
+        created = getattr(connections[alias], "_connection_pools", {})
+        if alias in created:
+            pools[alias] = created[alias]
+    return pools
+
+
+def sample(pools: dict | None = None) -> None:
+    """Copy the statistics of ``pools`` (default: every pool) to the metrics."""
+
+    pools = existing_pools() if pools is None else pools
+    for alias, pool in pools.items():
+        stats = pool.pop_stats()
+        size, available = stats.get("pool_size", 0), stats.get("pool_available", 0)
+        maximum = stats.get("pool_max", 0)
+        metrics.db_pool_size.labels(alias).set(size)
+        metrics.db_pool_available.labels(alias).set(available)
+        metrics.db_pool_max_size.labels(alias).set(maximum)
+        metrics.db_pool_requests_waiting.labels(alias).set(stats.get("requests_waiting", 0))
+        metrics.db_pool_saturation.labels(alias).set((size - available) / max(maximum, 1))
+        for counter, key in COUNTERS:
+            counter.labels(alias).inc(stats.get(key, 0))
+        metrics.db_pool_wait_seconds_total.labels(alias).inc(
+            stats.get("requests_wait_ms", 0) / 1000
+        )
+
+
+def _run_sampler() -> None:
+    while True:
+        time.sleep(getattr(settings, "DB_POOL_METRICS_INTERVAL", 5))
+        try:
+            sample()
+        except Exception:  # noqa: BLE001 - keep sampling
+            logger.exception("Could not sample the connection pools")
+
+
+def start_sampler() -> None:
+    """Start this process's sampling thread unless it is running.
+
+    A thread does not survive a fork: a worker forked from a master that
+    started one starts its own.
+    """
+
+    global _sampler
+    if _sampler is not None and _sampler.is_alive():
+        return
+    with _sampler_lock:
+        if _sampler is None or not _sampler.is_alive():
+            _sampler = threading.Thread(target=_run_sampler, name="db-pool-metrics", daemon=True)
+            _sampler.start()
+
+
+@receiver(connection_created)
+def _start_sampler_on_connect(sender, connection, **kwargs) -> None:
+    if connection.settings_dict.get("OPTIONS", {}).get("pool"):
+        start_sampler()
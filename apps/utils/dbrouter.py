@@ -0,0 +1,274 @@
+"""Read replicas with read-your-writes stickiness.
+
+Replicas are configured with ``DB_REPLICA_URLS`` (settings/base.py): each
+URL becomes a ``replicaN`` database whose weight is read from its
+``?weight=`` query parameter (``DB_REPLICAS = {alias: weight}``).
+
+Routing
+-------
+- Only views that opt in read from a replica: DRF/class views with
+  :class:`ReplicaReadMixin`, function views with :func:`read_from_replica`.
+  They are read-only, safe-method views (the public pages API, user
+  lists). Everything else, including management commands, uses
+  ``default``.
+- One replica is picked per request, by weighted round robin over the
+  healthy replicas, so all reads of a request see the same snapshot.
+- A replica that fails with a connection-level error (``OperationalError``
+  / ``InterfaceError``) is ejected for ``DB_REPLICA_EJECT_SECONDS``, and the
+  view is run again on the primary. Opted-in views are read-only, so
+  running them twice is safe.
+
+Read-your-writes
+----------------
+Any write (``db_for_write``) switches the rest of the request to the
+primary. :class:`ReplicaMiddleware` then sets a ``db_primary_until``
+cookie, so the client's next requests also read from the primary for
+``DB_REPLICA_STICKY_SECONDS`` (replication lag budget). A user who just
+updated their profile therefore never reads it back from a lagging
+replica.
+
+Notes
+-----
+- Clients that drop cookies (some API clients) only get the in-request
+  guarantee.
+- Replicas mirror ``default`` in tests (``TEST["MIRROR"]``) and never run
+  migrations.
+- Without ``DB_REPLICA_URLS`` the router always answers ``default``.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import InterfaceError, OperationalError
+from django.dispatch import receiver
+
+from . import metrics
+from .middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "default"
+STICKY_COOKIE = "db_primary_until"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+CONNECTION_ERRORS = (OperationalError, InterfaceError)
+
+
+@dataclass
+class RoutingState:
+    """Per-request routing decisions (stored in a context variable)."""
+
+    sticky: bool = False  # recent write by this client: primary only
+    replica_reads: bool = False  # inside an opted-in view
+    wrote: bool = False
+    replica: str | None = None  # replica picked for this request
+
+
+_state: contextvars.ContextVar[RoutingState | None] = contextvars.ContextVar(
+    "db_routing_state", default=None
+)
+
+
+class ReplicaPool:
+    """Weighted round robin over replicas, skipping ejected ones."""
+
+    def __init__(self, weights: dict[str, int]):
+        self.schedule = [alias for alias, weight in weights.items() for _ in range(max(weight, 0))]
+        self._position = 0
+        self._down_until: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def pick(self) -> str | None:
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.schedule)):
+                alias = self.schedule[self._position]
+                self._position = (self._position + 1) % len(self.schedule)
+                if self._down_until.get(alias, 0.0) <= now:
+                    return alias
+        return None
+
+    def eject(self, alias: str, seconds: float) -> None:
+        with self._lock:
+            self._down_until[alias] = time.monotonic() + seconds
+        metrics.db_replica_ejections_total.labels(alias=alias).inc()
+        logger.warning("Replica %s ejected for %ss", alias, seconds)
+
+
+_pool: ReplicaPool | None = None
+
+
+def get_pool() -> ReplicaPool:
+    global _pool
+    if _pool is None:
+        _pool = ReplicaPool(getattr(settings, "DB_REPLICAS", {}))
+    return _pool
+
+
+def reset_pool() -> None:
+    """Forget ejections and rebuild the pool from settings on next use."""
+
+    global _pool
+    _pool = None
+
+
+@receiver(setting_changed)
+def _reset_pool(*, setting, **kwargs):
+    if setting == "DB_REPLICAS":
+        reset_pool()
+
+
+class ReplicaRouter:
+    """``DATABASE_ROUTERS`` entry (see module docstring)."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_reads or state.sticky or state.wrote:
+            return None
+        if state.replica is None:
+            state.replica = get_pool().pick() or PRIMARY
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replicas hold the same data as the primary
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, "DB_REPLICAS", {}):
+            return False
+        return None
+
+
+class ReplicaMiddleware(HybridMiddleware):
+    """Track writes per request and keep writers on the primary for a while."""
+
+    def before(self, request):
+        sticky = False
+        with suppress(ValueError):
+            sticky = float(request.COOKIES.get(STICKY_COOKIE) or 0) > time.time()
+        request.db_routing = RoutingState(sticky=sticky)
+        request._db_routing_token = _state.set(request.db_routing)
+
+    def process(self, request, response):
+        state = request.db_routing
+        _state.reset(request._db_routing_token)
+        if state.wrote:
+            seconds = getattr(settings, "DB_REPLICA_STICKY_SECONDS", 15)
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(int(time.time() + seconds)),
+                max_age=seconds,
+                httponly=True,
+                samesite="Lax",
+                secure=getattr(settings, "SESSION_COOKIE_SECURE", False),
+            )
+        return response
+
+
+def _enter_replica_reads(request) -> tuple[RoutingState, bool] | None:
+    state = _state.get()
+    if state is None or request.method not in SAFE_METHODS or state.sticky:
+        return None
+    previous = state.replica_reads
+    state.replica_reads = True
+    return state, previous
+
+
+def _replica_failed(state: RoutingState, exc: Exception) -> bool:
+    """Eject the request's replica after a connection error; True to retry."""
+
+    alias = state.replica
+    if alias is None or alias == PRIMARY or not isinstance(exc, CONNECTION_ERRORS):
+        return False
+    get_pool().eject(alias, getattr(settings, "DB_REPLICA_EJECT_SECONDS", 30))
+    state.replica = PRIMARY
+    return True
+
+
+def run_on_replica(request, call):
+    """Run ``call()`` with replica reads enabled, retrying on the primary."""
+
+    entered = _enter_replica_reads(request)
+    if entered is None:
+        return call()
+    state, previous = entered
+    try:
+        try:
+            return call()
+        except CONNECTION_ERRORS as exc:
+            if not _replica_failed(state, exc):
+                raise
+        return call()
+    finally:
+        state.replica_reads = previous
+
+
+async def arun_on_replica(request, call):
+    """Async :func:`run_on_replica` (``call()`` returns an awaitable)."""
+
+    entered = _enter_replica_reads(request)
+    if entered is None:
+        return await call()
+    state, previous = entered
+    try:
+        try:
+            return await call()
+        except CONNECTION_ERRORS as exc:
+            if not _replica_failed(state, exc):
+                raise
+        return await call()
+    finally:
+        state.replica_reads = previous
+
+
+def read_from_replica(view):
+    """Let a read-only function view read from a replica."""
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            return await arun_on_replica(request, lambda: view(request, *args, **kwargs))
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return run_on_replica(request, lambda: view(request, *args, **kwargs))
+
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """Let a read-only class-based view read from a replica.
+
+    On ViewSets, ``replica_actions`` limits replica reads to some actions
+    (e.g. ``{"list"}``); other views use replicas for every safe method.
+    Must be listed before the view class in the bases.
+    """
+
+    replica_actions: frozenset[str] | set[str] | None = None
+
+    def dispatch(self, request, *args, **kwargs):
+        dispatch = super().dispatch
+        if self.replica_actions is not None:
+            action = (getattr(self, "action_map", None) or {}).get(request.method.lower())
+            if action not in self.replica_actions:
+                return dispatch(request, *args, **kwargs)
+        if getattr(self, "view_is_async", False):
+            return arun_on_replica(request, lambda: dispatch(request, *args, **kwargs))
+        return run_on_replica(request, lambda: dispatch(request, *args, **kwargs))
@@ -0,0 +1,94 @@
+"""Fast JSON encoding shared by DRF renderers and plain Django views.
+
+``orjson`` serializes dicts, lists, strings, numbers and UUIDs natively in C.
+Everything else (datetimes, Decimals, lazy translation strings, querysets,
+...) is delegated to a pluggable *encoder class* whose ``default()`` method
+is used as orjson's fallback. The default is DRF's ``JSONEncoder``, so the
+output matches DRF's stock renderer byte for byte for compact responses.
+
+Settings
+--------
+- ``FAST_JSON_ENABLED``: use orjson when installed (default: True).
+- ``FAST_JSON_ENCODER``: dotted path of the fallback encoder class.
+
+When orjson is not installed, or the fast path is disabled, the stdlib
+``json`` module is used with the same encoder class.
+"""
+
+from __future__ import annotations
+
+import json
+from functools import cache
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+try:  # optional: falls back to the stdlib encoder
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+DEFAULT_ENCODER = "rest_framework.utils.encoders.JSONEncoder"
+
+# Datetimes go through the encoder so they keep DRF's "Z" suffix for UTC.
+_ORJSON_OPTIONS = (
+    (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+)
+
+
+@cache
+def _encoder(path: str):
+    return import_string(path)()
+
+
+def get_encoder():
+    """Return the (cached) fallback encoder instance."""
+
+    return _encoder(getattr(settings, "FAST_JSON_ENCODER", DEFAULT_ENCODER))
+
+
+def fast_path_enabled() -> bool:
+    return orjson is not None and getattr(settings, "FAST_JSON_ENABLED", True)
+
+
+def dumps(data) -> bytes:
+    """Serialize ``data`` to compact UTF-8 JSON bytes.
+
+    U+2028 / U+2029 are escaped so the output is a strict JavaScript subset,
+    as DRF does.
+    """
+
+    encoder = get_encoder()
+    if fast_path_enabled():
+        ret = orjson.dumps(data, default=encoder.default, option=_ORJSON_OPTIONS)
+        if b"\xe2\x80" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+    ret = json.dumps(data, cls=type(encoder), ensure_ascii=False, separators=(",", ":"))
+    return ret.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029").encode()
+
+
+def loads(data: bytes | str):
+    """Parse JSON (raises ``ValueError`` on invalid input)."""
+
+    if fast_path_enabled():
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJsonResponse(HttpResponse):
+    """Drop-in replacement for ``JsonResponse`` backed by :func:`dumps`.
+
+    Like ``JsonResponse``, non-dict data requires ``safe=False``.
+    """
+
+    def __init__(self, data, safe: bool = True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the safe "
+                "parameter to False."
+            )
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
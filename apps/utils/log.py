@@ -0,0 +1,222 @@
+"""Non-blocking logging pipeline.
+
+With ``LOG_ASYNC`` enabled, the console handler is a bounded
+:class:`QueueHandler`:
+
+- The request thread only runs the cheap filters (request id, sampling,
+  rate limiting) and enqueues the record. It never blocks: when the queue
+  (``LOG_QUEUE_SIZE``) is full, the record is dropped and counted.
+- A :class:`BatchingQueueListener` thread formats records (JSON or plain)
+  and writes up to ``LOG_BATCH_SIZE`` of them with a single ``write`` +
+  ``flush``.
+- Drops are exported as ``logging_records_dropped_total{reason}``
+  (``queue_full``, ``sampled``, ``rate_limited``).
+
+Filters
+-------
+- :class:`SamplingFilter` keeps a fraction of the records of chosen loggers
+  (``LOG_SAMPLING``, e.g. ``{"apps.utils.apiviews": 0.1}``). Errors are
+  never sampled.
+- :class:`RateLimitFilter` lets at most ``burst`` identical records (same
+  logger, level and formatted message) through, then ``rate`` per second.
+  The next record let through carries ``suppressed=<count>``. Errors are
+  never rate limited, and records that only share a template (``"user %s
+  logged in"``) do not share a bucket.
+
+Both filters also work with the synchronous handler.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler as BaseQueueHandler
+from logging.handlers import QueueListener
+
+from . import metrics
+
+_dropped = metrics.children(
+    metrics.log_records_dropped_total, "reason", ("queue_full", "sampled", "rate_limited")
+)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep ``rates[logger]`` (0..1) of the records of the given loggers."""
+
+    def __init__(self, rates: dict[str, float] | None = None):
+        super().__init__()
+        self.rates = dict(rates or {})
+
+    def filter(self, record) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        rate = self.rates.get(record.name)
+        if rate is None or rate >= 1 or random.random() < rate:  # noqa: S311
+            return True
+        _dropped.sampled.inc()
+        return False
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per (logger, level, formatted message)."""
+
+    def __init__(self, rate: float = 10.0, burst: int = 50, max_keys: int = 10_000):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> [tokens, last refill, suppressed since last pass]
+        self._buckets: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        try:
+            message = record.getMessage()
+        except Exception:  # noqa: BLE001 - reported by the handler when formatting
+            message = str(record.msg)
+        key = (record.name, record.levelno, message)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.clear()
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                allowed = False
+            else:
+                bucket[0] -= 1
+                suppressed, bucket[2] = bucket[2], 0
+                allowed = True
+        if not allowed:
+            _dropped.rate_limited.inc()
+            return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class BatchingQueueListener(QueueListener):
+    """``QueueListener`` that hands handlers whole batches of records."""
+
+    def __init__(self, queue, *handlers, batch_size: int = 256):
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def enqueue_sentinel(self) -> None:
+        # Block rather than fail when the queue is full: the writer drains it.
+        self.queue.put(self._sentinel)
+
+    def _monitor(self):
+        q = self.queue
+        has_task_done = hasattr(q, "task_done")
+        stop = False
+        while not stop:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+            if self._sentinel in batch:
+                stop = True
+                batch = [record for record in batch if record is not self._sentinel]
+            if batch:
+                self.handle_batch(batch)
+            if has_task_done:
+                for _ in range(len(batch) + stop):
+                    q.task_done()
+
+    def handle_batch(self, records) -> None:
+        for handler in self.handlers:
+            if isinstance(handler, BatchStreamHandler):
+                handler.emit_batch(
+                    [record for record in records if record.levelno >= handler.level]
+                )
+            else:
+                for record in records:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """``StreamHandler`` able to write many records with one write/flush."""
+
+    def emit_batch(self, records) -> None:
+        lines = []
+        for record in records:
+            if not self.filter(record):
+                continue
+            try:
+                lines.append(self.format(record))
+            except Exception:  # noqa: BLE001 - same policy as Handler.emit
+                self.handleError(record)
+        if not lines:
+            return
+        try:
+            with self.lock:
+                self.stream.write(self.terminator.join(lines) + self.terminator)
+                self.flush()
+        except Exception:  # noqa: BLE001
+            self.handleError(records[-1])
+
+
+class QueueHandler(BaseQueueHandler):
+    """Bounded, non-blocking console handler (see module docstring).
+
+    Configured from ``LOGGING`` like any handler; its formatter is applied
+    by the background writer, its filters run on the calling thread (so the
+    request id is captured before the record changes thread).
+    """
+
+    def __init__(self, stream=None, capacity: int = 10_000, batch_size: int = 256):
+        super().__init__(queue.Queue(capacity))
+        self.capacity = capacity
+        self.target = BatchStreamHandler(stream)
+        self.batch_size = batch_size
+        self.listener = None
+        self.start()
+        atexit.register(self.stop)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def setFormatter(self, fmt) -> None:
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def start(self) -> None:
+        self.listener = BatchingQueueListener(self.queue, self.target, batch_size=self.batch_size)
+        self.listener.start()
+
+    def _restart_in_child(self) -> None:
+        # Neither the writer thread nor the queue's locks survive a fork
+        # (gunicorn --preload): start over with a fresh queue.
+        self.queue = queue.Queue(self.capacity)
+        self.start()
+
+    def stop(self) -> None:
+        """Flush queued records and stop the writer thread."""
+
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def prepare(self, record):
+        # Formatting is deferred to the listener thread; the record is not
+        # pickled, so it can be queued as is.
+        return record
+
+    def enqueue(self, record) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped.queue_full.inc()
@@ -0,0 +1,83 @@
+"""Compare FastJSONRenderer with DRF's stock JSONRenderer.
+
+Payloads mirror real list responses without touching the database:
+
+- ``users``: ``UserSerializer`` output as returned by ``UserViewSet.list``.
+- ``menus``: ``MenuSerializer`` output (with nested items) as returned by
+  ``MenuListAPIView``.
+
+Both are wrapped in the ``LimitOffsetPagination`` envelope. Only the render
+step is timed, which is what the renderer setting changes.
+
+Usage::
+
+    python manage.py benchmark_json --rows 50 --repeat 2000
+"""
+
+from __future__ import annotations
+
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from apps.pages.models import Menu, MenuItem
+from apps.pages.serializers import MenuSerializer
+from apps.users.models import User
+from apps.users.serializers import UserSerializer
+from apps.utils.renderers import FastJSONRenderer
+
+
+def _paginated(results) -> dict:
+    return {"count": len(results), "next": None, "previous": None, "results": results}
+
+
+def users_payload(rows: int) -> dict:
+    users = [
+        User(id=i, email=f"user{i}@example.com", name=f"User Number {i}", role=User.Types.CUSTOMER)
+        for i in range(1, rows + 1)
+    ]
+    return _paginated(UserSerializer(users, many=True).data)
+
+
+def menus_payload(rows: int) -> dict:
+    menus = []
+    for i in range(1, rows + 1):
+        menu = Menu(id=i, title=f"Menu {i}", link=f"/menu-{i}/", hasChild=True)
+        # Stand-in for prefetch_related("items"): no query is issued.
+        menu._prefetched_objects_cache = {
+            "items": [MenuItem(title=f"Item {i}.{j}", link=f"/m{i}/{j}/") for j in range(5)]
+        }
+        menus.append(menu)
+    return _paginated(MenuSerializer(menus, many=True).data)
+
+
+class Command(BaseCommand):
+    help = "Benchmark FastJSONRenderer against DRF's JSONRenderer on list payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50, help="Rows per payload.")
+        parser.add_argument("--repeat", type=int, default=1000, help="Renders per measurement.")
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        renderers = {"stock": JSONRenderer(), "fast": FastJSONRenderer()}
+        payloads = {"users": users_payload(rows), "menus": menus_payload(rows)}
+
+        for name, payload in payloads.items():
+            stock_bytes = renderers["stock"].render(payload)
+            same = renderers["fast"].render(payload) == stock_bytes
+            timings = {
+                label: min(
+                    timeit.repeat(
+                        lambda r=renderer, p=payload: r.render(p), number=repeat, repeat=3
+                    )
+                )
+                for label, renderer in renderers.items()
+            }
+            per_call = {label: seconds / repeat * 1e6 for label, seconds in timings.items()}
+            self.stdout.write(
+                f"{name:6} rows={rows} bytes={len(stock_bytes)} identical={same} "
+                f"stock={per_call['stock']:.1f}us fast={per_call['fast']:.1f}us "
+                f"speedup={timings['stock'] / timings['fast']:.1f}x"
+            )
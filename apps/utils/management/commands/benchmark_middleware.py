@@ -0,0 +1,118 @@
+"""Measure the per-request overhead of the request id / security headers middleware.
+
+Times ``RequestIdMiddleware(SecurityHeadersMiddleware(view))`` against the
+bare view, next to a copy of the previous implementation (settings read and
+header values rebuilt on every response, UUID4 ids, no contextvar reset),
+in both sync and async mode.
+
+Usage::
+
+    python manage.py benchmark_middleware --repeat 20000
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from apps.utils.middleware import RequestIdMiddleware, SecurityHeadersMiddleware
+from apps.utils.request_id import new_request_id, set_request_id
+
+
+class LegacySecurityHeadersMiddleware:
+    """The previous implementation, kept here as the benchmark baseline."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not getattr(settings, "SECURITY_HEADERS_ENABLED", True):
+            return response
+        response.headers.setdefault("Referrer-Policy", getattr(settings, "REFERRER_POLICY", ""))
+        response.headers.setdefault(
+            "Permissions-Policy", getattr(settings, "PERMISSIONS_POLICY", "")
+        )
+        response.headers.setdefault("X-Content-Type-Options", "nosniff")
+        if getattr(settings, "CSP_ENABLED", False):
+            header_name = (
+                "Content-Security-Policy-Report-Only"
+                if getattr(settings, "CSP_REPORT_ONLY", True)
+                else "Content-Security-Policy"
+            )
+            response.headers.setdefault(header_name, getattr(settings, "CSP_POLICY", ""))
+        return response
+
+
+class LegacyRequestIdMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rid = request.headers.get("X-Request-ID") or new_request_id()
+        set_request_id(rid)
+        response = self.get_response(request)
+        response.headers.setdefault("X-Request-ID", rid)
+        return response
+
+
+class Command(BaseCommand):
+    help = "Benchmark the request id and security headers middleware."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20000, help="Requests per measurement.")
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        factory = RequestFactory()
+
+        def view(request):
+            return HttpResponse(b"ok")
+
+        async def aview(request):
+            return HttpResponse(b"ok")
+
+        def measure(handler) -> float:
+            """Best per-request time (us) of ``handler`` over fresh requests."""
+
+            async def arun(requests):
+                started = time.perf_counter()
+                for request in requests:
+                    await handler(request)
+                return time.perf_counter() - started
+
+            best = float("inf")
+            for _ in range(3):
+                # Fresh requests each round: request.headers is cached per request.
+                requests = [factory.get("/") for _ in range(repeat)]
+                if iscoroutinefunction(handler):
+                    elapsed = asyncio.run(arun(requests))
+                else:
+                    started = time.perf_counter()
+                    for request in requests:
+                        handler(request)
+                    elapsed = time.perf_counter() - started
+                best = min(best, elapsed)
+            return best / repeat * 1e6
+
+        with override_settings(CSP_ENABLED=True):
+            baselines = {"sync": measure(view), "async": measure(aview)}
+            legacy = LegacyRequestIdMiddleware(LegacySecurityHeadersMiddleware(view))
+            rows = [("sync/legacy", "sync", measure(legacy))]
+            for generator in ("uuid4", "sequential"):
+                with override_settings(REQUEST_ID_GENERATOR=generator):
+                    for mode, target in (("sync", view), ("async", aview)):
+                        chain = RequestIdMiddleware(SecurityHeadersMiddleware(target))
+                        rows.append((f"{mode}/{generator}", mode, measure(chain)))
+
+        for label, mode, micros in rows:
+            self.stdout.write(
+                f"{label:18} overhead={micros - baselines[mode]:.2f}us/request "
+                f"(bare {mode} view {baselines[mode]:.2f}us)"
+            )
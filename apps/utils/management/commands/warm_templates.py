@@ -0,0 +1,34 @@
+"""Compile all templates and report the compile time of each one."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.utils.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = "Compile project templates into the cached loader and report per-template timings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--include-apps",
+            action="store_true",
+            help="Also compile templates shipped by installed apps.",
+        )
+
+    def handle(self, *args, **options):
+        results = warm_templates(include_app_dirs=options["include_apps"])
+        failed = 0
+        for result in sorted(results, key=lambda r: r.seconds, reverse=True):
+            line = f"{result.seconds * 1000:8.2f} ms  {result.template}"
+            if result.error:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"{line}  ({result.error})"))
+            else:
+                self.stdout.write(line)
+
+        total = sum(result.seconds for result in results) * 1000
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(results)} templates, {failed} failed, {total:.2f} ms total")
+        )
@@ -0,0 +1,278 @@
+"""Application (business) metrics.
+
+HTTP and database metrics come from ``django_prometheus``; metrics specific
+to this application are declared here, in one place, on the default
+``prometheus_client`` registry so they are exported by the same
+``/metrics`` endpoint.
+
+Declaring metrics
+-----------------
+Use :func:`counter`, :func:`histogram` and :func:`gauge` rather than the
+``prometheus_client`` classes: they register on the default registry and
+make every gauge state how it aggregates across processes.
+
+Multiprocess mode
+-----------------
+Under gunicorn each worker keeps its own values. With
+``PROMETHEUS_MULTIPROC_DIR`` set (gunicorn.conf.py does it) workers write
+their values to shared files and ``/metrics`` (``django_prometheus``)
+aggregates them: counters and histograms are summed; gauges follow their
+``multiprocess_mode`` (``livesum``: total over live workers, ``livemax``:
+worst live worker). Custom collectors only see the worker answering the
+scrape, so every metric here is a plain counter, histogram or gauge.
+
+Hot path
+--------
+``metric.labels(...)`` builds a key, takes the metric's lock and looks the
+child up on every call. Bind children once instead:
+
+- :func:`children` pre-binds one child per known label value, as
+  attributes (``logins.success.inc()``);
+- :class:`LabelChildren` binds children of open-ended label values (routes,
+  throttle scopes) on first use (``db_queries[route].observe(n)``).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from types import SimpleNamespace
+
+from prometheus_client import Counter, Gauge, Histogram
+
+
+# ---------------------------------------------------------------------
+# Registry API
+# ---------------------------------------------------------------------
+def counter(name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+    return Counter(name, documentation, list(labels))
+
+
+def histogram(
+    name: str, documentation: str, labels: Iterable[str] = (), buckets=Histogram.DEFAULT_BUCKETS
+) -> Histogram:
+    return Histogram(name, documentation, list(labels), buckets=buckets)
+
+
+def gauge(
+    name: str, documentation: str, labels: Iterable[str] = (), *, multiprocess_mode: str
+) -> Gauge:
+    return Gauge(name, documentation, list(labels), multiprocess_mode=multiprocess_mode)
+
+
+def children(metric, label: str, values: Iterable[str], **fixed) -> SimpleNamespace:
+    """Children of ``metric`` for each value of ``label``, as attributes.
+
+    ``fixed`` gives the other labels, e.g. ``children(m, "result", ("hit",
+    "miss"), endpoint="home")``.
+    """
+
+    return SimpleNamespace(**{value: metric.labels(**fixed, **{label: value}) for value in values})
+
+
+class LabelChildren(dict):
+    """Children of a one-label metric, bound on first use: ``bound[value]``."""
+
+    def __init__(self, metric):
+        super().__init__()
+        self.metric = metric
+
+    def __missing__(self, value):
+        # labels() is locked and returns the same child to concurrent callers.
+        child = self[value] = self.metric.labels(value)
+        return child
+
+
+OUTCOMES = ("success", "failure", "throttled", "error")
+
+
+def record_outcome(outcomes: SimpleNamespace, status_code: int) -> None:
+    """Count a response on ``children(metric, "outcome", OUTCOMES)``."""
+
+    if status_code < 400:
+        outcomes.success.inc()
+    elif status_code == 429:
+        outcomes.throttled.inc()
+    elif status_code < 500:
+        outcomes.failure.inc()
+    else:
+        outcomes.error.inc()
+
+
+# ---------------------------------------------------------------------
+# Authentication
+# ---------------------------------------------------------------------
+# Buckets sized for PBKDF2 (tens to hundreds of milliseconds).
+HASH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+
+password_hash_seconds = histogram(
+    "auth_password_hash_seconds",
+    "Time spent hashing/verifying a password in the hash pool.",
+    buckets=HASH_BUCKETS,
+)
+password_hash_queue_wait_seconds = histogram(
+    "auth_password_hash_queue_wait_seconds",
+    "Time a password hash waited for a free hash pool worker.",
+    buckets=HASH_BUCKETS,
+)
+password_hash_in_flight = gauge(
+    "auth_password_hash_in_flight",
+    "Password hashes running or queued in the hash pool.",
+    multiprocess_mode="livesum",
+)
+password_hash_rejected_total = counter(
+    "auth_password_hash_rejected_total",
+    "Password hashes rejected because the hash pool was saturated.",
+)
+
+logins = children(
+    counter("auth_logins_total", "Token logins (JWT obtain), by outcome.", ["outcome"]),
+    "outcome",
+    OUTCOMES,
+)
+token_refreshes = children(
+    counter("auth_token_refreshes_total", "JWT refreshes, by outcome.", ["outcome"]),
+    "outcome",
+    OUTCOMES,
+)
+
+# ---------------------------------------------------------------------
+# Caching and rate limiting
+# ---------------------------------------------------------------------
+# result: hit (served from the cache), miss (rendered and stored) or
+# not_modified (304 from the cached validators).
+CACHE_RESULTS = ("hit", "miss", "not_modified")
+
+pages_cache_requests_total = counter(
+    "pages_cache_requests_total",
+    "Cached pages/API responses, by endpoint and result.",
+    ["endpoint", "result"],
+)
+
+ratelimit_rejections = LabelChildren(
+    counter(
+        "ratelimit_rejections_total",
+        "Requests over their rate limit, by throttle scope or rate-limited view.",
+        ["scope"],
+    )
+)
+
+# ---------------------------------------------------------------------
+# Logging and CSP reports
+# ---------------------------------------------------------------------
+log_records_dropped_total = counter(
+    "logging_records_dropped_total",
+    "Log records dropped before output (queue_full, sampled, rate_limited).",
+    ["reason"],
+)
+
+csp_reports = LabelChildren(
+    counter(
+        "csp_reports_total",
+        "CSP violation reports received, by outcome (accepted or rejection reason).",
+        ["outcome"],
+    )
+)
+
+# ---------------------------------------------------------------------
+# Database
+# ---------------------------------------------------------------------
+# Per-route database usage (apps/utils/dbmetrics.py).
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+route_db_queries = LabelChildren(
+    histogram(
+        "django_route_db_queries",
+        "Database queries per request, by route.",
+        ["route"],
+        buckets=QUERY_COUNT_BUCKETS,
+    )
+)
+route_db_query_seconds = LabelChildren(
+    histogram(
+        "django_route_db_query_seconds",
+        "Database time per request, by route.",
+        ["route"],
+        buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    )
+)
+route_db_duplicate_queries = LabelChildren(
+    histogram(
+        "django_route_db_duplicate_queries",
+        "Queries per request repeating an SQL statement already run (N+1), by route.",
+        ["route"],
+        buckets=QUERY_COUNT_BUCKETS,
+    )
+)
+
+db_replica_ejections_total = counter(
+    "db_replica_ejections_total",
+    "Read replicas taken out of rotation after a connection error (apps/utils/dbrouter.py).",
+    ["alias"],
+)
+
+# Connection pools (apps/utils/dbpool.py), by database alias.
+db_pool_size = gauge(
+    "django_db_pool_size",
+    "Open connections in the pool.",
+    ["alias"],
+    multiprocess_mode="livesum",
+)
+db_pool_available = gauge(
+    "django_db_pool_available",
+    "Idle connections in the pool.",
+    ["alias"],
+    multiprocess_mode="livesum",
+)
+db_pool_max_size = gauge(
+    "django_db_pool_max_size",
+    "Maximum connections of the pool.",
+    ["alias"],
+    multiprocess_mode="livesum",
+)
+db_pool_requests_waiting = gauge(
+    "django_db_pool_requests_waiting",
+    "Requests waiting for a pool connection.",
+    ["alias"],
+    multiprocess_mode="livesum",
+)
+db_pool_saturation = gauge(
+    "django_db_pool_saturation",
+    "Busy connections / maximum pool size (worst worker).",
+    ["alias"],
+    multiprocess_mode="livemax",
+)
+db_pool_requests_total = counter(
+    "django_db_pool_requests", "Connections requested from the pool.", ["alias"]
+)
+db_pool_requests_queued_total = counter(
+    "django_db_pool_requests_queued",
+    "Connection requests that had to wait for a free connection.",
+    ["alias"],
+)
+db_pool_wait_seconds_total = counter(
+    "django_db_pool_wait_seconds",
+    "Time connection requests waited for a free connection.",
+    ["alias"],
+)
+db_pool_timeouts_total = counter(
+    "django_db_pool_timeouts", "Connection requests that timed out.", ["alias"]
+)
+db_pool_connections_lost_total = counter(
+    "django_db_pool_connections_lost",
+    "Pool connections found broken by the health check.",
+    ["alias"],
+)
+
+# ---------------------------------------------------------------------
+# Profiling (apps/utils/profiling.py)
+# ---------------------------------------------------------------------
+profiled_requests = children(
+    counter(
+        "profiling_requests_total",
+        "Requests selected for profiling: sampled, signed header, or busy "
+        "(skipped while another request of the process was profiled).",
+        ["outcome"],
+    ),
+    "outcome",
+    ("sample", "header", "busy"),
+)
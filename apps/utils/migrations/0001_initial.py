@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="CSPViolation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "window",
+                    models.DateTimeField(
+                        help_text="Start of the hour the reports were flushed in."
+                    ),
+                ),
+                ("directive", models.CharField(max_length=64)),
+                ("blocked_uri", models.CharField(max_length=255)),
+                ("document_uri", models.CharField(max_length=255)),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("last_seen", models.DateTimeField()),
+            ],
+            options={
+                "ordering": ("-window", "-count"),
+                "indexes": [models.Index(fields=["-window"], name="utils_cspvi_window_11a9bf_idx")],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("window", "directive", "blocked_uri", "document_uri"),
+                        name="csp_violation_fingerprint",
+                    )
+                ],
+            },
+        ),
+    ]
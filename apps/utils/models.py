@@ -1,3 +1,25 @@
 from django.db import models
 
-# Create your models here.
+
+class CSPViolation(models.Model):
+    """Hourly count of one CSP violation fingerprint (see apps/utils/csp.py)."""
+
+    window = models.DateTimeField(help_text="Start of the hour the reports were flushed in.")
+    directive = models.CharField(max_length=64)
+    blocked_uri = models.CharField(max_length=255)
+    document_uri = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["window", "directive", "blocked_uri", "document_uri"],
+                name="csp_violation_fingerprint",
+            ),
+        ]
+        indexes = [models.Index(fields=["-window"])]
+        ordering = ("-window", "-count")
+
+    def __str__(self) -> str:
+        return f"{self.directive} {self.blocked_uri} ({self.count})"
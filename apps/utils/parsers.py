@@ -0,0 +1,21 @@
+"""DRF parsers.
+
+``FastJSONParser`` decodes request bodies with orjson (see fastjson.py).
+"""
+
+from __future__ import annotations
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .fastjson import loads
+
+
+class FastJSONParser(JSONParser):
+    """Parse JSON request bodies through orjson."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}") from exc
@@ -0,0 +1,55 @@
+"""Process lifecycle hooks for pre-forking servers (gunicorn.conf.py).
+
+With ``preload_app`` the application is imported once in the gunicorn
+master and the workers are forked from it, so code, settings and warmed
+templates are shared copy-on-write. Whatever holds a socket, a thread or a
+lock must not cross the fork though:
+
+- :func:`before_fork` runs in the master before each fork and closes its
+  database connections and connection pools, so no worker inherits (and
+  later shares) a socket with the master or a sibling.
+- :func:`after_fork` runs in each new worker and drops the process-wide
+  singletons created during preload: the password hash pool and the bulk
+  import pools (their threads do not survive the fork), the rate limiter,
+  CSP aggregator and profile store (Redis clients, locks, buffered counts)
+  and the replica pool.
+
+Notes
+-----
+- Django opens database connections lazily, per thread, so workers connect
+  on their first query.
+- The cache's Redis connection pools (django-redis / redis-py) detect the
+  fork by pid and reconnect on their own; the logging queue and the request
+  id generator register their own ``os.register_at_fork`` handlers.
+"""
+
+from __future__ import annotations
+
+from django.db import connections
+
+
+def before_fork() -> None:
+    """Close the master's database connections and pools."""
+
+    connections.close_all()
+    for alias in connections:
+        connection = connections[alias]
+        # ``connection.pool`` would create the pool: only close existing ones.
+        if alias in getattr(connection, "_connection_pools", {}):
+            connection.close_pool()
+
+
+def after_fork() -> None:
+    """Drop per-process state inherited from the master."""
+
+    from apps.users.hashing import reset_hash_pool
+    from apps.users.imports import reset_import_pools
+
+    from . import csp, dbrouter, profiling, ratelimit
+
+    reset_hash_pool()
+    reset_import_pools()
+    ratelimit.reset_limiter()
+    csp.reset_aggregator()
+    dbrouter.reset_pool()
+    profiling.reset_store()
@@ -0,0 +1,455 @@
+"""Sampled and on-demand request profiling.
+
+Recording every request (Silk's default) is far too expensive for
+production. With ``PROFILING_ENABLED``, :class:`ProfilingMiddleware`
+profiles only:
+
+- a random ``PROFILING_SAMPLE_RATE`` fraction of requests (0 by default);
+- requests carrying a signed ``X-Profile`` header. Staff get a token from
+  the viewer (``/profiles/``); it is signed with ``SECRET_KEY`` and expires
+  after ``PROFILING_TOKEN_MAX_AGE`` seconds, so clients cannot forge it and
+  profile at will.
+
+A profiled request gets a call tree (top functions by cumulative
+time, and their callees) and an SQL timeline (offset, duration and SQL of
+each query). Profiles go to a bounded ring buffer of
+``PROFILING_BUFFER_SIZE`` entries: a Redis list with
+``PROFILING_REDIS_URL``, otherwise JSON files in ``PROFILING_DIR`` (shared
+by the workers of one host). The response carries ``X-Profile-Id``.
+
+With ``SILK_ENABLED``, Silk records the same requests
+(``SILKY_INTERCEPT_FUNC`` calls :func:`should_profile`). Requests are
+selected when either setting is on, so Silk works without
+``PROFILING_ENABLED``.
+
+Notes
+-----
+- One request per process is profiled at a time; others that qualify
+  meanwhile are skipped (``profiling_requests_total{outcome="busy"}``).
+- Only the thread serving the request is profiled. Since Python 3.12
+  cProfile is built on ``sys.monitoring`` and sees every thread of the
+  process, so :class:`ThreadProfiler` collects the same statistics through
+  ``sys.setprofile``, which is per thread.
+- Requests are not profiled under ASGI. There the thread is the event
+  loop, which runs every concurrent request, so their frames would be
+  mixed into the call tree.
+- Profiling slows the profiled request down several times (the profiler
+  is pure Python); the others only pay for :func:`should_profile` (a header
+  lookup and a random draw).
+- The SQL of the timeline is stored without parameters.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+import orjson
+from django.conf import settings
+from django.core import signing
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from . import metrics
+from .dbmetrics import record_queries
+from .middleware import HybridMiddleware
+from .request_id import get_request_id
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+SALT = "apps.utils.profiling"
+PROFILE_ID = re.compile(r"[0-9a-f]{32}")
+# Never profile the viewer itself, metrics scrapes or static files.
+EXCLUDED_PREFIXES = ("/profiles/", "/metrics", "/static/", "/health/")
+# Heavy fields, left out of the ring buffer listing.
+DETAIL_FIELDS = ("sql", "functions", "callees")
+
+
+# ---------------------------------------------------------------------
+# Sampling decision
+# ---------------------------------------------------------------------
+def make_token(user) -> str:
+    """Signed ``X-Profile`` header value for a staff user."""
+
+    return signing.dumps({"user": user.pk}, salt=SALT)
+
+
+def check_token(value: str) -> bool:
+    try:
+        signing.loads(value, salt=SALT, max_age=getattr(settings, "PROFILING_TOKEN_MAX_AGE", 3600))
+    except signing.BadSignature:
+        return False
+    return True
+
+
+_UNDECIDED = object()
+
+
+def should_profile(request) -> str | None:
+    """Why ``request`` is profiled (``"header"`` or ``"sample"``), or None.
+
+    The decision is made once per request, so Silk and the middleware agree.
+    """
+
+    reason = getattr(request, "_profile_reason", _UNDECIDED)
+    if reason is not _UNDECIDED:
+        return reason
+    reason = None
+    enabled = getattr(settings, "PROFILING_ENABLED", False) or getattr(
+        settings, "SILK_ENABLED", False
+    )
+    if enabled and not request.path.startswith(EXCLUDED_PREFIXES):
+        token = request.META.get("HTTP_X_PROFILE")
+        if token and check_token(token):
+            reason = "header"
+        elif random.random() < getattr(settings, "PROFILING_SAMPLE_RATE", 0.0):  # noqa: S311
+            reason = "sample"
+    request._profile_reason = reason
+    return reason
+
+
+# ---------------------------------------------------------------------
+# Capture
+# ---------------------------------------------------------------------
+class SQLTimeline:
+    """``execute_wrapper`` recording when each query ran and for how long."""
+
+    def __init__(self, origin: float, limit: int):
+        self.origin = origin
+        self.limit = limit
+        self.count = 0
+        self.duration = 0.0
+        self.entries: list[dict] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if len(self.entries) < self.limit:
+                self.entries.append(
+                    {
+                        "start_ms": round((start - self.origin) * 1000, 3),
+                        "duration_ms": round(duration * 1000, 3),
+                        "alias": context["connection"].alias,
+                        "sql": sql if len(sql) <= 2000 else sql[:2000] + "...",
+                    }
+                )
+
+
+def _c_label(func) -> tuple[str, int, str]:
+    name = getattr(func, "__qualname__", None) or repr(func)
+    module = getattr(func, "__module__", None)
+    return ("~", 0, f"<built-in method {module}.{name}>" if module else f"<method {name!r}>")
+
+
+class ThreadProfiler:
+    """Deterministic profiler of the calling thread, readable by ``pstats``.
+
+    Records the calls, own time and cumulative time of each function (and
+    per caller) like ``cProfile.Profile``, from a ``sys.setprofile`` hook.
+    Calls that were already running when it was enabled are left out.
+    """
+
+    def __init__(self):
+        self.stats: dict = {}
+        # func -> [primitive calls, calls, own time, cumulative time, callers]
+        self._entries: dict = {}
+        # [func, start, time spent in callees, frame (None for C functions)]
+        self._stack: list[list] = []
+        self._active: dict = {}  # func -> calls on the stack (recursion)
+
+    def enable(self) -> None:
+        sys.setprofile(self._dispatch)
+
+    def disable(self) -> None:
+        sys.setprofile(None)
+        now = time.perf_counter()
+        while self._stack:  # still running (the caller of disable())
+            self._pop(now)
+
+    def create_stats(self) -> None:
+        self.stats = {
+            func: (cc, nc, tt, ct, {caller: tuple(value) for caller, value in callers.items()})
+            for func, (cc, nc, tt, ct, callers) in self._entries.items()
+        }
+
+    def _dispatch(self, frame, event, arg) -> None:
+        now = time.perf_counter()
+        if event == "call":
+            code = frame.f_code
+            self._push((code.co_filename, code.co_firstlineno, code.co_name), now, frame)
+        elif event == "c_call":
+            self._push(_c_label(arg), now, None)
+        elif event == "return":
+            if self._stack and self._stack[-1][3] is frame:
+                self._pop(now)
+        elif self._stack and self._stack[-1][3] is None:  # c_return, c_exception
+            self._pop(now)
+
+    def _push(self, func, now: float, frame) -> None:
+        self._stack.append([func, now, 0.0, frame])
+        self._active[func] = self._active.get(func, 0) + 1
+
+    def _pop(self, now: float) -> None:
+        func, start, callees, _ = self._stack.pop()
+        elapsed = now - start
+        self._active[func] -= 1
+        outermost = not self._active[func]
+        entry = self._entries.get(func)
+        if entry is None:
+            entry = self._entries[func] = [0, 0, 0.0, 0.0, {}]
+        entry[1] += 1
+        entry[2] += elapsed - callees
+        if outermost:
+            entry[0] += 1
+            entry[3] += elapsed
+        if self._stack:
+            parent = self._stack[-1]
+            parent[2] += elapsed
+            # pstats reads caller entries as (calls, primitive calls, own, cumulative).
+            calls = entry[4].setdefault(parent[0], [0, 0, 0.0, 0.0])
+            calls[0] += 1
+            calls[2] += elapsed - callees
+            if outermost:
+                calls[1] += 1
+                calls[3] += elapsed
+
+
+def _short_path(filename: str) -> str:
+    for prefix in (str(settings.BASE_DIR), sys.prefix, sys.base_prefix):
+        if filename.startswith(prefix):
+            return filename[len(prefix) :].lstrip(os.sep)
+    return filename
+
+
+def summarize(profiler, limit: int) -> tuple[list[dict], str]:
+    """Top functions by cumulative time, and the text tree of their callees."""
+
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    functions = [
+        {
+            "function": name,
+            "location": f"{_short_path(filename)}:{line}",
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+    ]
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats("cumulative").print_callees(limit)
+    return functions, out.getvalue()[:200_000]
+
+
+class ProfileSession:
+    """Call tree + SQL timeline around one request."""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        self.profiler = ThreadProfiler()
+        self.stack = ExitStack()
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self.start_time = time.perf_counter()
+        self.start_cpu = time.thread_time()
+        self.timeline = SQLTimeline(
+            self.start_time, getattr(settings, "PROFILING_MAX_QUERIES", 200)
+        )
+        self.stack.enter_context(record_queries(self.timeline))
+        self.profiler.enable()
+
+    def stop(self, request, response) -> dict:
+        self.profiler.disable()
+        self.stack.close()
+        duration = time.perf_counter() - self.start_time
+        functions, callees = summarize(
+            self.profiler, getattr(settings, "PROFILING_MAX_FUNCTIONS", 40)
+        )
+        return {
+            "id": uuid.uuid4().hex,
+            "request_id": get_request_id(),
+            "reason": self.reason,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(duration * 1000, 3),
+            "cpu_ms": round((time.thread_time() - self.start_cpu) * 1000, 3),
+            "queries": self.timeline.count,
+            "sql_ms": round(self.timeline.duration * 1000, 3),
+            "sql": self.timeline.entries,
+            "functions": functions,
+            "callees": callees,
+        }
+
+
+# ---------------------------------------------------------------------
+# Ring buffer
+# ---------------------------------------------------------------------
+def _summary(record: dict) -> dict:
+    return {key: value for key, value in record.items() if key not in DETAIL_FIELDS}
+
+
+class RedisProfileStore:
+    """Newest ``size`` profiles: an index list of summaries + one key each."""
+
+    def __init__(self, url: str, size: int, prefix: str = "profiles", ttl: int = 86400):
+        import redis
+
+        self.size = size
+        self.prefix = prefix
+        self.ttl = ttl
+        self.index_key = f"{prefix}:index"
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def push(self, record: dict) -> None:
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.set(f"{self.prefix}:{record['id']}", orjson.dumps(record), ex=self.ttl)
+        pipe.lpush(self.index_key, orjson.dumps(_summary(record)))
+        pipe.ltrim(self.index_key, 0, self.size - 1)
+        pipe.execute()
+
+    def list(self) -> list[dict]:
+        return [orjson.loads(item) for item in self._redis.lrange(self.index_key, 0, -1)]
+
+    def get(self, profile_id: str) -> dict | None:
+        value = self._redis.get(f"{self.prefix}:{profile_id}")
+        return orjson.loads(value) if value is not None else None
+
+
+class DiskProfileStore:
+    """Newest ``size`` profiles as ``<ms timestamp>-<id>.json`` files."""
+
+    def __init__(self, directory, size: int):
+        self.directory = Path(directory)
+        self.size = size
+
+    def _files(self) -> list[Path]:
+        # Names start with a fixed-width timestamp: sorted = oldest first.
+        return sorted(self.directory.glob("*.json"))
+
+    def push(self, record: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{int(record['started_at'] * 1000):013d}-{record['id']}.json"
+        temporary = self.directory / f".{name}.tmp"
+        temporary.write_bytes(orjson.dumps(record))
+        os.replace(temporary, self.directory / name)  # readers never see partial files
+        for path in self._files()[: -self.size]:
+            path.unlink(missing_ok=True)
+
+    def list(self) -> list[dict]:
+        summaries = []
+        for path in reversed(self._files()):
+            try:
+                summaries.append(_summary(orjson.loads(path.read_bytes())))
+            except (OSError, orjson.JSONDecodeError):
+                continue  # trimmed by another worker meanwhile
+        return summaries
+
+    def get(self, profile_id: str) -> dict | None:
+        for path in self.directory.glob(f"*-{profile_id}.json"):
+            try:
+                return orjson.loads(path.read_bytes())
+            except (OSError, orjson.JSONDecodeError):
+                return None
+        return None
+
+
+_store: RedisProfileStore | DiskProfileStore | None = None
+
+
+def get_store() -> RedisProfileStore | DiskProfileStore:
+    """Return the process-wide profile store (created lazily, after fork)."""
+
+    global _store
+    if _store is None:
+        size = getattr(settings, "PROFILING_BUFFER_SIZE", 200)
+        url = getattr(settings, "PROFILING_REDIS_URL", "")
+        if url:
+            _store = RedisProfileStore(url, size)
+        else:
+            _store = DiskProfileStore(settings.PROFILING_DIR, size)
+    return _store
+
+
+def reset_store() -> None:
+    global _store
+    _store = None
+
+
+@receiver(setting_changed)
+def _reset_store(*, setting, **kwargs):
+    if setting.startswith("PROFILING_"):
+        reset_store()
+
+
+# ---------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------
+_profiling = threading.Lock()
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """Profile the requests selected by :func:`should_profile`.
+
+    Place it right after RequestIdMiddleware so the profile covers the rest
+    of the middleware chain and carries the request id. In async mode it
+    passes requests through (see the module notes).
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.is_async and getattr(settings, "PROFILING_ENABLED", False):
+            logger.warning("Request profiling is not supported under ASGI; it is disabled")
+
+    def before(self, request):
+        if self.is_async:
+            return
+        reason = should_profile(request)
+        if reason is None:
+            return
+        if not _profiling.acquire(blocking=False):
+            metrics.profiled_requests.busy.inc()
+            return
+        session = ProfileSession(reason)
+        try:
+            session.start()
+        except BaseException:
+            _profiling.release()
+            raise
+        request._profile_session = session
+
+    def process(self, request, response):
+        session = getattr(request, "_profile_session", None)
+        if session is None:
+            return response
+        try:
+            record = session.stop(request, response)
+        finally:
+            _profiling.release()
+        getattr(metrics.profiled_requests, record["reason"]).inc()
+        try:
+            get_store().push(record)
+        except Exception:  # noqa: BLE001 - never fail the request for a profile
+            logger.exception("Could not store profile of %s %s", request.method, request.path)
+            return response
+        response["X-Profile-Id"] = record["id"]
+        return response
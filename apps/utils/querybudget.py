@@ -0,0 +1,146 @@
+"""Query budgets: performance contracts on the number of SQL queries.
+
+A budget caps the queries a block of code or a request may run, and how
+many of them may repeat an SQL template already run (near-identical SQL
+with different parameters, the N+1 signature; see dbmetrics.py).
+
+- In tests, :func:`query_budget` is a context manager or a decorator
+  (``with query_budget(3): ...``), and the ``query_budget`` pytest fixture
+  (conftest.py) returns it. Exceeding the budget raises
+  :class:`QueryBudgetExceeded` (an ``AssertionError``) listing the
+  repeated SQL.
+- On endpoints, ``@QueryBudget(...)`` on a function view or a view method,
+  a ``query_budget = QueryBudget(...)`` class attribute, or a
+  ``query_budgets = {"list": QueryBudget(...), ...}`` mapping of ViewSet
+  actions (or HTTP methods) declares the budget. :class:`QueryBudgetMiddleware` checks it
+  for every request when ``QUERY_BUDGET_MODE`` is ``"warn"`` (log) or
+  ``"raise"`` (fail the request, used by the test suite); ``"off"``
+  (production default) skips the check.
+
+Notes
+-----
+- A request budget covers the whole request, including the queries of
+  the session and authentication middleware.
+- Endpoints whose query count grows with the input (imports) declare the
+  budget of a typical request.
+- The middleware sits right after DBInstrumentationMiddleware, so the
+  check runs once the rest of the chain is done. Queries run while a
+  streaming response is consumed happen after the check and are not
+  counted.
+"""
+
+from __future__ import annotations
+
+import logging
+from contextlib import ContextDecorator
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from .dbmetrics import QueryStats, record_queries
+from .middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A block or a request ran more queries than its budget."""
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    """At most ``queries`` queries, of which at most ``duplicates`` repeat SQL."""
+
+    queries: int
+    duplicates: int = 0
+
+    def violations(self, stats: QueryStats) -> list[str]:
+        problems = []
+        if stats.count > self.queries:
+            problems.append(f"{stats.count} queries (budget {self.queries})")
+        if stats.duplicates > self.duplicates:
+            problems.append(f"{stats.duplicates} repeated queries (budget {self.duplicates})")
+        return problems
+
+    def report(self, label: str, stats: QueryStats) -> str | None:
+        """Describe the violations of ``stats``, or return None within budget."""
+
+        problems = self.violations(stats)
+        if not problems:
+            return None
+        lines = [f"{label} ran {' and '.join(problems)}."]
+        lines += [f"  {count}x {sql}" for sql, count in stats.repeated()[:5]]
+        return "\n".join(lines)
+
+    def __call__(self, view):
+        """Declare the budget of a view function or method."""
+
+        view.query_budget = self
+        return view
+
+
+class query_budget(ContextDecorator):  # noqa: N801 - used like a function
+    """Fail when the block runs more queries than allowed.
+
+    ``with query_budget(3) as stats:`` or ``@query_budget(3)`` on a test.
+    """
+
+    def __init__(self, queries: int, duplicates: int = 0):
+        self.budget = QueryBudget(queries, duplicates)
+
+    def __enter__(self) -> QueryStats:
+        self._recorder = record_queries()
+        self.stats = self._recorder.__enter__()
+        return self.stats
+
+    def __exit__(self, *exc_info):
+        self._recorder.__exit__(*exc_info)
+        if exc_info[0] is None:
+            message = self.budget.report("Block", self.stats)
+            if message:
+                raise QueryBudgetExceeded(message)
+        return False
+
+
+def get_view_budget(request) -> QueryBudget | None:
+    """Budget declared by the view handling ``request`` (see module docstring)."""
+
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+    func = match.func
+    view_class = getattr(func, "view_class", None) or getattr(func, "cls", None)
+    if view_class is None:
+        return getattr(func, "query_budget", None)
+    method = request.method.lower()
+    action = (getattr(func, "actions", None) or {}).get(method, method)
+    budget = getattr(view_class, "query_budgets", {}).get(action)
+    if budget is None:
+        budget = getattr(getattr(view_class, action, None), "query_budget", None)
+    return budget or getattr(view_class, "query_budget", None)
+
+
+class QueryBudgetMiddleware(HybridMiddleware):
+    """Check every request against its view's declared query budget.
+
+    ``QUERY_BUDGET_MODE``: ``"off"``, ``"warn"`` (log a warning) or
+    ``"raise"`` (raise QueryBudgetExceeded). The queries are those recorded
+    by DBInstrumentationMiddleware (``request.db_stats``); without it
+    nothing is checked.
+    """
+
+    def process(self, request, response):
+        mode = getattr(settings, "QUERY_BUDGET_MODE", "off")
+        stats = getattr(request, "db_stats", None)
+        if mode == "off" or stats is None:
+            return response
+        budget = get_view_budget(request)
+        if budget is None:
+            return response
+        message = budget.report(f"{request.method} {request.path}", stats)
+        if message is None:
+            return response
+        if mode == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+        return response
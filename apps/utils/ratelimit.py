@@ -0,0 +1,303 @@
+"""Shared rate-limiting engine.
+
+One limiter backs both the DRF throttles (``AnonRateThrottle`` /
+``UserRateThrottle`` below, the ``DEFAULT_THROTTLE_CLASSES``) and the
+:func:`ratelimit` view decorator.
+
+Algorithm
+---------
+GCRA (generic cell rate algorithm) in a single Lua script, so each check is
+one atomic Redis round trip storing one timestamp per key. DRF's stock
+throttles instead read, rewrite and store a whole list of timestamps on
+every request. A rate of ``N/period`` allows bursts of up to ``N`` requests
+and then one request every ``period / N`` seconds. The script reads the
+clock with Redis ``TIME``, so gunicorn workers and hosts with skewed clocks
+share one view of time.
+
+Degraded mode
+-------------
+With no ``RATELIMIT_REDIS_URL``, or while Redis is unreachable, every
+process falls back to an in-memory token bucket with the same rate. Limits
+are then per process instead of global, but they still apply. After an
+error Redis is not retried for ``RATELIMIT_REDIS_RETRY_AFTER`` seconds, so a
+dead Redis does not cost a socket timeout on every request.
+
+Every check records its :class:`RateLimitResult` on the request.
+``RateLimitHeadersMiddleware`` turns it into ``X-RateLimit-Limit``,
+``X-RateLimit-Remaining`` and ``X-RateLimit-Reset`` headers (plus
+``Retry-After`` on 429). Rejections are counted by scope in
+``ratelimit_rejections_total``.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import throttling
+
+from . import metrics
+from .fastjson import FastJsonResponse
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: bucket key. ARGV: emission interval (us), burst tolerance (us),
+# cost; all integers so the stored timestamp never goes through float
+# formatting. Returns {allowed, remaining, retry_after_us, reset_after_us}.
+GCRA_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000000 + now_parts[2]
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+  tat = now
+end
+local new_tat = tat + interval * cost
+local allow_at = new_tat - tolerance
+if allow_at > now then
+  return {0, 0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil((new_tat - now) / 1000))
+return {1, math.floor((tolerance - (new_tat - now)) / interval), 0, new_tat - now}
+"""
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """Parse ``"10/m"`` / ``"100/hour"`` (DRF syntax) into ``(limit, seconds)``."""
+
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+    reset_after: float
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+class LocalTokenBuckets:
+    """Per-process token buckets used when Redis is unavailable."""
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, period: int, cost: int = 1) -> RateLimitResult:
+        refill = limit / period  # tokens per second
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(limit), now))
+            tokens = min(float(limit), tokens + (now - updated) * refill)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=int(tokens),
+            retry_after=0.0 if allowed else (cost - tokens) / refill,
+            reset_after=(limit - tokens) / refill,
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class RateLimiter:
+    """GCRA limiter on Redis with a local token-bucket fallback."""
+
+    def __init__(self, url: str = "", prefix: str = "rl"):
+        self.prefix = prefix
+        self.local = LocalTokenBuckets()
+        self._script = None
+        self._down_until = 0.0
+        if url:
+            import redis
+
+            timeout = getattr(settings, "RATELIMIT_SOCKET_TIMEOUT", 0.1)
+            client = redis.Redis.from_url(
+                url, socket_timeout=timeout, socket_connect_timeout=timeout
+            )
+            self._script = client.register_script(GCRA_SCRIPT)
+
+    def hit(self, key: str, rate: str, cost: int = 1) -> RateLimitResult:
+        limit, period = parse_rate(rate)
+        key = f"{self.prefix}:{key}"
+        if self._script is not None and time.monotonic() >= self._down_until:
+            try:
+                return self._hit_redis(key, limit, period, cost)
+            except Exception:  # noqa: BLE001 - any Redis failure degrades
+                retry = getattr(settings, "RATELIMIT_REDIS_RETRY_AFTER", 5)
+                self._down_until = time.monotonic() + retry
+                logger.warning("Redis unavailable, rate limiting locally for %ss", retry)
+        return self.local.hit(key, limit, period, cost)
+
+    def _hit_redis(self, key: str, limit: int, period: int, cost: int) -> RateLimitResult:
+        # The interval is rounded up to a whole microsecond; the tolerance is
+        # ``limit`` intervals rather than the period, so a burst always admits
+        # exactly ``limit`` requests whether or not ``period / limit`` is whole.
+        interval = math.ceil(period * 1_000_000 / limit)
+        allowed, remaining, retry_us, reset_us = self._script(
+            keys=[key], args=[interval, interval * limit, cost]
+        )
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=limit,
+            remaining=int(remaining),
+            retry_after=int(retry_us) / 1_000_000,
+            reset_after=int(reset_us) / 1_000_000,
+        )
+
+
+_limiter: RateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """Return the process-wide limiter, connecting lazily (safe across fork)."""
+
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(
+                    url=getattr(settings, "RATELIMIT_REDIS_URL", ""),
+                    prefix=getattr(settings, "RATELIMIT_KEY_PREFIX", "rl"),
+                )
+    return _limiter
+
+
+def reset_limiter() -> None:
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
+
+
+def record_result(request, result: RateLimitResult) -> None:
+    """Keep the most restrictive result for RateLimitHeadersMiddleware."""
+
+    request = getattr(request, "_request", request)  # DRF Request -> HttpRequest
+    current = getattr(request, "ratelimit", None)
+    if (
+        current is None
+        or not result.allowed
+        or (current.allowed and result.remaining < current.remaining)
+    ):
+        request.ratelimit = result
+
+
+# ---------------------------------------------------------------------
+# DRF throttles
+# ---------------------------------------------------------------------
+class RateLimitThrottleMixin:
+    """Run a ``SimpleRateThrottle`` subclass through the shared limiter."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        self.result = get_limiter().hit(key, self.rate)
+        record_result(request, self.result)
+        if not self.result.allowed:
+            metrics.ratelimit_rejections[self.scope].inc()
+        return self.result.allowed
+
+    def wait(self):
+        return self.result.retry_after
+
+
+class AnonRateThrottle(RateLimitThrottleMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(RateLimitThrottleMixin, throttling.UserRateThrottle):
+    pass
+
+
+class ScopedRateThrottle(RateLimitThrottleMixin, throttling.ScopedRateThrottle):
+    pass
+
+
+# ---------------------------------------------------------------------
+# View decorator
+# ---------------------------------------------------------------------
+def client_ip(request) -> str:
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _user_or_ip(request) -> str:
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{client_ip(request)}"
+
+
+KEY_FUNCTIONS = {"ip": lambda request: f"ip:{client_ip(request)}", "user_or_ip": _user_or_ip}
+
+
+def ratelimit(rate: str, key="ip", methods=None, group: str | None = None, block: bool = True):
+    """Rate-limit a view function or a DRF view method.
+
+    ``key`` is ``"ip"``, ``"user_or_ip"`` or a callable ``request -> str``.
+    ``methods`` restricts limiting to those HTTP methods (default: all).
+    Blocked requests get a 429 with ``Retry-After``; with ``block=False`` the
+    view runs and can inspect ``request.ratelimit``.
+    """
+
+    key_func = KEY_FUNCTIONS[key] if isinstance(key, str) else key
+
+    def decorator(view):
+        scope = group or f"{view.__module__}.{view.__qualname__}"
+        rejected = metrics.ratelimit_rejections[scope]
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Plain views get (request, ...); view methods get (self, request, ...).
+            request = args[0] if hasattr(args[0], "META") else args[1]
+            if methods is None or request.method in methods:
+                result = get_limiter().hit(f"{scope}:{key_func(request)}", rate)
+                record_result(request, result)
+                if not result.allowed:
+                    rejected.inc()
+                    if block:
+                        return FastJsonResponse(
+                            {"detail": str(_("Request was throttled."))}, status=429
+                        )
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
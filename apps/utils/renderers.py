@@ -0,0 +1,29 @@
+"""DRF renderers.
+
+``FastJSONRenderer`` is a drop-in replacement for DRF's ``JSONRenderer``
+backed by orjson (see fastjson.py). Indented output (``?indent=``, the
+browsable API) is rare and falls back to the stock implementation.
+"""
+
+from __future__ import annotations
+
+from rest_framework.renderers import JSONRenderer
+
+from .fastjson import dumps
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Compact JSON rendering through orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        if (
+            self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
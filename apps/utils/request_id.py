@@ -8,18 +8,30 @@ This module provides a tiny, dependency-free way to:
 
 Why: in production, correlating a single request across logs and metrics is
 critical for debugging and incident response.
+
+Two id generators are available via ``REQUEST_ID_GENERATOR``:
+
+- ``"uuid4"`` (default): random UUID4 hex.
+- ``"sequential"``: ULID-style 32 hex chars (millisecond timestamp,
+  per-process random tag, counter). Sortable by time and about twice as
+  cheap, since it needs no ``os.urandom`` syscall per request.
 """
 
 from __future__ import annotations
 
+import contextlib
 import contextvars
+import itertools
+import os
+import secrets
+import time
 import uuid
-from typing import Optional
 
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
-_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
-    "request_id", default=None
-)
+_request_id: contextvars.ContextVar[str | None] = contextvars.ContextVar("request_id", default=None)
 
 
 def new_request_id() -> str:
@@ -28,13 +40,66 @@ def new_request_id() -> str:
     return uuid.uuid4().hex
 
 
-def set_request_id(value: str) -> None:
-    """Set request id for the current context."""
+_process_tag = secrets.randbits(32)
+_counter = itertools.count()
+
+
+def _reseed() -> None:
+    global _process_tag, _counter
+    _process_tag = secrets.randbits(32)
+    _counter = itertools.count()
+
+
+if hasattr(os, "register_at_fork"):
+    # Forked workers must not share the parent's tag and counter.
+    os.register_at_fork(after_in_child=_reseed)
+
+
+def new_sequential_request_id() -> str:
+    """Create a time-ordered request id: ms timestamp, process tag, counter."""
+
+    millis = time.time_ns() // 1_000_000
+    return f"{millis:012x}{_process_tag:08x}{next(_counter) & 0xFFFFFFFFFFFF:012x}"
+
+
+GENERATORS = {"uuid4": new_request_id, "sequential": new_sequential_request_id}
+_generator = None
+
+
+def get_request_id_generator():
+    """Return the generator selected by ``REQUEST_ID_GENERATOR``."""
+
+    global _generator
+    if _generator is None:
+        _generator = GENERATORS[getattr(settings, "REQUEST_ID_GENERATOR", "uuid4")]
+    return _generator
+
+
+@receiver(setting_changed)
+def _reset_generator(*, setting, **kwargs):
+    global _generator
+    if setting == "REQUEST_ID_GENERATOR":
+        _generator = None
+
+
+def set_request_id(value: str) -> contextvars.Token:
+    """Set request id for the current context; returns a token for reset."""
+
+    return _request_id.set(value)
+
+
+def reset_request_id(token: contextvars.Token) -> None:
+    """Restore the request id that was current before ``set_request_id``.
+
+    A no-op when called from another context (e.g. a sync chain served by
+    ASGI, whose response is closed in a different thread context).
+    """
 
-    _request_id.set(value)
+    with contextlib.suppress(ValueError):
+        _request_id.reset(token)
 
 
-def get_request_id() -> Optional[str]:
+def get_request_id() -> str | None:
     """Return request id for the current context, if any."""
 
     return _request_id.get()
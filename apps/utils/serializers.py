@@ -0,0 +1,203 @@
+"""Read-only fast path for list serialization.
+
+A ``ModelSerializer`` instantiates and walks bound field objects for every
+row, which dominates the response time of list endpoints returning a few
+dozen rows. :class:`RowSerializer` inspects a serializer class once and
+produces the *same* representation directly from ``.values()`` rows:
+
+- Plain columns are copied as-is when DRF's ``to_representation`` would be
+  the identity (char, slug, email, boolean, integer fields); other fields
+  (datetimes, choices, decimals, ...) still go through the bound field's
+  ``to_representation``, so formatting rules are shared with DRF.
+- Nested reverse-FK serializers (``many=True``, e.g. ``MenuSerializer.items``)
+  are filled with one extra ``.values()`` query per nesting level, like
+  ``prefetch_related``.
+
+Unsupported serializers (custom methods, dotted sources, nested forward
+relations) raise ``ImproperlyConfigured`` when compiled. Views using
+:class:`FastListMixin` compile their ``serializer_class`` when the class is
+defined, so the error surfaces when the URLconf is imported (``manage.py
+check``, worker boot) rather than on the first request; serializers only
+chosen at request time (``get_serializer_class()`` overrides) are compiled
+on first use. Parity with the regular serializers is covered by tests.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from functools import cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import ManyToOneRel
+from rest_framework import serializers
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+#: Fields whose ``to_representation`` is the identity for database values.
+IDENTITY_FIELDS = (
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.IntegerField,
+)
+# Subclasses with their own representation logic (not the identity).
+NON_IDENTITY_FIELDS = (serializers.ChoiceField,)
+
+
+class RowSerializer:
+    """Compiled, read-only representation of a ``ModelSerializer`` class."""
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.serializer_class = serializer_class
+        self.model = serializer.Meta.model
+        self.pk_name = self.model._meta.pk.attname
+
+        # (output name, key in the values() row, converter or None)
+        self.columns: list[tuple[str, str, object]] = []
+        # (output name, related model, FK attname on the related model, child)
+        self.nested: list[tuple[str, object, str, RowSerializer]] = []
+        value_fields = {self.pk_name}
+
+        for field in serializer._readable_fields:
+            if isinstance(field, serializers.ListSerializer):
+                self._add_nested(field)
+                continue
+            if isinstance(field, serializers.BaseSerializer) or "." in field.source:
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{field.field_name} is not supported "
+                    "by the fast list serializer."
+                )
+            try:
+                source = self.model._meta.get_field(field.source).attname
+            except (FieldDoesNotExist, AttributeError) as exc:
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{field.field_name} does not map to a column."
+                ) from exc
+            identity = isinstance(field, IDENTITY_FIELDS) and not isinstance(
+                field, NON_IDENTITY_FIELDS
+            )
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                identity = True
+            convert = None if identity else field.to_representation
+            self.columns.append((field.field_name, source, convert))
+            value_fields.add(source)
+
+        self.value_fields = tuple(sorted(value_fields))
+
+    def _add_nested(self, field) -> None:
+        try:
+            relation = self.model._meta.get_field(field.source)
+        except FieldDoesNotExist as exc:
+            raise ImproperlyConfigured(f"Unknown relation {field.source!r}.") from exc
+        if not isinstance(relation, ManyToOneRel):
+            raise ImproperlyConfigured(
+                f"Only reverse foreign keys can be nested, got {field.source!r}."
+            )
+        child = get_row_serializer(type(field.child))
+        fk_name = relation.field.attname
+        self.nested.append((field.field_name, relation.related_model, fk_name, child))
+        # Nested values are stored in the row under the output name.
+        self.columns.append((field.field_name, field.field_name, None))
+
+    def values(self, queryset, extra_fields=()):
+        """Turn a model queryset into the ``.values()`` queryset this serializer reads.
+
+        ``extra_fields`` are fetched as well but never rendered (e.g. the
+        ordering column a cursor paginator reads its position from).
+        """
+
+        fields = self.value_fields
+        if extra_fields:
+            fields = tuple({*fields, *extra_fields})
+        return queryset.prefetch_related(None).values(*fields)
+
+    def serialize(self, rows) -> list[dict]:
+        """Return the representation of ``rows`` (an iterable of ``.values()`` dicts)."""
+
+        rows = list(rows)
+        for name, related_model, fk_name, child in self.nested:
+            grouped = defaultdict(list)
+            for child_row in self._children(rows, related_model, fk_name, child):
+                grouped[child_row[fk_name]].append(child_row)
+            for row in rows:
+                row[name] = child.serialize(grouped.get(row[self.pk_name], ()))
+        return self._render(rows)
+
+    async def aserialize(self, rows) -> list[dict]:
+        """Async :meth:`serialize`: ``rows`` is a list, nested rows use the async ORM."""
+
+        for name, related_model, fk_name, child in self.nested:
+            grouped = defaultdict(list)
+            async for child_row in self._children(rows, related_model, fk_name, child):
+                grouped[child_row[fk_name]].append(child_row)
+            for row in rows:
+                row[name] = await child.aserialize(grouped.get(row[self.pk_name], []))
+        return self._render(rows)
+
+    def _children(self, rows, related_model, fk_name, child):
+        """``.values()`` queryset of the nested rows of ``rows``."""
+
+        ids = [row[self.pk_name] for row in rows]
+        children = related_model._default_manager.filter(**{f"{fk_name}__in": ids})
+        return children.prefetch_related(None).values(*{fk_name, *child.value_fields})
+
+    def _render(self, rows) -> list[dict]:
+        columns = self.columns
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, convert in columns:
+                value = row[source]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
+
+
+@cache
+def get_row_serializer(serializer_class) -> RowSerializer:
+    """Return the (cached) compiled RowSerializer of ``serializer_class``."""
+
+    return RowSerializer(serializer_class)
+
+
+def fast_lists_enabled() -> bool:
+    return getattr(settings, "FAST_LIST_SERIALIZATION", True)
+
+
+class FastListMixin:
+    """Serve ``list()`` of a generic view through :class:`RowSerializer`.
+
+    Filtering, ordering and pagination behave as usual; only the rows are
+    fetched with ``.values()`` and serialized by the compiled row function.
+    Must be listed before the DRF generic view / viewset in the bases.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get("serializer_class") is not None:
+            get_row_serializer(cls.serializer_class)
+
+    def list(self, request, *args, **kwargs):
+        if not fast_lists_enabled():
+            return super().list(request, *args, **kwargs)
+
+        row_serializer = get_row_serializer(self.get_serializer_class())
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = row_serializer.values(queryset, self.get_extra_value_fields(queryset))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.serialize(page))
+        return Response(row_serializer.serialize(queryset))
+
+    def get_extra_value_fields(self, queryset) -> tuple[str, ...]:
+        """Columns needed by the paginator on top of the serializer's own."""
+
+        paginator = self.paginator
+        if isinstance(paginator, CursorPagination):
+            ordering = paginator.get_ordering(self.request, queryset, self)
+            if isinstance(ordering, str):
+                ordering = (ordering,)
+            return tuple(field.lstrip("-") for field in ordering)
+        return ()
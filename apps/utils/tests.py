@@ -1,4 +1,79 @@
-from django.test import TestCase
+import datetime
+import decimal
+import json
+import logging
+import os
+import runpy
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import OperationalError, close_old_connections, router
+from django.db.backends.signals import connection_created
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from prometheus_client import REGISTRY
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.generics import ListAPIView
+from rest_framework.renderers import JSONRenderer
+
+from apps.pages.apiviews import MenuListAPIView
+from apps.pages.models import Link, Menu, MenuItem, Service
+from apps.pages.serializers import LinkSerializer, MenuSerializer, ServiceSerializer
+from apps.users.hashing import get_hash_pool, reset_hash_pool
+from apps.users.models import User
+from apps.users.serializers import UserSerializer
+from apps.users.tokens import RefreshToken
+from apps.utils import csp, dbpool, metrics
+from apps.utils.apiviews import health_check
+from apps.utils.dbmetrics import DBInstrumentationMiddleware
+from apps.utils.dbrouter import (
+    STICKY_COOKIE,
+    ReplicaMiddleware,
+    get_pool,
+    read_from_replica,
+    reset_pool,
+)
+from apps.utils.fastjson import FastJsonResponse
+from apps.utils.log import QueueHandler, RateLimitFilter, SamplingFilter
+from apps.utils.middleware import RequestIdMiddleware, SecurityHeadersMiddleware
+from apps.utils.models import CSPViolation
+from apps.utils.parsers import FastJSONParser
+from apps.utils.prefork import after_fork
+from apps.utils.profiling import (
+    ProfilingMiddleware,
+    ThreadProfiler,
+    check_token,
+    get_store,
+    make_token,
+    should_profile,
+    summarize,
+)
+from apps.utils.querybudget import QueryBudget, QueryBudgetExceeded, query_budget
+from apps.utils.ratelimit import RateLimiter, get_limiter, ratelimit, reset_limiter
+from apps.utils.renderers import FastJSONRenderer
+from apps.utils.request_id import get_request_id, new_sequential_request_id
+from apps.utils.serializers import FastListMixin, get_row_serializer
+from apps.utils.warmup import warm_templates
 
 
 class HealthCheckTests(TestCase):
@@ -8,3 +83,698 @@ class HealthCheckTests(TestCase):
         payload = response.json()
         self.assertEqual(payload.get("status"), "ok")
         self.assertIn("timestamp", payload)
+
+
+class AsyncMiddlewareTests(SimpleTestCase):
+    async def test_chain_runs_natively_async(self):
+        async def view(request):
+            return await health_check(request)
+
+        handler = RequestIdMiddleware(SecurityHeadersMiddleware(view))
+        self.assertTrue(iscoroutinefunction(handler))
+
+        response = await handler(AsyncRequestFactory().get("/health/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response["X-Request-ID"]), 32)
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+
+    def test_sync_chain_is_unchanged(self):
+        handler = RequestIdMiddleware(lambda request: HttpResponse("ok"))
+        self.assertFalse(iscoroutinefunction(handler))
+        request = RequestFactory().get("/", headers={"X-Request-ID": "abc"})
+        self.assertEqual(handler(request)["X-Request-ID"], "abc")
+
+
+class MiddlewareOverheadTests(SimpleTestCase):
+    def test_security_headers_follow_setting_changes(self):
+        handler = SecurityHeadersMiddleware(lambda request: HttpResponse("ok"))
+        request = RequestFactory().get("/")
+        self.assertNotIn("Content-Security-Policy", handler(request))
+
+        with override_settings(CSP_ENABLED=True, CSP_REPORT_ONLY=False, CSP_POLICY="default-src x"):
+            self.assertEqual(handler(request)["Content-Security-Policy"], "default-src x")
+        self.assertNotIn("Content-Security-Policy", handler(request))
+
+    def test_request_id_context_is_reset(self):
+        seen, outer = [], get_request_id()
+        # Closing the response sends request_finished; keep it off the database
+        # like django.test.Client does.
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+        def view(request):
+            seen.append(get_request_id())
+            return HttpResponse("ok")
+
+        response = RequestIdMiddleware(view)(RequestFactory().get("/"))
+        self.assertEqual(seen, [response["X-Request-ID"]])
+        self.assertEqual(get_request_id(), seen[0])  # still set for log_response
+        response.close()
+        self.assertEqual(get_request_id(), outer)
+
+    @override_settings(REQUEST_ID_GENERATOR="sequential")
+    def test_sequential_ids_are_unique_and_ordered(self):
+        handler = RequestIdMiddleware(lambda request: HttpResponse("ok"))
+        ids = [handler(RequestFactory().get("/"))["X-Request-ID"] for _ in range(3)]
+        self.assertEqual(len(set(ids)), 3)
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(new_sequential_request_id()), 32)
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    def test_project_templates_are_compiled(self):
+        results = {result.template: result for result in warm_templates()}
+        self.assertIn("pages/index.html", results)
+        self.assertEqual(results["pages/index.html"].error, "")
+
+    def test_command_reports_timings(self):
+        out = StringIO()
+        call_command("warm_templates", stdout=out)
+        self.assertIn("components/navbar.html", out.getvalue())
+        self.assertIn("templates,", out.getvalue())
+
+
+class FastJSONTests(SimpleTestCase):
+    payload = {
+        "created": datetime.datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.UTC),
+        "day": datetime.date(2024, 1, 2),
+        "amount": decimal.Decimal("12.50"),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "label": gettext_lazy("Name of User"),
+        "text": "caf\u00e9 \u2028",
+        "nested": [{"a": 1, "b": None, "c": True}],
+    }
+
+    def test_renderer_matches_stock_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload)
+        )
+
+    @override_settings(FAST_JSON_ENABLED=False)
+    def test_stdlib_fallback_matches_stock_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload)
+        )
+
+    def test_indented_output_uses_stock_renderer(self):
+        rendered = FastJSONRenderer().render({"a": 1}, "application/json; indent=4")
+        self.assertEqual(rendered, b'{\n    "a": 1\n}')
+
+    def test_parser(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(BytesIO(b'{"email": "a@b.c"}')), {"email": "a@b.c"})
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b"{not json"))
+
+    def test_response_requires_safe_false_for_lists(self):
+        with self.assertRaises(TypeError):
+            FastJsonResponse([1, 2])
+        response = FastJsonResponse([1, timezone.now().date()], safe=False)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+
+class FastListSerializationParityTests(TestCase):
+    """The fast path must render byte-identical output to the ModelSerializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i, title in enumerate(["Accueil", "Équipe", "Zèbre", ""]):
+            menu = Menu.objects.create(title=title or "Vide", link=f"/{i}/", hasChild=bool(i % 2))
+            for j in range(i):
+                MenuItem.objects.create(title=f"Item {j} \u2028", link=f"/{i}/{j}/", menu=menu)
+        Service.objects.create(title="Consulting", resume="Ré\nsumé", icon="fa-user", delay="0.5s")
+        Service.objects.create(title="Audit", is_active=False)
+        Link.objects.create(title="Docs", url="https://x.io")
+        User.objects.create(email="a@example.com", name="Zoë", role=User.Types.OWNER)
+        User.objects.create(email="b@example.com", role=User.Types.CUSTOMER)
+
+    def assertParity(self, serializer_class, queryset):
+        renderer = FastJSONRenderer()
+        expected = renderer.render(serializer_class(queryset, many=True).data)
+        row_serializer = get_row_serializer(serializer_class)
+        actual = renderer.render(row_serializer.serialize(row_serializer.values(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_menu_with_nested_items(self):
+        self.assertParity(MenuSerializer, Menu.objects.prefetch_related("items"))
+
+    def test_services_all_fields(self):
+        self.assertParity(ServiceSerializer, Service.objects.all())
+
+    def test_links(self):
+        self.assertParity(LinkSerializer, Link.objects.all())
+
+    def test_users_hide_password(self):
+        self.assertParity(UserSerializer, User.objects.order_by("id"))
+
+    def test_menu_rows_use_two_queries(self):
+        row_serializer = get_row_serializer(MenuSerializer)
+        with self.assertNumQueries(2):
+            row_serializer.serialize(row_serializer.values(Menu.objects.all()))
+
+    def test_unsupported_serializer_fails_when_the_view_is_defined(self):
+        class DottedSerializer(serializers.ModelSerializer):
+            menu_title = serializers.CharField(source="menu.title")
+
+            class Meta:
+                model = MenuItem
+                fields = ["id", "menu_title"]
+
+        with self.assertRaises(ImproperlyConfigured):
+            type("DottedView", (FastListMixin, ListAPIView), {"serializer_class": DottedSerializer})
+
+    def test_endpoint_output_matches_regular_serializers(self):
+        with override_settings(FAST_LIST_SERIALIZATION=False, PAGES_CACHE_ENABLED=False):
+            expected = self.client.get("/api/menus/?limit=2&offset=1").content
+        with override_settings(PAGES_CACHE_ENABLED=False):
+            actual = self.client.get("/api/menus/?limit=2&offset=1").content
+        self.assertEqual(actual, expected)
+
+
+@override_settings(RATELIMIT_REDIS_URL="")
+class RateLimitTests(TestCase):
+    def setUp(self):
+        reset_limiter()
+        self.addCleanup(reset_limiter)
+
+    def test_decorator_blocks_with_retry_after(self):
+        @ratelimit("2/m", methods=("POST",))
+        def view(request):
+            return HttpResponse("ok")
+
+        factory = RequestFactory()
+        rejected = metrics.ratelimit_rejections[f"{__name__}.{view.__qualname__}"]
+        before = rejected._value.get()
+        self.assertEqual(view(factory.get("/")).status_code, 200)  # not limited
+        statuses = [view(factory.post("/")).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(rejected._value.get(), before + 1)
+
+        request = factory.post("/")
+        view(request)
+        headers = request.ratelimit.headers()
+        self.assertEqual(headers["X-RateLimit-Remaining"], "0")
+        self.assertGreaterEqual(int(headers["Retry-After"]), 29)
+
+    def test_drf_throttle_sets_headers(self):
+        first = self.client.get("/api/links/")
+        second = self.client.get("/api/links/")
+        self.assertEqual(first["X-RateLimit-Limit"], "100")
+        self.assertEqual(int(second["X-RateLimit-Remaining"]), 98)
+
+    def test_redis_burst_admits_the_full_limit(self):
+        class GCRAScript:
+            """GCRA_SCRIPT step for step, at a frozen clock (in microseconds)."""
+
+            def __init__(self):
+                self.now, self.store = 1_700_000_000_000_000, {}
+
+            def __call__(self, keys, args):
+                interval, tolerance, cost = args
+                tat = max(self.store.get(keys[0], self.now), self.now)
+                new_tat = tat + interval * cost
+                if new_tat - tolerance > self.now:
+                    return [0, 0, new_tat - tolerance - self.now, tat - self.now]
+                self.store[keys[0]] = new_tat
+                return [1, (tolerance - (new_tat - self.now)) // interval, 0, new_tat - self.now]
+
+        for rate, limit in (("3/s", 3), ("7/m", 7), ("30/s", 30)):
+            with self.subTest(rate=rate):
+                limiter = RateLimiter()
+                limiter._script = GCRAScript()
+                results = [limiter.hit("k", rate) for _ in range(limit + 1)]
+                self.assertEqual([r.allowed for r in results].count(True), limit)
+                self.assertFalse(results[-1].allowed)
+                self.assertEqual(results[-2].remaining, 0)
+
+    def test_unreachable_redis_degrades_to_local_buckets(self):
+        limiter = RateLimiter(url="redis://127.0.0.1:1/0")
+        with self.assertLogs("apps.utils.ratelimit", "WARNING"):
+            results = [limiter.hit("k", "1/h").allowed for _ in range(2)]
+        self.assertEqual(results, [True, False])
+
+
+class LoggingPipelineTests(SimpleTestCase):
+    def record(self, level=logging.INFO, name="apps.test", msg="hit %s"):
+        return logging.LogRecord(name, level, __file__, 1, msg, ("x",), None)
+
+    def dropped(self, reason):
+        return metrics.log_records_dropped_total.labels(reason=reason)._value.get()
+
+    def test_rate_limit_filter_reports_suppressed_count(self):
+        log_filter = RateLimitFilter(rate=0, burst=2)
+        passed = [log_filter.filter(self.record()) for _ in range(5)]
+        self.assertEqual(passed, [True, True, False, False, False])
+        self.assertTrue(log_filter.filter(self.record(msg="other %s")))
+        self.assertTrue(log_filter.filter(self.record(level=logging.ERROR)))
+        other_args = self.record()
+        other_args.args = ("y",)
+        self.assertTrue(log_filter.filter(other_args))  # same template, new message
+
+        log_filter.rate = 1e9  # refill immediately
+        record = self.record()
+        log_filter.filter(record)
+        self.assertEqual(record.suppressed, 3)
+
+    def test_sampling_filter_keeps_errors(self):
+        log_filter = SamplingFilter({"apps.test": 0})
+        before = self.dropped("sampled")
+        self.assertFalse(log_filter.filter(self.record()))
+        self.assertTrue(log_filter.filter(self.record(level=logging.ERROR)))
+        self.assertTrue(log_filter.filter(self.record(name="apps.other")))
+        self.assertEqual(self.dropped("sampled"), before + 1)
+
+    def test_queue_handler_writes_batches_off_thread(self):
+        stream = StringIO()
+        handler = QueueHandler(stream=stream)
+        handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        for _ in range(3):
+            handler.handle(self.record())
+        handler.stop()
+        self.assertEqual(stream.getvalue(), "INFO hit x\n" * 3)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = QueueHandler(stream=StringIO(), capacity=1)
+        handler.stop()  # no consumer: the queue stays full
+        before = self.dropped("queue_full")
+        handler.handle(self.record())
+        handler.handle(self.record())
+        self.assertEqual(self.dropped("queue_full"), before + 1)
+
+
+@override_settings(CSP_REPORT_REDIS_URL="", CSP_REPORT_FLUSH_INTERVAL=3600)
+class CSPReportTests(TestCase):
+    def setUp(self):
+        csp.reset_aggregator()
+        reset_limiter()
+        self.addCleanup(csp.reset_aggregator)
+        self.addCleanup(reset_limiter)
+
+    def post(self, payload, content_type="application/csp-report"):
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        return self.client.post("/csp-report/", body, content_type=content_type)
+
+    def report(self, blocked="https://cdn.example.com/x.js?v=1"):
+        return {
+            "csp-report": {
+                "document-uri": "https://example.com/page?session=abc",
+                "violated-directive": "script-src-elem",
+                "effective-directive": "script-src-elem",
+                "blocked-uri": blocked,
+            }
+        }
+
+    def test_reports_are_deduplicated_and_flushed_in_bulk(self):
+        for version in range(3):
+            response = self.post(self.report(f"https://cdn.example.com/x.js?v={version}"))
+            self.assertEqual(response.status_code, 204)
+        body = {
+            "effectiveDirective": "img-src",
+            "blockedURL": "data",
+            "documentURL": "https://example.com/",
+        }
+        self.post([{"type": "csp-violation", "body": body}], "application/reports+json")
+        self.assertFalse(CSPViolation.objects.exists())
+
+        with self.assertNumQueries(4):  # savepoint, select, insert, release
+            self.assertEqual(csp.get_aggregator().flush(), 4)
+        row = CSPViolation.objects.get(directive="script-src-elem")
+        self.assertEqual(row.count, 3)
+        self.assertEqual(row.blocked_uri, "https://cdn.example.com/x.js")
+        self.assertEqual(row.document_uri, "https://example.com/page")
+
+        self.post(self.report())
+        csp.get_aggregator().flush()
+        self.assertEqual(CSPViolation.objects.get(directive="script-src-elem").count, 4)
+
+    def test_full_buffer_is_flushed_off_the_request_thread(self):
+        aggregator = csp.CSPReportAggregator(flush_interval=3600, max_keys=2)
+        self.addCleanup(aggregator.stop)
+        flushed = threading.Event()
+        threads = []
+
+        def flush():
+            threads.append(threading.current_thread())
+            flushed.set()
+
+        with mock.patch.object(aggregator, "flush", side_effect=flush):
+            aggregator.add([("img-src", "data", "/")])
+            self.assertFalse(flushed.is_set())
+            aggregator.add([("img-src", "blob", "/")])
+            self.assertTrue(flushed.wait(5))
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    def test_redis_drain_failure_is_not_stored_twice(self):
+        aggregator = csp.CSPReportAggregator(flush_interval=3600)
+        aggregator._redis = mock.Mock()
+        aggregator._redis.set.side_effect = ConnectionError
+        aggregator._counts.update([("img-src", "data", "/")])
+        with self.assertLogs("apps.utils.csp", "WARNING"):
+            self.assertEqual(aggregator.flush(), 0)  # counts stay in Redis
+        self.assertFalse(CSPViolation.objects.exists())
+
+        aggregator._redis.pipeline.side_effect = ConnectionError
+        aggregator._counts.update([("img-src", "data", "/")])
+        with self.assertLogs("apps.utils.csp", "WARNING"):
+            self.assertEqual(aggregator.flush(), 1)  # never reached Redis
+
+    def test_failed_store_is_retried_next_flush(self):
+        aggregator = csp.CSPReportAggregator(flush_interval=3600)
+        aggregator._redis = mock.Mock()
+        aggregator._redis.pipeline.return_value.execute.side_effect = [
+            None,  # local counts pushed
+            [{b"img-src\x1fdata\x1f/": b"2"}, 1],  # drained from the shared hash
+        ]
+        aggregator._counts.update([("img-src", "data", "/")])
+        failing = mock.patch.object(csp, "store_counts", side_effect=OperationalError)
+        with failing, self.assertRaises(OperationalError):
+            aggregator.flush()
+        self.assertEqual(aggregator._counts, {("img-src", "data", "/"): 2})
+
+        aggregator._redis = None
+        self.assertEqual(aggregator.flush(), 2)
+        self.assertEqual(CSPViolation.objects.get().count, 2)
+
+    @override_settings(CSP_REPORT_MAX_BYTES=300)
+    def test_cheap_rejections(self):
+        self.assertEqual(self.post(self.report("x" * 300)).status_code, 413)
+        self.assertEqual(self.post(self.report(), content_type="text/plain").status_code, 415)
+        self.assertEqual(self.post("{not json").status_code, 400)
+        self.assertEqual(self.post({"csp-report": {}}).status_code, 400)
+        self.assertEqual(self.client.get("/csp-report/").status_code, 405)
+
+    def test_top_violations_is_admin_only(self):
+        csp.store_counts(
+            {
+                ("script-src", "inline", "https://example.com/"): 5,
+                ("img-src", "data", "https://example.com/"): 2,
+            }
+        )
+        self.assertIn(self.client.get("/csp-report/top/").status_code, (401, 403))
+
+        admin = User.objects.create(email="root@example.com", is_staff=True)
+        token = RefreshToken.for_user(admin).access_token
+        response = self.client.get("/csp-report/top/?limit=1", HTTP_AUTHORIZATION=f"Bearer {token}")
+        results = response.json()["results"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["directive"], "script-src")
+        self.assertEqual(results[0]["count"], 5)
+
+
+class DBInstrumentationTests(TestCase):
+    def sample(self, name, route):
+        return REGISTRY.get_sample_value(name, {"route": route}) or 0
+
+    def test_duplicate_queries_are_counted_per_request(self):
+        def view(request):
+            for pk in range(3):
+                Menu.objects.filter(pk=pk).exists()
+            Service.objects.count()
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        DBInstrumentationMiddleware(view)(request)
+        self.assertEqual(request.db_stats.count, 4)
+        self.assertEqual(request.db_stats.duplicates, 2)
+        self.assertEqual(len(request.db_stats.repeated()), 1)
+
+    async def test_async_chain_records_queries_run_in_sync_threads(self):
+        async def view(request):
+            # The ORM runs in a sync_to_async thread, not on the event loop.
+            await Menu.objects.filter(pk=1).aexists()
+            await Service.objects.acount()
+            return HttpResponse()
+
+        request = AsyncRequestFactory().get("/")
+        await DBInstrumentationMiddleware(view)(request)
+        self.assertEqual(request.db_stats.count, 2)
+
+    def test_histograms_are_labelled_by_route(self):
+        menu = Menu.objects.create(title="Home", link="/")
+        MenuItem.objects.create(title="About", link="/about/", menu=menu)
+        Menu.objects.create(title="Blog", link="/blog/")
+        before = self.sample("django_route_db_queries_count", "api_menus")
+
+        self.client.get("/api/menus/")
+        self.assertEqual(self.sample("django_route_db_queries_count", "api_menus"), before + 1)
+        self.assertGreater(self.sample("django_route_db_query_seconds_sum", "api_menus"), 0)
+
+
+class QueryBudgetTests(TestCase):
+    def test_context_manager_reports_repeated_sql(self):
+        with query_budget(3):
+            Menu.objects.count()
+
+        with self.assertRaises(QueryBudgetExceeded) as ctx, query_budget(5):
+            for pk in range(3):
+                Menu.objects.filter(pk=pk).exists()
+        self.assertIn("2 repeated queries (budget 0)", str(ctx.exception))
+        self.assertIn("3x SELECT", str(ctx.exception))
+
+    @query_budget(1)
+    def test_decorator(self):
+        Service.objects.count()
+
+    @override_settings(QUERY_BUDGET_MODE="raise")
+    def test_middleware_enforces_declared_budget(self):
+        Menu.objects.create(title="Home", link="/")
+        self.assertEqual(self.client.get("/api/menus/").status_code, 200)
+
+        with mock.patch.object(MenuListAPIView, "query_budget", QueryBudget(1)):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get("/api/menus/?limit=1")
+            with (
+                override_settings(QUERY_BUDGET_MODE="warn"),
+                self.assertLogs("apps.utils.querybudget", "WARNING"),
+            ):
+                self.client.get("/api/menus/?limit=2")
+
+
+@override_settings(DB_REPLICAS={"replica1": 2, "replica2": 1})
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        reset_pool()
+        self.factory = RequestFactory()
+        self.reads = []
+
+    def call(self, request, write=False, fail_on_replica=False):
+        @read_from_replica
+        def view(request):
+            if write:
+                router.db_for_write(Menu)
+            alias = router.db_for_read(Menu)
+            if fail_on_replica and alias != "default":
+                raise OperationalError("replica down")
+            self.reads.append(alias)
+            return HttpResponse()
+
+        return ReplicaMiddleware(view)(request)
+
+    def test_weighted_round_robin_skips_ejected_replicas(self):
+        pool = get_pool()
+        self.assertEqual([pool.pick() for _ in range(6)], ["replica1", "replica1", "replica2"] * 2)
+        pool.eject("replica1", 60)
+        self.assertEqual({pool.pick() for _ in range(3)}, {"replica2"})
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        self.call(self.factory.get("/"))
+        self.call(self.factory.get("/"))
+        response = self.call(self.factory.post("/"), write=True)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        request = self.factory.get("/")
+        request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+        self.call(request)
+        self.assertEqual(self.reads, ["replica1", "replica1", "default", "default"])
+
+        self.call(self.factory.get("/"), write=True)  # same request: primary after the write
+        self.assertEqual(self.reads[-1], "default")
+
+    def test_failing_replica_is_ejected_and_view_retried_on_primary(self):
+        with self.assertLogs("apps.utils.dbrouter", "WARNING"):
+            response = self.call(self.factory.get("/"), fail_on_replica=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.reads, ["default"])
+        self.assertEqual(get_pool().pick(), "replica2")
+
+
+class DBPoolMetricsTests(SimpleTestCase):
+    class Pool:
+        def pop_stats(self):
+            # Shape of psycopg_pool's ConnectionPool.pop_stats().
+            return {
+                "pool_min": 2,
+                "pool_max": 4,
+                "pool_size": 4,
+                "pool_available": 1,
+                "requests_waiting": 2,
+                "requests_num": 50,
+                "requests_queued": 10,
+                "requests_wait_ms": 2500,
+            }
+
+    def value(self, name):
+        return REGISTRY.get_sample_value(name, {"alias": "pool-test"})
+
+    def test_samples_pool_statistics_by_alias(self):
+        pools = {"pool-test": self.Pool()}
+        dbpool.sample(pools)
+        dbpool.sample(pools)  # counters are popped: the second sample adds up
+
+        self.assertEqual(self.value("django_db_pool_size"), 4)
+        self.assertEqual(self.value("django_db_pool_saturation"), 0.75)
+        self.assertEqual(self.value("django_db_pool_requests_waiting"), 2)
+        self.assertEqual(self.value("django_db_pool_requests_queued_total"), 20)
+        self.assertEqual(self.value("django_db_pool_wait_seconds_total"), 5.0)
+        self.assertEqual(self.value("django_db_pool_timeouts_total"), 0)
+
+    @mock.patch.object(dbpool, "start_sampler")
+    def test_sampler_starts_with_the_first_pooled_connection(self, start_sampler):
+        plain = SimpleNamespace(settings_dict={"OPTIONS": {}}, execute_wrappers=[])
+        pooled = SimpleNamespace(settings_dict={"OPTIONS": {"pool": True}}, execute_wrappers=[])
+        connection_created.send(sender=None, connection=plain)
+        start_sampler.assert_not_called()
+        connection_created.send(sender=None, connection=pooled)
+        start_sampler.assert_called_once_with()
+
+    @mock.patch.dict(os.environ, {"DB_ENGINE": "postgres", "DB_POOL": "true"})
+    def test_postgres_settings_build_a_pool(self):
+        database = runpy.run_module("djangodemo.settings.base")["DATABASES"]["default"]
+        alias = "pool-settings-test"
+        connection = ConnectionHandler({"default": database, alias: database})[alias]
+        self.addCleanup(connection._connection_pools.pop, alias, None)
+        pool = connection.pool  # created closed: no connection is opened
+        self.assertEqual(pool.max_size, database["OPTIONS"]["pool"]["max_size"])
+        self.assertIsNotNone(pool._check)
+
+
+class PreforkTests(SimpleTestCase):
+    def test_after_fork_drops_process_wide_singletons(self):
+        self.addCleanup(reset_hash_pool)
+        inherited = [get_hash_pool(), get_limiter(), csp.get_aggregator(), get_pool()]
+
+        after_fork()
+
+        fresh = [get_hash_pool(), get_limiter(), csp.get_aggregator(), get_pool()]
+        for old, new in zip(inherited, fresh, strict=True):
+            self.assertIsNot(old, new)
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def test_children_are_bound_once(self):
+        metric = metrics.counter("test_bound_total", "Test counter.", ["outcome", "kind"])
+        self.addCleanup(REGISTRY.unregister, metric)
+        bound = metrics.children(metric, "outcome", metrics.OUTCOMES, kind="a")
+        self.assertIs(bound.success, metric.labels(outcome="success", kind="a"))
+
+        metrics.record_outcome(bound, 200)
+        metrics.record_outcome(bound, 429)
+        metrics.record_outcome(bound, 401)
+        metrics.record_outcome(bound, 503)
+        counts = [getattr(bound, outcome)._value.get() for outcome in metrics.OUTCOMES]
+        self.assertEqual(counts, [1, 1, 1, 1])
+
+    def test_label_children_bind_on_first_use(self):
+        lazy = metrics.LabelChildren(metrics.db_replica_ejections_total)
+        child = metrics.db_replica_ejections_total.labels("replica-test")
+        self.assertIs(lazy["replica-test"], child)
+        self.assertIs(lazy["replica-test"], lazy["replica-test"])
+
+
+@override_settings(
+    PROFILING_ENABLED=True,
+    PROFILING_SAMPLE_RATE=0.0,
+    PROFILING_BUFFER_SIZE=2,
+    STORAGES={"staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}},
+)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        storage = override_settings(PROFILING_DIR=directory)
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.staff = User.objects.create(email="staff@example.com", is_staff=True)
+        self.factory = RequestFactory()
+
+        def menus(request):
+            list(Menu.objects.all())
+            return HttpResponse("ok")
+
+        self.middleware = ProfilingMiddleware(menus)
+
+    def profile(self, **headers):
+        return self.middleware(self.factory.get("/api/menus/", **headers))
+
+    def test_only_signed_headers_and_samples_are_profiled(self):
+        self.assertNotIn("X-Profile-Id", self.profile())
+        self.assertNotIn("X-Profile-Id", self.profile(HTTP_X_PROFILE="forged"))
+        self.assertIn("X-Profile-Id", self.profile(HTTP_X_PROFILE=make_token(self.staff)))
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            self.assertIn("X-Profile-Id", self.profile())
+
+    def test_profile_has_call_tree_and_sql_timeline(self):
+        response = self.profile(HTTP_X_PROFILE=make_token(self.staff))
+        record = get_store().get(response["X-Profile-Id"])
+
+        self.assertEqual(
+            (record["reason"], record["status"], record["queries"]), ("header", 200, 1)
+        )
+        self.assertIn('FROM "pages_menu"', record["sql"][0]["sql"])
+        self.assertIn("menus", [row["function"] for row in record["functions"]])
+        self.assertIn("menus", record["callees"])
+
+    def test_profiler_ignores_other_threads(self):
+        def other():
+            while not done.is_set():
+                sorted(range(10))
+
+        done = threading.Event()
+        thread = threading.Thread(target=other)
+        thread.start()
+        profiler = ThreadProfiler()
+        profiler.enable()
+        json.dumps([1, 2])
+        time.sleep(0.01)
+        profiler.disable()
+        done.set()
+        thread.join()
+
+        functions = [row["function"] for row in summarize(profiler, 100)[0]]
+        self.assertIn("dumps", functions)
+        self.assertNotIn("<built-in method builtins.sorted>", functions)
+        self.assertNotIn("other", functions)
+
+    async def test_asgi_requests_are_not_profiled(self):
+        # The event loop thread runs every concurrent request.
+        async def view(request):
+            return HttpResponse("ok")
+
+        with self.assertLogs("apps.utils.profiling", "WARNING"):
+            middleware = ProfilingMiddleware(view)
+        request = AsyncRequestFactory().get("/", HTTP_X_PROFILE=make_token(self.staff))
+        response = await middleware(request)
+        self.assertNotIn("X-Profile-Id", response)
+
+    @override_settings(PROFILING_ENABLED=False, SILK_ENABLED=True)
+    def test_silk_alone_selects_requests(self):
+        request = RequestFactory().get("/api/menus/", HTTP_X_PROFILE=make_token(self.staff))
+        self.assertEqual(should_profile(request), "header")
+
+    def test_ring_buffer_keeps_the_newest_profiles(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            ids = [self.profile()["X-Profile-Id"] for _ in range(3)]
+        self.assertEqual([summary["id"] for summary in get_store().list()], ids[:0:-1])
+        self.assertIsNone(get_store().get(ids[0]))
+
+    def test_staff_viewer_lists_profiles_and_issues_tokens(self):
+        profile_id = self.profile(HTTP_X_PROFILE=make_token(self.staff))["X-Profile-Id"]
+        self.assertEqual(self.client.get("/profiles/").status_code, 302)  # admin login
+
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get("/profiles/"), f"/profiles/{profile_id}/")
+        self.assertContains(self.client.get(f"/profiles/{profile_id}/"), "SQL timeline")
+        self.assertEqual(self.client.get("/profiles/../etc/").status_code, 404)
+
+        token = self.client.post("/profiles/").context["token"]
+        self.assertTrue(check_token(token))
@@ -1,10 +1,19 @@
+from django.conf import settings
 from django.urls import path
 
-from .apiviews import HealthCheckView, CSPReportView
+from .apiviews import CSPReportView, CSPViolationTopView, HealthCheckView, health_check
+from .views import profile_detail, profile_list
 
 app_name = "utils"
 
 urlpatterns = [
-    path("health/", HealthCheckView.as_view(), name="health"),
+    path(
+        "health/",
+        health_check if settings.ASYNC_VIEWS_ENABLED else HealthCheckView.as_view(),
+        name="health",
+    ),
     path("csp-report/", CSPReportView.as_view(), name="csp_report"),
+    path("csp-report/top/", CSPViolationTopView.as_view(), name="csp_top"),
+    path("profiles/", profile_list, name="profiles"),
+    path("profiles/<str:profile_id>/", profile_detail, name="profile_detail"),
 ]
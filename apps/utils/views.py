@@ -1,3 +1,46 @@
+"""Staff viewer of the request profiles (see profiling.py)."""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404
 from django.shortcuts import render
 
-# Create your views here.
+from . import profiling
+from .querybudget import QueryBudget
+
+
+@QueryBudget(4)  # session, user, admin app list permissions (2)
+@staff_member_required
+def profile_list(request):
+    """Ring buffer listing; POST issues an ``X-Profile`` header token."""
+
+    context = {
+        **admin.site.each_context(request),
+        "title": "Request profiles",
+        "profiles": profiling.get_store().list(),
+        "header": profiling.HEADER,
+        "token": profiling.make_token(request.user) if request.method == "POST" else None,
+        "token_max_age": getattr(settings, "PROFILING_TOKEN_MAX_AGE", 3600),
+        "enabled": getattr(settings, "PROFILING_ENABLED", False),
+        "sample_rate": getattr(settings, "PROFILING_SAMPLE_RATE", 0.0),
+    }
+    return render(request, "utils/profiles.html", context)
+
+
+@QueryBudget(4)  # session, user, admin app list permissions (2)
+@staff_member_required
+def profile_detail(request, profile_id: str):
+    record = None
+    if profiling.PROFILE_ID.fullmatch(profile_id):
+        record = profiling.get_store().get(profile_id)
+    if record is None:
+        raise Http404("Unknown or expired profile.")
+    context = {
+        **admin.site.each_context(request),
+        "title": f"{record['method']} {record['path']}",
+        "profile": record,
+    }
+    return render(request, "utils/profile_detail.html", context)
@@ -0,0 +1,94 @@
+"""Template warmup.
+
+Django's cached template loader compiles a template the first time it is
+requested, so the first hit on every freshly started worker pays template
+discovery and compilation for the page and all of its ``{% include %}``
+components. ``warm_templates()`` compiles them up front.
+
+Used by:
+- ``UtilsConfig.ready()`` when ``TEMPLATE_WARMUP`` is enabled (production).
+- ``python manage.py warm_templates`` (reports per-template compile time).
+
+Under a preloading server (gunicorn ``preload_app``) the compiled templates
+are built once in the master and shared copy-on-write by the workers.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.template.utils import get_app_template_dirs
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = (".html", ".txt", ".xml")
+
+
+@dataclass(frozen=True)
+class WarmupResult:
+    engine: str
+    template: str
+    seconds: float
+    error: str = ""
+
+
+def _template_names(directories) -> list[str]:
+    names = set()
+    for directory in directories:
+        root = Path(directory)
+        if not root.is_dir():
+            continue
+        for path in root.rglob("*"):
+            if path.is_file() and path.suffix in TEMPLATE_SUFFIXES:
+                names.add(path.relative_to(root).as_posix())
+    return sorted(names)
+
+
+def warm_templates(include_app_dirs: bool = False) -> list[WarmupResult]:
+    """Compile templates of every Django template engine.
+
+    By default only the project ``DIRS`` (``templates/``) are compiled;
+    ``include_app_dirs`` also compiles templates shipped by installed apps
+    (admin, DRF, ...), which is slower and rarely needed.
+    """
+
+    results = []
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        directories = list(engine.dirs)
+        if include_app_dirs:
+            directories += list(get_app_template_dirs("templates"))
+        for name in _template_names(directories):
+            start = time.perf_counter()
+            error = ""
+            try:
+                engine.get_template(name)
+            except Exception as exc:  # noqa: BLE001 - report and keep warming
+                error = f"{type(exc).__name__}: {str(exc).splitlines()[0]}"
+            results.append(WarmupResult(engine.name, name, time.perf_counter() - start, error))
+    return results
+
+
+def warm_templates_on_startup() -> None:
+    """Warm templates and log a summary (never raises)."""
+
+    start = time.perf_counter()
+    try:
+        results = warm_templates()
+    except Exception:  # pragma: no cover - warmup must not prevent boot
+        logger.exception("Template warmup failed")
+        return
+    for result in results:
+        if result.error:
+            logger.warning("Template %s failed to compile: %s", result.template, result.error)
+        else:
+            logger.debug("Template %s compiled in %.1f ms", result.template, result.seconds * 1000)
+    logger.info(
+        "Warmed %d templates in %.1f ms", len(results), (time.perf_counter() - start) * 1000
+    )
@@ -0,0 +1,16 @@
+"""Project-wide pytest fixtures (pytest-django, see pytest.ini)."""
+
+import pytest
+
+
+@pytest.fixture
+def query_budget():
+    """Fail the test when a block exceeds its query budget.
+
+    ``with query_budget(3, duplicates=0): client.get("/api/menus/")``
+    (see apps/utils/querybudget.py).
+    """
+
+    from apps.utils.querybudget import query_budget
+
+    return query_budget
@@ -10,6 +10,7 @@ Common settings live here (base.py) and should be safe by default.
 
 from __future__ import annotations
 
+import tempfile
 from pathlib import Path
 from typing import List
 
@@ -32,6 +33,10 @@ env = environ.Env(
     DB_HOST=(str, "localhost"),
     DB_PORT=(str, "5432"),
     REDIS_URL=(str, "redis://localhost:6379/1"),
+    PAGES_CACHE_ENABLED=(bool, True),
+    PAGES_CACHE_TIMEOUT=(int, 60 * 60 * 24),
+    PAGES_ETAG_SALT=(str, ""),
+    PAGES_PAGE_CACHE_ENABLED=(bool, True),
     JSON_LOGS=(bool, False),
     SECURITY_HEADERS_ENABLED=(bool, True),
     CSP_ENABLED=(bool, False),
@@ -91,10 +96,24 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 # ---------------------------------------------------------------------
 # Middleware
 # ---------------------------------------------------------------------
+# Every middleware below is async-capable except WhiteNoise: under ASGI,
+# serve static files from the proxy/CDN and set WHITENOISE_ENABLED=False so
+# requests run without a sync adaptation.
+WHITENOISE_ENABLED = env.bool("WHITENOISE_ENABLED", default=True)
+# Per-route query count / DB time / duplicate-query histograms
+# (apps/utils/dbmetrics.py).
+DB_INSTRUMENTATION_ENABLED = env.bool("DB_INSTRUMENTATION_ENABLED", default=True)
+# Declared per-view query budgets (apps/utils/querybudget.py) are checked
+# on every request: "off", "warn" (log) or "raise" (CI).
+QUERY_BUDGET_MODE = env("QUERY_BUDGET_MODE", default="off")
+
 MIDDLEWARE = [
     "django_prometheus.middleware.PrometheusBeforeMiddleware",
+    "apps.utils.dbmetrics.DBInstrumentationMiddleware",
+    "apps.utils.querybudget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "apps.utils.middleware.RequestIdMiddleware",
+    "apps.utils.dbrouter.ReplicaMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # static files (prod-friendly)
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -102,13 +121,25 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "apps.users.hashing.HashPoolSaturatedMiddleware",
     "apps.utils.middleware.SecurityHeadersMiddleware",
+    "apps.utils.middleware.RateLimitHeadersMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django_prometheus.middleware.PrometheusAfterMiddleware",
 ]
 
+if not WHITENOISE_ENABLED:
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
+if not DB_INSTRUMENTATION_ENABLED:
+    MIDDLEWARE.remove("apps.utils.dbmetrics.DBInstrumentationMiddleware")
+    MIDDLEWARE.remove("apps.utils.querybudget.QueryBudgetMiddleware")
+
 ROOT_URLCONF = "djangodemo.urls"
 
+# Mount the native async variants of the public read endpoints
+# (apps/pages/asyncviews.py, health check); enable when serving with ASGI.
+ASYNC_VIEWS_ENABLED = env.bool("ASYNC_VIEWS_ENABLED", default=False)
+
 # CORS (restrict in production)
 CORS_ALLOWED_ORIGINS = tuple(_split_csv(env("CORS_ALLOWED_ORIGINS")))
 CORS_ALLOW_CREDENTIALS = True
@@ -120,18 +151,34 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
+        # performance: explicit cached loader (APP_DIRS must be off when
+        # "loaders" is set); templates are compiled once per process.
+        "APP_DIRS": False,
         "OPTIONS": {
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "apps.pages.context_processors.site",
             ],
         },
     }
 ]
 
+# Compile every project template at startup (see apps/utils/warmup.py) so the
+# first request of each worker does not pay for it.
+TEMPLATE_WARMUP = env.bool("TEMPLATE_WARMUP", default=False)
+
 WSGI_APPLICATION = "djangodemo.wsgi.application"
 ASGI_APPLICATION = "djangodemo.asgi.application"
 
@@ -140,6 +187,22 @@ ASGI_APPLICATION = "djangodemo.asgi.application"
 # ---------------------------------------------------------------------
 DB_ENGINE = env("DB_ENGINE").lower()
 
+# PostgreSQL connections (psycopg 3):
+# - DB_POOL: one connection pool per process (Django's native psycopg_pool
+#   support) shared by all threads, instead of one persistent connection per
+#   thread. Size it to the threads of a worker; a request waits up to
+#   DB_POOL_TIMEOUT seconds for a free connection. With CONN_HEALTH_CHECKS
+#   Django has the pool test each connection before handing it out. Pools
+#   are monitored by apps/utils/dbpool.py (django_db_pool_* metrics,
+#   sampled every DB_POOL_METRICS_INTERVAL seconds).
+# - DB_POOLER=transaction: behind PgBouncer (or another pooler) in
+#   transaction mode: no server-side cursors and no prepared statements,
+#   as consecutive transactions may run on different server connections.
+#   The database's TimeZone must be UTC so Django never sends SET TIME ZONE.
+DB_POOL = env.bool("DB_POOL", default=True)
+DB_POOLER = env("DB_POOLER", default="").lower()  # ""|transaction
+DB_POOL_METRICS_INTERVAL = env.float("DB_POOL_METRICS_INTERVAL", default=5.0)
+
 if DB_ENGINE == "postgres":
     DATABASES = {
         "default": {
@@ -150,8 +213,22 @@ if DB_ENGINE == "postgres":
             "HOST": env("DB_HOST"),
             "PORT": env("DB_PORT"),
             "CONN_MAX_AGE": 60,  # performance: keep DB connections
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
         }
     }
+    if DB_POOL:
+        DATABASES["default"]["CONN_MAX_AGE"] = 0  # connections go back to the pool
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": env.int("DB_POOL_MIN_SIZE", default=2),
+            "max_size": env.int("DB_POOL_MAX_SIZE", default=4),
+            "timeout": env.float("DB_POOL_TIMEOUT", default=10.0),
+            "max_idle": env.float("DB_POOL_MAX_IDLE", default=300.0),
+            "max_lifetime": env.float("DB_POOL_MAX_LIFETIME", default=1800.0),
+        }
+    if DB_POOLER == "transaction":
+        DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+        DATABASES["default"]["OPTIONS"]["prepare_threshold"] = None
 elif DB_ENGINE == "mysql":
     DATABASES = {
         "default": {
@@ -173,6 +250,30 @@ else:  # sqlite (default)
         }
     }
 
+# Read replicas (apps/utils/dbrouter.py): comma-separated URLs with the
+# primary's engine, e.g. "postgres://app:pw@replica-1:5432/app?weight=2".
+# Opted-in read-only views read from them; a client that just wrote reads
+# from the primary for DB_REPLICA_STICKY_SECONDS; a failing replica is
+# ejected for DB_REPLICA_EJECT_SECONDS.
+DB_REPLICAS = {}
+for _index, _url in enumerate(env.list("DB_REPLICA_URLS", default=[]), start=1):
+    _replica = env.db_url_config(_url)
+    DB_REPLICAS[f"replica{_index}"] = int(_replica.get("OPTIONS", {}).pop("weight", 1))
+    _replica.update(
+        {
+            key: value
+            for key, value in DATABASES["default"].items()
+            if key
+            in {"ENGINE", "CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "DISABLE_SERVER_SIDE_CURSORS"}
+        },
+        OPTIONS={**DATABASES["default"].get("OPTIONS", {}), **_replica.get("OPTIONS", {})},
+        TEST={"MIRROR": "default"},
+    )
+    DATABASES[f"replica{_index}"] = _replica
+DATABASE_ROUTERS = ["apps.utils.dbrouter.ReplicaRouter"]
+DB_REPLICA_STICKY_SECONDS = env.int("DB_REPLICA_STICKY_SECONDS", default=15)
+DB_REPLICA_EJECT_SECONDS = env.int("DB_REPLICA_EJECT_SECONDS", default=30)
+
 # ---------------------------------------------------------------------
 # Password validation
 # ---------------------------------------------------------------------
@@ -209,22 +310,68 @@ MEDIA_ROOT = BASE_DIR / "media"
 # ---------------------------------------------------------------------
 AUTH_USER_MODEL = "users.User"
 
+# Password verification runs on a bounded per-process pool
+# (apps/users/hashing.py) so login bursts cannot occupy every request thread.
+AUTHENTICATION_BACKENDS = ["apps.users.backends.PooledModelBackend"]
+# Request threads of a gunicorn worker (same variable as gunicorn.conf.py).
+SERVER_THREADS = env.int("GUNICORN_THREADS", default=4)
+# Hashes admitted per process, running or queued (default: every request
+# thread but one), threads running them, and the Retry-After (seconds) sent
+# with the 503 beyond that.
+AUTH_HASH_MAX_IN_FLIGHT = env.int("AUTH_HASH_MAX_IN_FLIGHT", default=max(1, SERVER_THREADS - 1))
+AUTH_HASH_POOL_SIZE = env.int("AUTH_HASH_POOL_SIZE", default=2)
+AUTH_HASH_TIMEOUT = env.float("AUTH_HASH_TIMEOUT", default=10.0)
+AUTH_HASH_RETRY_AFTER = env.int("AUTH_HASH_RETRY_AFTER", default=1)
+
 REST_FRAMEWORK = {
+    # performance: users come from token claims, not a per-request query
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.users.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    # performance: orjson-backed JSON (see apps/utils/fastjson.py)
+    "DEFAULT_RENDERER_CLASSES": (
+        "apps.utils.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "apps.utils.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     # performance: pagination prevents accidental huge responses
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 50,
     # security: basic throttling to reduce brute-force / abuse
+    # (shared Redis GCRA limiter, see apps/utils/ratelimit.py)
     "DEFAULT_THROTTLE_CLASSES": (
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "apps.utils.ratelimit.AnonRateThrottle",
+        "apps.utils.ratelimit.UserRateThrottle",
     ),
     "DEFAULT_THROTTLE_RATES": {"anon": "100/hour", "user": "1000/hour"},
 }
 
+# Fast JSON: FastJSONRenderer / FastJSONParser / FastJsonResponse use orjson
+# when installed and enabled, with a pluggable fallback encoder for types
+# orjson does not know (datetimes, Decimals, lazy translations, ...).
+FAST_JSON_ENABLED = env.bool("FAST_JSON_ENABLED", default=True)
+FAST_JSON_ENCODER = env("FAST_JSON_ENCODER", default="rest_framework.utils.encoders.JSONEncoder")
+# List endpoints serialize .values() rows through compiled row functions
+# (apps/utils/serializers.py) instead of per-row ModelSerializer instances.
+FAST_LIST_SERIALIZATION = env.bool("FAST_LIST_SERIALIZATION", default=True)
+
+# Rows fetched per round trip by the streaming user export.
+USERS_EXPORT_CHUNK_SIZE = env.int("USERS_EXPORT_CHUNK_SIZE", default=2000)
+# Bulk import: rows per bulk_create batch and password hashing processes
+# (0 = one per CPU).
+USERS_IMPORT_BATCH_SIZE = env.int("USERS_IMPORT_BATCH_SIZE", default=500)
+USERS_IMPORT_HASH_WORKERS = env.int("USERS_IMPORT_HASH_WORKERS", default=0)
+# Larger API imports run as a background job (apps/users/imports.py).
+USERS_IMPORT_SYNC_LIMIT = env.int("USERS_IMPORT_SYNC_LIMIT", default=50)
+# Unfinished background imports older than this (seconds) were lost with
+# their worker: `manage.py fail_stale_imports` marks them FAILED.
+USERS_IMPORT_JOB_TIMEOUT = env.int("USERS_IMPORT_JOB_TIMEOUT", default=3600)
+
 # ---------------------------------------------------------------------
 # JWT (SimpleJWT) hardening
 # ---------------------------------------------------------------------
@@ -236,15 +383,73 @@ SIMPLE_JWT = {
     # Keep access tokens short; tune to your needs via env if desired.
     "ACCESS_TOKEN_LIFETIME": __import__("datetime").timedelta(minutes=10),
     "REFRESH_TOKEN_LIFETIME": __import__("datetime").timedelta(days=7),
+    # Tokens carry the user claims read by ClaimsJWTAuthentication, and
+    # blacklist lookups go through a two-tier cache (apps/users/blacklist.py).
+    "TOKEN_OBTAIN_SERIALIZER": "apps.users.tokens.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "apps.users.tokens.TokenRefreshSerializer",
+    "TOKEN_VERIFY_SERIALIZER": "apps.users.tokens.TokenVerifySerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "apps.users.tokens.TokenBlacklistSerializer",
 }
+# Seconds a user loaded on demand by ClaimsJWTAuthentication is reused by
+# the process (writes to the user invalidate it immediately).
+USERS_AUTH_CACHE_TTL = env.int("USERS_AUTH_CACHE_TTL", default=30)
+# Per-process LRU size, how long (seconds) a "not blacklisted" answer may be
+# reused locally (0 = always ask the shared cache), and how often the shared
+# tier is re-synchronized from the database.
+JWT_BLACKLIST_LRU_SIZE = env.int("JWT_BLACKLIST_LRU_SIZE", default=10000)
+JWT_BLACKLIST_NEGATIVE_TTL = env.float("JWT_BLACKLIST_NEGATIVE_TTL", default=0)
+JWT_BLACKLIST_REWARM_INTERVAL = env.int("JWT_BLACKLIST_REWARM_INTERVAL", default=3600)
+# Set only when CACHES["default"] is a shared Redis that never evicts keys
+# (maxmemory-policy noeviction): a cache miss then proves a token is not
+# blacklisted. Otherwise misses are checked against the database.
+JWT_BLACKLIST_CACHE_NOEVICTION = env.bool("JWT_BLACKLIST_CACHE_NOEVICTION", default=False)
 
 # ---------------------------------------------------------------------
-# Profiling (Silk) - enable only when needed
+# Profiling (apps/utils/profiling.py)
 # ---------------------------------------------------------------------
+# Profile a PROFILING_SAMPLE_RATE fraction of requests, plus requests with
+# a signed X-Profile header (tokens issued to staff at /profiles/, valid
+# PROFILING_TOKEN_MAX_AGE seconds). Profiles (cProfile call tree + SQL
+# timeline) are kept in a ring buffer of PROFILING_BUFFER_SIZE entries, in
+# Redis with PROFILING_REDIS_URL, otherwise as files in PROFILING_DIR.
+# Sync workers only: ASGI requests are passed through unprofiled.
+PROFILING_ENABLED = env.bool("PROFILING_ENABLED", default=False)
+PROFILING_SAMPLE_RATE = env.float("PROFILING_SAMPLE_RATE", default=0.0)
+PROFILING_TOKEN_MAX_AGE = env.int("PROFILING_TOKEN_MAX_AGE", default=3600)
+PROFILING_REDIS_URL = env("PROFILING_REDIS_URL", default="")
+PROFILING_DIR = env("PROFILING_DIR", default=str(Path(tempfile.gettempdir()) / "django-profiles"))
+PROFILING_BUFFER_SIZE = env.int("PROFILING_BUFFER_SIZE", default=200)
+PROFILING_MAX_FUNCTIONS = env.int("PROFILING_MAX_FUNCTIONS", default=40)
+PROFILING_MAX_QUERIES = env.int("PROFILING_MAX_QUERIES", default=200)
+
+if PROFILING_ENABLED:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("apps.utils.middleware.RequestIdMiddleware") + 1,
+        "apps.utils.profiling.ProfilingMiddleware",
+    )
+
+# Silk records every request it intercepts, with all its SQL, to the
+# database: it only intercepts the requests chosen for profiling above
+# (sampled or with X-Profile; chosen with SILK_ENABLED alone too), and
+# keeps at most SILKY_MAX_RECORDED_REQUESTS of them.
 SILK_ENABLED = env.bool("SILK_ENABLED", default=False)
 
+
+def _silk_intercept(request) -> bool:
+    from apps.utils.profiling import should_profile
+
+    return should_profile(request) is not None
+
+
+SILKY_INTERCEPT_FUNC = _silk_intercept
+SILKY_MAX_RECORDED_REQUESTS = env.int("SILKY_MAX_RECORDED_REQUESTS", default=1000)
+SILKY_MAX_RECORDED_REQUESTS_CHECK_PERCENT = 10
+
 if SILK_ENABLED:
-    MIDDLEWARE.insert(3, "silk.middleware.SilkyMiddleware")
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("apps.utils.middleware.RequestIdMiddleware") + 1,
+        "silk.middleware.SilkyMiddleware",
+    )
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "DjangoDemo API",
@@ -262,6 +467,8 @@ CSP_REPORT_ONLY = env.bool("CSP_REPORT_ONLY")
 CSP_POLICY = env("CSP_POLICY")
 REFERRER_POLICY = env("REFERRER_POLICY")
 PERMISSIONS_POLICY = env("PERMISSIONS_POLICY")
+# "uuid4" or "sequential" (cheaper, time-ordered; see apps/utils/request_id.py)
+REQUEST_ID_GENERATOR = env("REQUEST_ID_GENERATOR", default="uuid4")
 
 # ---------------------------------------------------------------------
 # Cache (optional Redis)
@@ -280,9 +487,74 @@ else:
     # Dev-friendly fallback (no Redis required)
     CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
 
+# Rate limiting (apps/utils/ratelimit.py): one atomic Lua round trip per
+# check on this Redis; without it (or while it is down) limits fall back to
+# per-process token buckets, retrying Redis after RATELIMIT_REDIS_RETRY_AFTER.
+RATELIMIT_REDIS_URL = env("RATELIMIT_REDIS_URL", default=REDIS_URL)
+RATELIMIT_KEY_PREFIX = env("RATELIMIT_KEY_PREFIX", default="rl")
+RATELIMIT_SOCKET_TIMEOUT = env.float("RATELIMIT_SOCKET_TIMEOUT", default=0.1)
+RATELIMIT_REDIS_RETRY_AFTER = env.int("RATELIMIT_REDIS_RETRY_AFTER", default=5)
+
+# CSP reports (apps/utils/csp.py): fingerprints are counted in memory and
+# flushed in bulk every CSP_REPORT_FLUSH_INTERVAL seconds, through a shared
+# Redis hash when CSP_REPORT_REDIS_URL is set. Bodies over
+# CSP_REPORT_MAX_BYTES are rejected unread.
+CSP_REPORT_REDIS_URL = env("CSP_REPORT_REDIS_URL", default=REDIS_URL)
+CSP_REPORT_KEY_PREFIX = env("CSP_REPORT_KEY_PREFIX", default="csp")
+CSP_REPORT_FLUSH_INTERVAL = env.float("CSP_REPORT_FLUSH_INTERVAL", default=30)
+CSP_REPORT_MAX_KEYS = env.int("CSP_REPORT_MAX_KEYS", default=1000)
+CSP_REPORT_MAX_BYTES = env.int("CSP_REPORT_MAX_BYTES", default=8 * 1024)
+CSP_REPORT_MAX_ITEMS = env.int("CSP_REPORT_MAX_ITEMS", default=20)
+CSP_REPORT_RATE = env("CSP_REPORT_RATE", default="60/m")  # per client IP
+
+# Public pages API: rendered responses are cached and invalidated by
+# per-model generation counters (apps/pages/cache.py), so the timeout only
+# bounds how long unused entries occupy memory.
+PAGES_CACHE_ENABLED = env.bool("PAGES_CACHE_ENABLED")
+PAGES_CACHE_TIMEOUT = env.int("PAGES_CACHE_TIMEOUT")
+# The counters live in CACHES["default"]. Without REDIS_URL that cache is
+# per process, so each worker re-checks the database at most every
+# PAGES_CACHE_REVALIDATE_INTERVAL seconds to see other workers' writes.
+PAGES_CACHE_REVALIDATE_INTERVAL = env.float("PAGES_CACHE_REVALIDATE_INTERVAL", default=5)
+# Mixed into content ETags; set it to the release id so template changes
+# invalidate browser/CDN copies on deploy.
+PAGES_ETAG_SALT = env("PAGES_ETAG_SALT")
+# Full-page cache of the marketing pages for anonymous visitors.
+PAGES_PAGE_CACHE_ENABLED = env.bool("PAGES_PAGE_CACHE_ENABLED")
+
 # ---------------------------------------------------------------------
 # Logging
 # ---------------------------------------------------------------------
+# LOG_ASYNC: enqueue records on a bounded queue and format/write them in
+# batches from a background thread (apps/utils/log.py); full queue = drop.
+LOG_ASYNC = env.bool("LOG_ASYNC", default=False)
+LOG_QUEUE_SIZE = env.int("LOG_QUEUE_SIZE", default=10000)
+LOG_BATCH_SIZE = env.int("LOG_BATCH_SIZE", default=256)
+# Fraction of records kept per logger (below ERROR), e.g.
+# LOG_SAMPLING="apps.utils.apiviews=0.1,django.request=0.5".
+LOG_SAMPLING = env.dict("LOG_SAMPLING", cast={"value": float}, default={})
+# Identical records (logger, level, formatted message) below ERROR: burst,
+# then per second.
+LOG_RATE_LIMIT = env.float("LOG_RATE_LIMIT", default=10)
+LOG_RATE_LIMIT_BURST = env.int("LOG_RATE_LIMIT_BURST", default=50)
+
+
+def console_handler(async_logging: bool) -> dict:
+    """LOGGING config of the console handler (queued or synchronous)."""
+
+    handler = {
+        "formatter": "json" if env.bool("JSON_LOGS") else "plain",
+        "filters": ["request_id", "sampling", "rate_limit"],
+    }
+    if async_logging:
+        handler["()"] = "apps.utils.log.QueueHandler"
+        handler["capacity"] = LOG_QUEUE_SIZE
+        handler["batch_size"] = LOG_BATCH_SIZE
+    else:
+        handler["class"] = "logging.StreamHandler"
+    return handler
+
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -295,13 +567,15 @@ LOGGING = {
     },
     "filters": {
         "request_id": {"()": "apps.utils.request_id.RequestIdFilter"},
+        "sampling": {"()": "apps.utils.log.SamplingFilter", "rates": LOG_SAMPLING},
+        "rate_limit": {
+            "()": "apps.utils.log.RateLimitFilter",
+            "rate": LOG_RATE_LIMIT,
+            "burst": LOG_RATE_LIMIT_BURST,
+        },
     },
     "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "json" if env.bool("JSON_LOGS") else "plain",
-            "filters": ["request_id"],
-        },
+        "console": console_handler(LOG_ASYNC),
     },
     "root": {"handlers": ["console"], "level": "INFO"},
 }
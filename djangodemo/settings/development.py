@@ -8,3 +8,6 @@ DEBUG = True
 
 # In dev we often allow localhost + docker hostnames
 ALLOWED_HOSTS = list(set(ALLOWED_HOSTS + ["0.0.0.0"]))  # noqa
+
+# Log requests exceeding their declared query budget (apps/utils/querybudget.py).
+QUERY_BUDGET_MODE = env("QUERY_BUDGET_MODE", default="warn")  # noqa: F405
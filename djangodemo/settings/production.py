@@ -6,6 +6,22 @@ from .base import *  # noqa
 
 DEBUG = False
 
+# Warm the cached template loader before serving traffic.
+TEMPLATE_WARMUP = env.bool("TEMPLATE_WARMUP", default=True)  # noqa: F405
+
+# Format and write logs off the request thread (apps/utils/log.py).
+LOG_ASYNC = env.bool("LOG_ASYNC", default=True)  # noqa: F405
+LOGGING["handlers"]["console"] = console_handler(LOG_ASYNC)  # noqa: F405
+
+# With REDIS_URL the blacklist tier is shared and, provided Redis runs with
+# maxmemory-policy noeviction (see docker-compose.yml), complete: a miss
+# proves a token is not blacklisted, so refresh/verify skip the database.
+# Set JWT_BLACKLIST_CACHE_NOEVICTION=False if the Redis may evict keys.
+JWT_BLACKLIST_CACHE_NOEVICTION = env.bool(  # noqa: F405
+    "JWT_BLACKLIST_CACHE_NOEVICTION",
+    default=bool(REDIS_URL),  # noqa: F405
+)
+
 # ---------------------------------------------------------------------
 # Security (enable HTTPS-related settings behind a TLS terminator or directly)
 # ---------------------------------------------------------------------
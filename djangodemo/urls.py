@@ -4,7 +4,7 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 # from .views import home
 from django.views.generic import RedirectView
-from rest_framework_simplejwt.views import (
+from apps.users.views import (
     TokenObtainPairView,
     TokenRefreshView,
     TokenVerifyView,
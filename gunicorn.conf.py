@@ -0,0 +1,134 @@
+"""Gunicorn server profile: ``gunicorn -c gunicorn.conf.py``.
+
+Environment variables (all optional):
+
+- ``GUNICORN_WORKER_CLASS``: ``gthread`` (default, WSGI with threads) or
+  ``uvicorn`` (ASGI, ``djangodemo/asgi.py``, requires ``uvicorn-worker``).
+- ``GUNICORN_WORKERS``: defaults to ``2 * CPUs + 1`` for ``gthread`` and
+  to the CPU count for ``uvicorn``. CPUs are those the container may use
+  (cgroup quota and CPU affinity), not those of the host.
+- ``GUNICORN_THREADS`` (``gthread`` only, default 4): keep it equal to
+  ``DB_POOL_MAX_SIZE`` so no thread waits for a database connection. The
+  settings read it too, to keep logins from taking every thread
+  (``AUTH_HASH_MAX_IN_FLIGHT``).
+- ``GUNICORN_MAX_REQUESTS`` / ``GUNICORN_MAX_REQUESTS_JITTER`` (2000 /
+  200): a worker is replaced after that many requests, which contains slow
+  leaks; the jitter keeps workers from restarting all at once.
+- ``GUNICORN_PRELOAD`` (default on): import the application in the master
+  before forking (apps/utils/prefork.py lists what is reset after fork).
+- ``GUNICORN_TIMEOUT`` / ``GUNICORN_GRACEFUL_TIMEOUT`` / ``GUNICORN_KEEPALIVE``.
+
+Metrics
+-------
+Each worker has its own metric values, so ``/metrics`` would only show the
+worker answering the scrape. ``PROMETHEUS_MULTIPROC_DIR`` (default: a
+directory in ``/dev/shm``, or in the temp dir where there is none)
+switches ``prometheus_client`` to multiprocess mode: workers write their
+values to files there and ``/metrics`` aggregates all of them. The
+directory is emptied in ``on_starting``, once per server: a reload
+(``SIGHUP``) re-reads this file but keeps the running workers' files.
+Files of dead workers are marked dead in ``child_exit``.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name) or default)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).lower() in {"1", "true", "yes", "on"}
+
+
+def cpu_count() -> int:
+    """CPUs available to this process: affinity, capped by the cgroup v2 quota."""
+
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS
+        count = os.cpu_count() or 1
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            count = min(count, max(1, round(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+# ---------------------------------------------------------------------
+# Worker model
+# ---------------------------------------------------------------------
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+if os.environ.get("GUNICORN_WORKER_CLASS", "gthread") == "uvicorn":
+    wsgi_app = "djangodemo.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+    workers = _env_int("GUNICORN_WORKERS", cpu_count())
+else:
+    wsgi_app = "djangodemo.wsgi:application"
+    worker_class = "gthread"
+    threads = _env_int("GUNICORN_THREADS", 4)
+    workers = _env_int("GUNICORN_WORKERS", 2 * cpu_count() + 1)
+
+preload_app = _env_bool("GUNICORN_PRELOAD", True)
+
+# ---------------------------------------------------------------------
+# Timeouts and recycling
+# ---------------------------------------------------------------------
+timeout = _env_int("GUNICORN_TIMEOUT", 60)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 2000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 200)
+
+# Heartbeat files in memory: /tmp may be a slow overlay filesystem in Docker.
+SHM = "/dev/shm"  # noqa: S108 - gunicorn creates its own files there
+if os.path.isdir(SHM):
+    worker_tmp_dir = SHM
+
+# ---------------------------------------------------------------------
+# Prometheus multiprocess mode (must be set before the app is imported)
+# ---------------------------------------------------------------------
+# Workers write to these files on every metric update: keep them in memory.
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(SHM if os.path.isdir(SHM) else tempfile.gettempdir(), "prometheus-multiproc"),
+)
+os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+# ---------------------------------------------------------------------
+# Hooks
+# ---------------------------------------------------------------------
+def on_starting(server):
+    # Values left by a previous server would be added to the new ones. Not
+    # done at import: this file is read again on reload, with workers alive.
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        from apps.utils.prefork import before_fork
+
+        before_fork()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from apps.utils.prefork import after_fork
+
+        after_fork()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -5,8 +5,10 @@ This file keeps a small smoke test to validate the custom user model.
 """
 
 from django.test import TestCase
+from django.urls import URLResolver
 
 from apps.users.models import User
+from djangodemo import urls as root_urls
 
 
 class UserModelSmokeTests(TestCase):
@@ -17,3 +19,45 @@ class UserModelSmokeTests(TestCase):
 
         self.assertTrue(user.check_password("Pa$$w0rd"))
         self.assertEqual(str(user), "John Doe")
+
+
+class QueryBudgetCoverageTests(TestCase):
+    """Every pages, users and token endpoint declares a query budget."""
+
+    def iter_views(self, patterns, prefix=""):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from self.iter_views(pattern.url_patterns, prefix + str(pattern.pattern))
+            else:
+                yield prefix + str(pattern.pattern), pattern.callback
+
+    def assert_declared(self, route, view):
+        view_class = getattr(view, "view_class", None) or getattr(view, "cls", None)
+        if view_class is None:
+            self.assertTrue(hasattr(view, "query_budget"), route)
+            return
+        if getattr(view_class, "query_budget", None) is not None:
+            return
+        actions = getattr(view, "actions", None) or {}
+        budgets = getattr(view_class, "query_budgets", {})
+        for action in actions.values():
+            has_budget = action in budgets or hasattr(getattr(view_class, action), "query_budget")
+            self.assertTrue(has_budget, f"{route} ({action})")
+
+    def test_endpoints_declare_budgets(self):
+        from apps.pages import urls as pages_urls
+        from apps.users import urls as users_urls
+
+        views = list(self.iter_views(pages_urls.urlpatterns))
+        views += self.iter_views(users_urls.urlpatterns, "users/")
+        views += [
+            (route, view)
+            for route, view in self.iter_views(root_urls.urlpatterns)
+            if route.startswith("api/token/")
+        ]
+        self.assertGreater(len(views), 15)
+        for route, view in views:
+            if "format" in route or route == "users/":
+                continue  # router API root and format suffix variants
+            with self.subTest(route=route):
+                self.assert_declared(route, view)